@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Benchmark de la lecture des codes-barres en caisse
+
+Mesure la résolution d'un ticket (plusieurs codes scannés) par l'index en
+mémoire, comparée à une requête par ticket, puis la latence d'un scan
+lorsque plusieurs caisses scannent en rafale en même temps (threads).
+
+Usage : python benchmarks/caisse.py [--produits 50000] [--caisses 8] [--scans 2000]
+"""
+import argparse
+import random
+import threading
+import time
+from decimal import Decimal
+
+from outils import base_temporaire, titre, mesurer, resume
+
+from boutique_app import caisse
+from boutique_app.models import Categorie, Produit
+
+
+def creer_produits(nombre):
+    categorie = Categorie.objects.create(nom="Catégorie")
+    Produit.objects.bulk_create([
+        Produit(
+            nom=f"Produit {i}",
+            code_barre=f'{6000000000000 + i}',
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+        for i in range(nombre)
+    ], batch_size=5000)
+    return [f'{6000000000000 + i}' for i in range(nombre)]
+
+
+def par_requete(codes):
+    return list(Produit.objects.actifs().filter(code_barre__in=codes).values_list(
+        'id', 'code_barre', 'nom', 'prix_vente', 'prix_promo', 'en_promotion', 'quantite_stock'
+    ))
+
+
+def rafales(codes, caisses, scans):
+    """Latences (ms) des scans de ``caisses`` threads scannant chacun ``scans`` codes"""
+    durees = []
+    verrou = threading.Lock()
+    depart = threading.Barrier(caisses)
+
+    def caisse_en_rafale(graine):
+        aleatoire = random.Random(graine)
+        locales = []
+        depart.wait()
+        for _ in range(scans):
+            code = aleatoire.choice(codes)
+            debut = time.perf_counter()
+            caisse.index.resoudre([code])
+            locales.append((time.perf_counter() - debut) * 1000)
+        with verrou:
+            durees.extend(locales)
+
+    threads = [threading.Thread(target=caisse_en_rafale, args=(i,)) for i in range(caisses)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return durees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--produits', type=int, default=50000)
+    parser.add_argument('--caisses', type=int, default=8)
+    parser.add_argument('--scans', type=int, default=2000)
+    args = parser.parse_args()
+
+    with base_temporaire():
+        codes = creer_produits(args.produits)
+        ticket = random.Random(1).sample(codes, 20)
+
+        titre(f"Ticket de 20 articles parmi {args.produits:,} produits")
+        print(f"{'Construction de l’index':<28} {resume(mesurer(caisse.index.construire, 5))}")
+        print(f"{'Une requête par ticket':<28} {resume(mesurer(lambda: par_requete(ticket), 200))}")
+        print(f"{'Index en mémoire':<28} {resume(mesurer(lambda: caisse.index.resoudre(ticket), 200))}")
+
+        titre(f"{args.caisses} caisses, {args.scans} scans chacune en rafale")
+        print(f"{'Scan (index en mémoire)':<28} {resume(rafales(codes, args.caisses, args.scans))}")
+
+
+if __name__ == '__main__':
+    main()
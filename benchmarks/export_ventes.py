@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'export CSV des ventes
+
+Génère des ventes synthétiques puis mesure, pour l'export en flux (vue
+``export_ventes``) et pour l'ancien export construit en mémoire, le débit en
+lignes par seconde et l'augmentation du pic de mémoire (RSS) du processus.
+
+Usage : python benchmarks/export_ventes.py [--nombre 1000000] [--sans-ancien]
+"""
+import argparse
+import csv
+import resource
+import sys
+import time
+
+from outils import base_temporaire, creer_ventes, titre
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory
+from boutique_app.models import Vente
+from boutique_app.views import export_ventes
+
+
+def pic_rss_mo():
+    """Pic de mémoire résidente du processus, en Mo"""
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko ; macOS : octets
+    return pic / 1024 / 1024 if sys.platform == 'darwin' else pic / 1024
+
+
+def export_en_memoire():
+    """Ancienne implémentation : tout le CSV construit dans une HttpResponse"""
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    writer = csv.writer(response)
+    writer.writerow(['Date', 'Produit', 'Catégorie', 'Quantité', 'Prix unitaire', 'Montant total'])
+    for vente in Vente.objects.select_related('produit', 'produit__categorie').all().order_by('-date_vente'):
+        writer.writerow([
+            vente.date_vente.strftime('%Y-%m-%d %H:%M'),
+            str(vente.produit.nom),
+            str(vente.produit.categorie.nom),
+            vente.quantite,
+            float(vente.prix_unitaire),
+            float(vente.montant_total)
+        ])
+    return len(response.content)
+
+
+def export_en_flux(requete):
+    response = export_ventes(requete)
+    return sum(len(morceau) for morceau in response.streaming_content)
+
+
+def mesurer_export(nom, fonction, nombre):
+    rss_avant = pic_rss_mo()
+    debut = time.perf_counter()
+    taille = fonction()
+    duree = time.perf_counter() - debut
+    print(
+        f"{nom:<22} {nombre / duree:>10,.0f} lignes/s | {taille / 1024 / 1024:7.1f} Mo de CSV"
+        f" | pic RSS +{pic_rss_mo() - rss_avant:7.1f} Mo"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nombre', type=int, default=1000000)
+    parser.add_argument('--sans-ancien', action='store_true', help="ne pas mesurer l'export en mémoire")
+    args = parser.parse_args()
+
+    with base_temporaire():
+        titre(f"Création de {args.nombre:,} ventes")
+        debut = time.perf_counter()
+        creer_ventes(args.nombre)
+        print(f"{time.perf_counter() - debut:.1f} s, pic RSS {pic_rss_mo():.0f} Mo")
+
+        requete = RequestFactory().get('/export/ventes/')
+        requete.user = User.objects.create_user(username='benchmark', is_staff=True)
+
+        titre("Export CSV")
+        # Le flux d'abord : le pic RSS ne fait que croître
+        mesurer_export('En flux', lambda: export_en_flux(requete), args.nombre)
+        if not args.sans_ancien:
+            mesurer_export('En mémoire (ancien)', export_en_memoire, args.nombre)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'import en masse des produits
+
+Génère un catalogue fournisseur en CSV (en mémoire) puis mesure :
+
+- l'import initial (création des produits, catégories et fournisseurs) ;
+- la simulation d'une mise à jour de tarifs (aucune écriture) ;
+- la mise à jour de tarifs (un produit sur deux change de prix et de stock) ;
+- le même fichier réimporté (aucune modification).
+
+Usage : python benchmarks/import_produits.py [--lignes 100000] [--taille-lot 2000]
+"""
+import argparse
+import csv
+import io
+import random
+
+from outils import base_temporaire, titre
+
+from boutique_app.imports import importer_produits, lire_csv, TAILLE_LOT
+
+ENTETES = ['code_barre', 'nom', 'categorie', 'fournisseur', 'prix_achat', 'prix_vente', 'quantite_stock']
+
+
+def generer_csv(nombre, hausse=False):
+    aleatoire = random.Random(42)
+    tampon = io.StringIO()
+    writer = csv.writer(tampon, delimiter=';')
+    writer.writerow(ENTETES)
+    for i in range(nombre):
+        prix_achat = aleatoire.randint(100, 50000)
+        stock = aleatoire.randint(0, 500)
+        if hausse and i % 2:
+            prix_achat += 50
+            stock += 10
+        writer.writerow([
+            f'{6000000000000 + i}', f'Produit {i}', f'Catégorie {i % 50}', f'Fournisseur {i % 200}',
+            f'{prix_achat},00', f'{prix_achat * 3 // 2},00', stock,
+        ])
+    return tampon.getvalue().encode('utf-8')
+
+
+def importer(contenu, taille_lot, simulation=False):
+    rapport = importer_produits(lire_csv(io.BytesIO(contenu)), simulation=simulation, taille_lot=taille_lot)
+    assert not rapport.erreurs, rapport.erreurs[:5]
+    print(f"{rapport.resume()}")
+    print(f"  {rapport.duree:6.2f} s  ->  {rapport.lignes_par_seconde:,.0f} lignes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lignes', type=int, default=100000)
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT)
+    args = parser.parse_args()
+
+    initial = generer_csv(args.lignes)
+    tarifs = generer_csv(args.lignes, hausse=True)
+
+    with base_temporaire():
+        titre(f"Import initial de {args.lignes:,} produits")
+        importer(initial, args.taille_lot)
+        titre("Mise à jour des tarifs (simulation)")
+        importer(tarifs, args.taille_lot, simulation=True)
+        titre("Mise à jour des tarifs")
+        importer(tarifs, args.taille_lot)
+        titre("Réimport sans changement")
+        importer(tarifs, args.taille_lot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Benchmark de l'attribution des numéros de commande
+
+Mesure le débit de chaque allocateur, chaque numéro étant alloué dans sa
+propre transaction comme lors d'une commande.
+
+Usage : python benchmarks/numerotation.py [--nombre 20000] [--taille-bloc 100]
+"""
+import argparse
+import time
+
+from outils import base_temporaire, titre
+
+from django.db import transaction
+from boutique_app.numerotation import AllocateurSequence, AllocateurHorodate
+
+
+def debit(allocateur, nombre):
+    """Numéros alloués par seconde ; vérifie l'absence de doublon"""
+    numeros = set()
+    debut = time.perf_counter()
+    for _ in range(nombre):
+        with transaction.atomic():
+            numeros.add(allocateur.allouer())
+    duree = time.perf_counter() - debut
+    assert len(numeros) == nombre, 'numéro attribué deux fois'
+    return nombre / duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nombre', type=int, default=20000)
+    parser.add_argument('--taille-bloc', type=int, default=100)
+    args = parser.parse_args()
+
+    with base_temporaire():
+        titre(f"{args.nombre} numéros, une transaction par numéro")
+        for nom, allocateur in [
+            ('Séquence, blocs de 1', AllocateurSequence(taille_bloc=1)),
+            (f'Séquence, blocs de {args.taille_bloc}', AllocateurSequence(taille_bloc=args.taille_bloc)),
+            ('Horodaté', AllocateurHorodate()),
+        ]:
+            print(f"{nom:<28} {debit(allocateur, args.nombre):>12,.0f} numéros/s")
+
+
+if __name__ == '__main__':
+    main()
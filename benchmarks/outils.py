@@ -0,0 +1,103 @@
+"""
+Outils communs aux benchmarks
+
+Chaque benchmark s'exécute dans une base de test créée et migrée pour
+l'occasion, puis détruite : la base de données réelle n'est jamais modifiée.
+"""
+import os
+import random
+import sys
+import time
+import statistics
+from contextlib import contextmanager
+from pathlib import Path
+
+RACINE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RACINE))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'boutique.settings')
+
+import django
+django.setup()
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.utils import timezone
+
+TAILLE_LOT_CREATION = 20000
+TAILLE_LOT_DATES = 100  # ventes partageant la même date
+
+
+@contextmanager
+def base_temporaire():
+    """Crée une base de test migrée et la détruit à la sortie"""
+    nom_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nom_original, verbosity=0)
+
+
+def mesurer(fonction, repetitions=20):
+    """Exécute la fonction plusieurs fois et retourne les durées en millisecondes"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def resume(durees):
+    """Médiane et 95e centile d'une série de durées"""
+    durees = sorted(durees)
+    p95 = durees[min(len(durees) - 1, int(len(durees) * 0.95))]
+    return f"médiane {statistics.median(durees):8.2f} ms | p95 {p95:8.2f} ms"
+
+
+def titre(texte):
+    print("\n" + "=" * 70)
+    print(f"  {texte}")
+    print("=" * 70)
+
+
+def creer_ventes(nombre, jours=365):
+    """Crée des ventes aléatoires réparties sur les ``jours`` derniers jours (sans passer par les signaux)"""
+    from boutique_app.models import Categorie, Produit, Vente
+
+    aleatoire = random.Random(42)
+    categories = [Categorie.objects.create(nom=f"Catégorie {i}") for i in range(20)]
+    produits = Produit.objects.bulk_create([
+        Produit(
+            nom=f"Produit {i}",
+            categorie=categories[i % len(categories)],
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+        for i in range(2000)
+    ])
+    maintenant = timezone.now()
+    creees = 0
+    while creees < nombre:
+        lot = min(TAILLE_LOT_CREATION, nombre - creees)
+        ventes = []
+        for _ in range(lot):
+            produit = aleatoire.choice(produits)
+            quantite = aleatoire.randint(1, 5)
+            ventes.append(Vente(
+                produit=produit,
+                quantite=quantite,
+                prix_unitaire=produit.prix_vente,
+                montant_total=produit.prix_vente * quantite,
+            ))
+        # bulk_create n'envoie pas de signal : les cumuls ne sont pas mis à jour (inutile ici)
+        Vente.objects.bulk_create(ventes)
+        creees += lot
+    # Étaler les ventes sur la période
+    for vente_id in range(1, nombre + 1, TAILLE_LOT_DATES):
+        Vente.objects.filter(id__gte=vente_id, id__lt=vente_id + TAILLE_LOT_DATES).update(
+            date_vente=maintenant - timedelta(minutes=aleatoire.randint(0, jours * 24 * 60))
+        )
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark et backtest des prévisions de ventes
+
+Génère un an de cumuls journaliers synthétiques (saisonnalité hebdomadaire,
+tendance propre à chaque produit, bruit et jours sans vente), puis :
+
+- mesure l'ajustement de tous les produits à froid et la prévision avec les
+  paramètres en cache ;
+- compare, sur les ``--horizon`` derniers jours tenus à l'écart, l'erreur
+  (WAPE) du modèle et de l'ancienne moyenne des 3 derniers mois, par
+  produit, par catégorie et pour toute la boutique.
+
+Usage : python benchmarks/previsions.py [--produits 2000] [--horizon 30]
+"""
+import argparse
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from outils import base_temporaire, titre
+
+from django.core.cache import cache
+from django.utils import timezone
+from boutique_app.models import Categorie, Produit, VenteJournaliere
+from boutique_app import previsions
+
+NOMBRE_JOURS = 365
+PROFIL = np.array([1.0, 0.9, 1.0, 1.1, 1.3, 1.8, 0.4])
+
+
+def creer_historique(nombre_produits):
+    aleatoire = np.random.default_rng(42)
+    categories = [Categorie.objects.create(nom=f"Catégorie {i}") for i in range(20)]
+    produits = Produit.objects.bulk_create([
+        Produit(
+            nom=f"Produit {i}",
+            categorie=categories[i % len(categories)],
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+        for i in range(nombre_produits)
+    ])
+
+    aujourdhui = timezone.localdate()
+    debut = aujourdhui - timedelta(days=NOMBRE_JOURS)
+    jours = np.arange(NOMBRE_JOURS)
+    base = aleatoire.gamma(2.0, 3.0, size=(nombre_produits, 1))
+    pente = aleatoire.normal(0, 0.004, size=(nombre_produits, 1))
+    profil = np.roll(PROFIL, -debut.weekday())[jours % 7]
+    moyenne = np.clip(base * profil * (1 + pente * jours), 0, None)
+    quantites = aleatoire.poisson(moyenne)
+
+    cumuls = [
+        VenteJournaliere(
+            date=debut + timedelta(days=int(jour)),
+            produit=produits[i],
+            categorie_id=produits[i].categorie_id,
+            quantite=int(quantites[i, jour]),
+            montant_total=Decimal(int(quantites[i, jour]) * 150),
+            nombre_ventes=int(quantites[i, jour])
+        )
+        for i, jour in zip(*np.nonzero(quantites))
+    ]
+    VenteJournaliere.objects.bulk_create(cumuls, batch_size=5000)
+    return len(cumuls)
+
+
+def chronometrer(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, (time.perf_counter() - debut) * 1000
+
+
+def pourcentage(valeur):
+    return f"{valeur * 100:6.1f} %" if valeur is not None else "    n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--produits', type=int, default=2000)
+    parser.add_argument('--horizon', type=int, default=previsions.HORIZON)
+    args = parser.parse_args()
+
+    with base_temporaire():
+        titre(f"Historique synthétique : {args.produits} produits sur {NOMBRE_JOURS} jours")
+        nombre, duree = chronometrer(lambda: creer_historique(args.produits))
+        print(f"{nombre:,} cumuls journaliers créés en {duree / 1000:.1f} s")
+
+        titre("Prévision par produit")
+        cache.clear()
+        resultat, duree = chronometrer(lambda: previsions.prevision_produits(horizon=args.horizon))
+        print(f"Ajustement et prévision (à froid)     {duree:9.1f} ms pour {len(resultat)} produits")
+        _, duree = chronometrer(lambda: previsions.prevision_produits(horizon=args.horizon))
+        print(f"Prévision (paramètres en cache)       {duree:9.1f} ms")
+        _, duree = chronometrer(lambda: previsions.prevision_totale(horizon=args.horizon))
+        print(f"Prévision du dashboard (total)        {duree:9.1f} ms")
+
+        titre(f"Backtest sur les {args.horizon} derniers jours (WAPE, plus bas = meilleur)")
+        print(f"{'Niveau':<12} {'séries':>7} | {'total période':^23} | {'jour par jour':^23}")
+        print(f"{'':<12} {'':>7} | {'modèle':>10} {'moy. 3 mois':>12} | {'modèle':>10} {'moy. 3 mois':>12}")
+        for niveau in ('produit', 'categorie', 'total'):
+            r = previsions.backtest(niveau, horizon=args.horizon)
+            print(
+                f"{niveau:<12} {r['nombre_series']:>7} | {pourcentage(r['wape_modele']):>10}"
+                f" {pourcentage(r['wape_moyenne']):>12} | {pourcentage(r['wape_journalier_modele']):>10}"
+                f" {pourcentage(r['wape_journalier_moyenne']):>12}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Benchmark de la recherche catalogue : index plein texte contre icontains
+
+Usage : python benchmarks/recherche.py [--tailles 10000 100000]
+"""
+import argparse
+import random
+from decimal import Decimal
+
+from outils import base_temporaire, mesurer, resume, titre
+
+from django.db.models import Q
+from boutique_app.models import Categorie, Produit
+from boutique_app.recherche import rechercher, reconstruire_index
+
+VOCABULAIRE = [
+    'eau', 'minérale', 'gazeuse', 'jus', 'orange', 'mangue', 'ananas', 'lait', 'crème',
+    'fraîche', 'yaourt', 'fromage', 'beurre', 'riz', 'parfumé', 'pâtes', 'farine', 'sucre',
+    'sel', 'huile', 'palme', 'arachide', 'savon', 'lessive', 'dentifrice', 'café', 'thé',
+    'chocolat', 'biscuit', 'céréales', 'sardines', 'tomate', 'concentré', 'piment', 'oignon',
+    'bouillon', 'épices', 'bière', 'soda', 'limonade', 'bouteille', 'paquet', 'sachet', 'boîte',
+]
+REQUETES = ['eau minerale', 'creme', 'jus mangue', 'lait', 'savon', 'pates', 'chocolat biscuit', 'huile palme']
+SYLLABES = ['ba', 'ko', 'mi', 'ra', 'tou', 'len', 'sa', 'di', 'po', 'gué', 'né', 'lu', 'fa', 'zo', 'ri']
+
+
+def creer_vocabulaire(aleatoire, nombre=5000):
+    """Vocabulaire réaliste : quelques mots courants noyés dans des marques et références"""
+    marques = {
+        ''.join(aleatoire.choices(SYLLABES, k=aleatoire.randint(2, 4)))
+        for _ in range(nombre)
+    }
+    return VOCABULAIRE + sorted(marques)
+
+
+def creer_catalogue(nombre):
+    aleatoire = random.Random(42)
+    vocabulaire = creer_vocabulaire(aleatoire)
+    categories = [Categorie.objects.create(nom=f"Catégorie {i}") for i in range(20)]
+    lot = []
+    for i in range(nombre):
+        lot.append(Produit(
+            nom=' '.join(aleatoire.sample(vocabulaire, 3)).capitalize(),
+            description=' '.join(aleatoire.choices(vocabulaire, k=12)),
+            categorie=aleatoire.choice(categories),
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=10,
+        ))
+        if len(lot) == 5000:
+            Produit.objects.bulk_create(lot)
+            lot = []
+    Produit.objects.bulk_create(lot)
+    reconstruire_index()
+
+
+def page(produits):
+    """Ce que fait la pagination du catalogue : un comptage et une page de 12 produits"""
+    produits.count()
+    return list(produits[:12])
+
+
+def page_icontains(texte):
+    filtre = Q()
+    for mot in texte.split():
+        filtre &= Q(nom__icontains=mot) | Q(description__icontains=mot)
+    return page(Produit.objects.filter(active=True).filter(filtre))
+
+
+def page_index(texte):
+    return page(rechercher(Produit.objects.filter(active=True), texte))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    for taille in args.tailles:
+        with base_temporaire():
+            titre(f"Catalogue de {taille} produits")
+            creer_catalogue(taille)
+            for texte in REQUETES:
+                print(f"\n  « {texte} »")
+                print(f"    icontains : {resume(mesurer(lambda: page_icontains(texte), args.repetitions))}")
+                print(f"    index     : {resume(mesurer(lambda: page_index(texte), args.repetitions))}")
+
+
+if __name__ == '__main__':
+    main()
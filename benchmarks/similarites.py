@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Benchmark des produits similaires
+
+Génère un historique de commandes (paniers de 1 à 8 produits tirés dans des
+« rayons » de produits souvent achetés ensemble), puis mesure :
+
+- le calcul hors ligne de la table ProduitSimilaire ;
+- la lecture des produits similaires sur la page produit, comparée à
+  l'ancienne requête « quatre produits de la même catégorie ».
+
+Usage : python benchmarks/similarites.py [--produits 20000] [--commandes 200000]
+"""
+import argparse
+import itertools
+import random
+import time
+from decimal import Decimal
+
+from outils import base_temporaire, titre, mesurer, resume, TAILLE_LOT_CREATION
+
+from django.contrib.auth.models import User
+from boutique_app.models import Categorie, Produit, Panier, Commande, Vente
+from boutique_app.similarites import calculer, produits_similaires
+
+TAILLE_RAYON = 40
+
+
+def creer_historique(nombre_produits, nombre_commandes):
+    aleatoire = random.Random(42)
+    categories = [Categorie.objects.create(nom=f"Catégorie {i}") for i in range(50)]
+    produits = Produit.objects.bulk_create([
+        Produit(
+            nom=f"Produit {i}",
+            categorie=categories[i % len(categories)],
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+        for i in range(nombre_produits)
+    ], batch_size=5000)
+    utilisateur = User.objects.create_user(username='client')
+
+    creees = 0
+    while creees < nombre_commandes:
+        lot = min(TAILLE_LOT_CREATION, nombre_commandes - creees)
+        paniers = Panier.objects.bulk_create([Panier(utilisateur=utilisateur, statut='valide') for _ in range(lot)])
+        # bulk_create n'envoie pas de signal : les ventes sont créées ci-dessous
+        commandes = Commande.objects.bulk_create([
+            Commande(panier=panier, numero_commande=f"B{creees + i}", montant_total=Decimal('0'), statut='livree')
+            for i, panier in enumerate(paniers)
+        ])
+        ventes = []
+        for commande in commandes:
+            rayon = aleatoire.randrange(0, nombre_produits - TAILLE_RAYON)
+            for produit in aleatoire.sample(produits[rayon:rayon + TAILLE_RAYON], aleatoire.randint(1, 8)):
+                ventes.append(Vente(
+                    produit=produit, commande=commande, quantite=1,
+                    prix_unitaire=produit.prix_vente, montant_total=produit.prix_vente,
+                ))
+        Vente.objects.bulk_create(ventes, batch_size=5000)
+        creees += lot
+    return produits
+
+
+def meme_categorie(produit):
+    return list(Produit.objects.filter(categorie_id=produit.categorie_id, active=True).exclude(id=produit.id)[:4])
+
+
+def lire(fonction, echantillon):
+    """Durées de ``fonction`` appliquée à chaque produit de l'échantillon"""
+    produits = itertools.cycle(echantillon)
+    return resume(mesurer(lambda: fonction(next(produits)), len(echantillon)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--produits', type=int, default=20000)
+    parser.add_argument('--commandes', type=int, default=200000)
+    args = parser.parse_args()
+
+    with base_temporaire():
+        produits = creer_historique(args.produits, args.commandes)
+
+        titre(f"Calcul sur {args.commandes:,} commandes et {args.produits:,} produits")
+        debut = time.perf_counter()
+        nombre_voisins, nombre_produits = calculer()
+        print(f"{nombre_voisins:,} voisins pour {nombre_produits:,} produits en {time.perf_counter() - debut:.2f} s")
+
+        titre("Lecture sur la page produit")
+        echantillon = random.Random(1).sample(produits, 200)
+        print(f"{'Même catégorie (ancienne)':<28} {lire(meme_categorie, echantillon)}")
+        print(f"{'Produits similaires':<28} {lire(produits_similaires, echantillon)}")
+
+
+if __name__ == '__main__':
+    main()
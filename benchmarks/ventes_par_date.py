@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Benchmark des filtres de ventes par jour calendaire
+
+Compare les filtres ``date_vente__date`` (conversion de fuseau appliquée à
+chaque ligne, index inutilisable) et ``Vente.objects.du_jour()`` /
+``entre()`` (intervalle semi-ouvert sur la colonne, index ``vente_date_idx``)
+sur les requêtes typiques du dashboard et des exports.
+
+Usage : python benchmarks/ventes_par_date.py [--nombre 1000000] [--repetitions 20]
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from outils import base_temporaire, creer_ventes, mesurer, resume, titre
+
+from django.db.models import Sum, Count
+from django.utils import timezone
+from boutique_app.models import Vente
+
+
+def requetes(aujourdhui):
+    """(nom, ancien filtre, nouveau filtre) des requêtes mesurées"""
+    semaine = aujourdhui - timedelta(days=7)
+    mois = aujourdhui - timedelta(days=30)
+    return [
+        ("Ventes du jour",
+         lambda: Vente.objects.filter(date_vente__date=aujourdhui),
+         lambda: Vente.objects.du_jour(aujourdhui)),
+        ("7 derniers jours",
+         lambda: Vente.objects.filter(date_vente__date__gte=semaine, date_vente__date__lte=aujourdhui),
+         lambda: Vente.objects.entre(semaine, aujourdhui)),
+        ("30 derniers jours",
+         lambda: Vente.objects.filter(date_vente__date__gte=mois, date_vente__date__lte=aujourdhui),
+         lambda: Vente.objects.entre(mois, aujourdhui)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nombre', type=int, default=1000000)
+    parser.add_argument('--repetitions', type=int, default=20)
+    args = parser.parse_args()
+
+    with base_temporaire():
+        titre(f"Création de {args.nombre:,} ventes sur un an")
+        debut = time.perf_counter()
+        creer_ventes(args.nombre)
+        print(f"{time.perf_counter() - debut:.1f} s")
+
+        aujourdhui = timezone.localdate()
+        for nom, ancien, nouveau in requetes(aujourdhui):
+            titre(f"{nom} : total et nombre de ventes")
+            attendu = ancien().aggregate(total=Sum('montant_total'), nombre=Count('id'))
+            obtenu = nouveau().aggregate(total=Sum('montant_total'), nombre=Count('id'))
+            assert attendu == obtenu, (attendu, obtenu)
+            print(f"{obtenu['nombre']:,} ventes")
+            for libelle, filtre in (("__date (ancien)", ancien), ("entre / du_jour", nouveau)):
+                durees = mesurer(lambda: filtre().aggregate(total=Sum('montant_total'), nombre=Count('id')), args.repetitions)
+                print(f"{libelle:<18} {resume(durees)}")
+                print(f"{'':<18} plan : {filtre().explain().splitlines()[-1].strip()}")
+
+
+if __name__ == '__main__':
+    main()
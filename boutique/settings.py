@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'boutique_app.middleware.EnTetesCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -129,6 +130,12 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # collectstatic : CSS minifiés, noms à empreinte (staticfiles.json), versions .gz/.br
+    'staticfiles': {'BACKEND': 'boutique_app.statiques.StockageStatiques'},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -137,6 +144,41 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='boutique'),
+    }
+}
+
+# Cache du tableau de bord (secondes)
+DASHBOARD_CACHE = {
+    'TTL': config('DASHBOARD_CACHE_TTL', default=60, cast=int),
+    'PERIODE_OBSOLESCENCE': config('DASHBOARD_CACHE_OBSOLESCENCE', default=300, cast=int),
+    'RAFRAICHISSEMENT_ASYNCHRONE': True,
+}
+
+# Numérotation des commandes (voir boutique_app/numerotation.py)
+NUMEROTATION_COMMANDES = {
+    'ALLOCATEUR': config('NUMEROTATION_ALLOCATEUR', default='boutique_app.numerotation.AllocateurSequence'),
+    'TAILLE_BLOC': config('NUMEROTATION_TAILLE_BLOC', default=100, cast=int),
+}
+
+# Réapprovisionnement (voir boutique_app/reapprovisionnement.py)
+REAPPROVISIONNEMENT = {
+    'FENETRE_JOURS': config('REAPPROVISIONNEMENT_FENETRE_JOURS', default=56, cast=int),
+    'NIVEAU_SERVICE': config('REAPPROVISIONNEMENT_NIVEAU_SERVICE', default=0.95, cast=float),
+    'JOURS_COUVERTURE': config('REAPPROVISIONNEMENT_JOURS_COUVERTURE', default=14, cast=int),
+}
+
+# Produits similaires (voir boutique_app/similarites.py)
+PRODUITS_SIMILAIRES = {
+    'FENETRE_JOURS': config('PRODUITS_SIMILAIRES_FENETRE_JOURS', default=365, cast=int),
+    'VOISINS': config('PRODUITS_SIMILAIRES_VOISINS', default=8, cast=int),
+    'ACHATS_COMMUNS_MIN': config('PRODUITS_SIMILAIRES_ACHATS_COMMUNS_MIN', default=2, cast=int),
+}
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -1,6 +1,27 @@
-from django.contrib import admin
+from decimal import Decimal
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, Now
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
-from .models import Categorie, Modele, Produit, Panier, ItemPanier, Commande, Vente, Fournisseur, AvisProduit
+from .forms import ImportProduitsForm, CommandeAdminForm
+from .images import derivees
+from .imports import importer_produits, lire_fichier, FichierInvalide, OpenpyxlIndisponible
+from .notes import recalculer_notes
+from .pagination import PaginateurEstime
+from .models import Categorie, Modele, Produit, Panier, ItemPanier, Commande, Vente, Fournisseur, AvisProduit, VenteJournaliere, PlanReapprovisionnement
+
+
+def url_vignette(image):
+    """Vignette (200 px) d'une image ; l'original si elle ne peut pas être générée"""
+    images = derivees(image)
+    return images.url('vignette') if images else image.url
+
+
+# Erreurs d'import listées dans la page de rapport (toutes restent comptées)
+ERREURS_AFFICHEES = 200
 
 
 @admin.register(Categorie)
@@ -12,13 +33,17 @@ class CategorieAdmin(admin.ModelAdmin):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" />', obj.image.url)
+            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" loading="lazy" />', url_vignette(obj.image))
         return "Aucune image"
     image_preview.short_description = "Image"
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nombre_produits_calcule=Count('produits'))
+    
     def nombre_produits(self, obj):
-        return obj.produits.count()
+        return obj.nombre_produits_calcule
     nombre_produits.short_description = "Nombre de produits"
+    nombre_produits.admin_order_field = 'nombre_produits_calcule'
 
 
 @admin.register(Modele)
@@ -27,15 +52,20 @@ class ModeleAdmin(admin.ModelAdmin):
     search_fields = ['nom', 'description']
     readonly_fields = ['date_creation']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nombre_produits_calcule=Count('produits'))
+    
     def nombre_produits(self, obj):
-        return obj.produits.count()
+        return obj.nombre_produits_calcule
     nombre_produits.short_description = "Nombre de produits"
+    nombre_produits.admin_order_field = 'nombre_produits_calcule'
 
 
 class ItemPanierInline(admin.TabularInline):
     model = ItemPanier
     extra = 0
     fields = ['produit', 'quantite', 'prix_unitaire']
+    autocomplete_fields = ['produit']
     
     def has_add_permission(self, request, obj=None):
         """Seul le staff peut ajouter des items"""
@@ -52,20 +82,40 @@ class PanierAdmin(admin.ModelAdmin):
     list_filter = ['statut', 'date_creation']
     search_fields = ['id', 'utilisateur__username']
     readonly_fields = ['date_creation', 'date_modification', 'total_panier']
+    autocomplete_fields = ['utilisateur']
     inlines = [ItemPanierInline]
+    # Grande table : nombre de lignes estimé, pas de second COUNT(*) sur la table entière
+    paginator = PaginateurEstime
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        # Les deux agrégats portent sur la même jointure : pas de double comptage
+        return super().get_queryset(request).select_related('utilisateur').annotate(
+            # 0 pour un panier vide : le tri place les NULL différemment selon la base
+            total_calcule=Coalesce(
+                Sum(F('items__quantite') * F('items__prix_unitaire')),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            nombre_items_calcule=Count('items'),
+        )
     
     def total_panier(self, obj):
-        return f"{obj.total:.2f} FCFA"
+        # Annoté en SQL dans la liste et la fiche ; panier pas encore enregistré sinon
+        total = getattr(obj, 'total_calcule', 0)
+        return f"{total:.2f} FCFA"
     total_panier.short_description = "Total"
+    total_panier.admin_order_field = 'total_calcule'
     
     def nombre_items(self, obj):
-        return obj.items.count()
+        return obj.nombre_items_calcule
     nombre_items.short_description = "Articles"
+    nombre_items.admin_order_field = 'nombre_items_calcule'
 
 
 @admin.register(Fournisseur)
 class FournisseurAdmin(admin.ModelAdmin):
-    list_display = ['nom', 'contact', 'telephone', 'email', 'actif', 'date_creation']
+    list_display = ['nom', 'contact', 'telephone', 'email', 'delai_livraison_jours', 'actif', 'date_creation']
     list_filter = ['actif', 'date_creation']
     search_fields = ['nom', 'contact', 'email', 'telephone']
     readonly_fields = ['date_creation']
@@ -73,10 +123,11 @@ class FournisseurAdmin(admin.ModelAdmin):
 
 @admin.register(Produit)
 class ProduitAdmin(admin.ModelAdmin):
-    list_display = ['nom', 'categorie', 'modele', 'prix_affichage_display', 'quantite_stock', 'promotion_badge', 'stock_status', 'marge_display', 'image_preview']
+    list_display = ['nom', 'categorie', 'modele', 'prix_affichage_display', 'quantite_stock', 'promotion_badge', 'stock_status', 'marge_display', 'valeur_stock_display', 'image_preview']
     list_filter = ['categorie', 'modele', 'fournisseur', 'en_promotion', 'active', 'date_creation']
     search_fields = ['nom', 'description', 'code_barre']
     readonly_fields = ['date_creation', 'date_modification', 'image_preview', 'stock_status']
+    autocomplete_fields = ['categorie', 'modele', 'fournisseur']
     fieldsets = (
         ('Informations générales', {
             'fields': ('nom', 'description', 'categorie', 'modele', 'fournisseur', 'code_barre', 'image', 'image_preview')
@@ -94,6 +145,45 @@ class ProduitAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_financials().select_related('categorie', 'modele')
+    
+    def get_urls(self):
+        urls = [
+            path('importer/', self.admin_site.admin_view(self.importer_view), name='boutique_app_produit_importer'),
+        ]
+        return urls + super().get_urls()
+    
+    def importer_view(self, request):
+        """Import en masse depuis un fichier CSV ou Excel (création et mise à jour par code-barres)"""
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        rapport = None
+        form = ImportProduitsForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            fichier = form.cleaned_data['fichier']
+            try:
+                rapport = importer_produits(
+                    lire_fichier(fichier.file, fichier.name),
+                    simulation=form.cleaned_data['simulation']
+                )
+            except (FichierInvalide, OpenpyxlIndisponible) as erreur:
+                form.add_error('fichier', str(erreur))
+            else:
+                niveau = messages.WARNING if rapport.erreurs else messages.SUCCESS
+                self.message_user(request, rapport.resume(), niveau)
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Importer des produits",
+            'opts': self.model._meta,
+            'form': form,
+            'rapport': rapport,
+            'erreurs': rapport.erreurs[:ERREURS_AFFICHEES] if rapport else [],
+            'erreurs_masquees': max(len(rapport.erreurs) - ERREURS_AFFICHEES, 0) if rapport else 0,
+        }
+        return TemplateResponse(request, 'admin/boutique_app/produit/importer.html', context)
+    
     def prix_affichage_display(self, obj):
         if obj.en_promotion and obj.prix_promo:
             return format_html('<span style="text-decoration: line-through; color: #999;">{} FCFA</span><br><span style="color: red; font-weight: bold;">{} FCFA</span>', 
@@ -104,13 +194,13 @@ class ProduitAdmin(admin.ModelAdmin):
     def promotion_badge(self, obj):
         if obj.en_promotion and obj.prix_promo:
             reduction = obj.reduction
-            return format_html('<span style="background-color: red; color: white; padding: 3px 8px; border-radius: 5px; font-weight: bold;">-{:.0f}%</span>', reduction)
+            return format_html('<span style="background-color: red; color: white; padding: 3px 8px; border-radius: 5px; font-weight: bold;">-{}%</span>', f"{reduction:.0f}")
         return "-"
     promotion_badge.short_description = "Promo"
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width: 200px; max-height: 200px; object-fit: cover; border-radius: 5px;" />', obj.image.url)
+            return format_html('<img src="{}" style="max-width: 200px; max-height: 200px; object-fit: cover; border-radius: 5px;" loading="lazy" />', url_vignette(obj.image))
         return "Aucune image"
     image_preview.short_description = "Aperçu"
     
@@ -121,7 +211,10 @@ class ProduitAdmin(admin.ModelAdmin):
     stock_status.short_description = "État du stock"
     
     def marge_display(self, obj):
-        marge = obj.marge_benefice
+        # Marge annotée en SQL par with_financials(), propriété du modèle sinon
+        marge = getattr(obj, 'marge_pourcentage', None)
+        if marge is None:
+            marge = obj.marge_benefice
         if marge is None:
             marge = 0
         # S'assurer que marge est un nombre (pas un SafeString)
@@ -130,16 +223,30 @@ class ProduitAdmin(admin.ModelAdmin):
         except (TypeError, ValueError):
             marge_float = 0
         color = 'green' if marge_float > 30 else 'orange' if marge_float > 15 else 'red'
-        return format_html('<span style="color: {}; font-weight: bold;">{:.1f}%</span>', color, marge_float)
+        # format_html échappe ses arguments : formater le nombre avant
+        return format_html('<span style="color: {}; font-weight: bold;">{}%</span>', color, f"{marge_float:.1f}")
     marge_display.short_description = "Marge"
+    marge_display.admin_order_field = 'marge_pourcentage'
+    
+    def valeur_stock_display(self, obj):
+        valeur = getattr(obj, 'valeur_stock_calculee', None)
+        if valeur is None:
+            valeur = obj.valeur_stock
+        return f"{valeur:.0f} FCFA"
+    valeur_stock_display.short_description = "Valeur du stock"
+    valeur_stock_display.admin_order_field = 'valeur_stock_calculee'
 
 
 @admin.register(Commande)
 class CommandeAdmin(admin.ModelAdmin):
+    form = CommandeAdminForm
     list_display = ['numero_commande', 'panier', 'statut', 'montant_total', 'date_commande', 'statut_badge']
     list_filter = ['statut', 'date_commande']
     search_fields = ['numero_commande', 'panier__id']
     readonly_fields = ['numero_commande', 'date_commande', 'montant_total']
+    autocomplete_fields = ['panier']
+    paginator = PaginateurEstime
+    show_full_result_count = False
     
     def statut_badge(self, obj):
         colors = {
@@ -152,6 +259,9 @@ class CommandeAdmin(admin.ModelAdmin):
         return format_html('<span style="background-color: {}; color: white; padding: 5px 10px; border-radius: 5px;">{}</span>', 
                           color, obj.get_statut_display())
     statut_badge.short_description = "Statut"
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('panier')
 
 
 @admin.register(AvisProduit)
@@ -160,9 +270,28 @@ class AvisProduitAdmin(admin.ModelAdmin):
     list_filter = ['note', 'approuve', 'date_creation']
     search_fields = ['produit__nom', 'utilisateur__username', 'commentaire']
     readonly_fields = ['date_creation']
+    autocomplete_fields = ['produit', 'utilisateur']
+    actions = ['approuver', 'desapprouver']
+    
+    def _changer_approbation(self, request, queryset, approuve):
+        produit_ids = set(queryset.values_list('produit_id', flat=True))
+        nombre = queryset.update(approuve=approuve, date_modification=Now())
+        # update() n'envoie pas de signal : recalculer les notes des produits concernés
+        recalculer_notes(produit_ids)
+        return nombre
+    
+    @admin.action(description="Approuver les avis sélectionnés")
+    def approuver(self, request, queryset):
+        nombre = self._changer_approbation(request, queryset, True)
+        self.message_user(request, f"{nombre} avis approuvé(s).")
+    
+    @admin.action(description="Retirer l'approbation des avis sélectionnés")
+    def desapprouver(self, request, queryset):
+        nombre = self._changer_approbation(request, queryset, False)
+        self.message_user(request, f"{nombre} avis retiré(s).")
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('produit', 'utilisateur')
+        return super().get_queryset(request).select_related('produit__categorie', 'utilisateur')
 
 
 @admin.register(Vente)
@@ -171,7 +300,87 @@ class VenteAdmin(admin.ModelAdmin):
     list_filter = ['date_vente', 'produit__categorie']
     search_fields = ['produit__nom']
     readonly_fields = ['montant_total', 'date_vente']
+    autocomplete_fields = ['produit', 'commande']
     date_hierarchy = 'date_vente'
+    paginator = PaginateurEstime
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('produit__categorie')
+    
+    def save_model(self, request, obj, form, change):
+        # Montant non saisi : recalculé pour que les cumuls journaliers restent exacts
+        obj.montant_total = obj.quantite * obj.prix_unitaire
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(VenteJournaliere)
+class VenteJournaliereAdmin(admin.ModelAdmin):
+    list_display = ['date', 'produit', 'categorie', 'quantite', 'montant_total', 'nombre_ventes']
+    list_filter = ['date', 'categorie']
+    search_fields = ['produit__nom']
+    date_hierarchy = 'date'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('produit__categorie', 'categorie')
+    
+    def has_add_permission(self, request):
+        """Les cumuls sont maintenus automatiquement"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ACommanderFilter(admin.SimpleListFilter):
+    title = "à commander"
+    parameter_name = 'a_commander'
+    
+    def lookups(self, request, model_admin):
+        return [('oui', 'Oui'), ('non', 'Non')]
+    
+    def queryset(self, request, queryset):
+        if self.value() == 'oui':
+            return queryset.filter(produit__quantite_stock__lte=F('point_commande'))
+        if self.value() == 'non':
+            return queryset.filter(produit__quantite_stock__gt=F('point_commande'))
+        return queryset
+
+
+@admin.register(PlanReapprovisionnement)
+class PlanReapprovisionnementAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'fournisseur', 'stock_actuel_display', 'point_commande', 'stock_cible', 'quantite_a_commander_display', 'ventes_par_jour_display', 'stock_securite', 'delai_livraison_jours', 'date_calcul']
+    list_filter = [ACommanderFilter, 'fournisseur']
+    search_fields = ['produit__nom', 'produit__code_barre', 'fournisseur__nom']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).avec_stock().select_related('produit__categorie', 'fournisseur')
+    
+    def stock_actuel_display(self, obj):
+        if obj.stock_actuel <= obj.point_commande:
+            return format_html('<span style="color: red; font-weight: bold;">{}</span>', obj.stock_actuel)
+        return obj.stock_actuel
+    stock_actuel_display.short_description = "Stock actuel"
+    stock_actuel_display.admin_order_field = 'stock_actuel'
+    
+    def quantite_a_commander_display(self, obj):
+        if obj.stock_actuel > obj.point_commande:
+            return "-"
+        return obj.quantite_a_commander
+    quantite_a_commander_display.short_description = "À commander"
+    quantite_a_commander_display.admin_order_field = 'quantite_a_commander'
+    
+    def ventes_par_jour_display(self, obj):
+        return f"{obj.ventes_par_jour:.2f} ± {obj.ecart_type_jour:.2f}"
+    ventes_par_jour_display.short_description = "Ventes / jour"
+    ventes_par_jour_display.admin_order_field = 'ventes_par_jour'
+    
+    def has_add_permission(self, request):
+        """Les plans sont calculés par la commande planifier_reapprovisionnement"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # Personnalisation de l'interface d'administration
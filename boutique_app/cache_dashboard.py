@@ -0,0 +1,218 @@
+"""
+Cache versionné du tableau de bord
+
+Le contexte du dashboard est découpé en sections (ventes du jour, de la
+semaine, du mois, de l'année, catalogue, commandes). Chaque section est mise
+en cache avec les numéros de version des données dont elle dépend :
+
+- une section est fraîche tant que son âge est inférieur à ``TTL`` et que ses
+  versions n'ont pas changé ;
+- une section périmée (âge dépassé ou version modifiée par un signal) est
+  encore servie pendant ``PERIODE_OBSOLESCENCE`` secondes pendant qu'elle est
+  recalculée en arrière-plan (stale-while-revalidate) ;
+- au-delà, ou si elle est absente, elle est recalculée immédiatement.
+
+Seules les sections dont les versions ont changé sont recalculées : une vente
+d'il y a 200 jours n'invalide que l'année, une vente du jour invalide toutes
+les périodes. Fonctionne avec n'importe quel cache Django (mémoire locale,
+fichiers, Redis...).
+"""
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+from . import statistiques
+
+
+PARAMETRES_PAR_DEFAUT = {
+    'ALIAS': 'default',
+    'TTL': 60,
+    'PERIODE_OBSOLESCENCE': 300,
+    'RAFRAICHISSEMENT_ASYNCHRONE': True,
+}
+
+PREFIXE = 'dashboard'
+
+
+def parametres():
+    """Paramètres du cache (réglage DASHBOARD_CACHE complété par les valeurs par défaut)"""
+    return {**PARAMETRES_PAR_DEFAUT, **getattr(settings, 'DASHBOARD_CACHE', {})}
+
+
+def _cache():
+    return caches[parametres()['ALIAS']]
+
+
+# ==================== VERSIONS ====================
+
+def _cle_version(nom):
+    return f'{PREFIXE}:version:{nom}'
+
+
+def version(nom):
+    """Numéro de version courant d'un ensemble de données"""
+    # Valeur initiale basée sur l'horloge pour ne jamais réutiliser une ancienne version
+    return _cache().get_or_set(_cle_version(nom), time.time_ns, None)
+
+
+def invalider(*noms):
+    """Incrémente la version des ensembles de données indiqués"""
+    cache = _cache()
+    for nom in noms:
+        try:
+            cache.incr(_cle_version(nom))
+        except ValueError:
+            cache.set(_cle_version(nom), time.time_ns(), None)
+
+
+def invalider_ventes(date=None):
+    """Invalide les périodes de vente qui contiennent la date indiquée"""
+    if date is None:
+        date = timezone.localdate()
+    debuts = statistiques.periodes(timezone.localdate())
+    noms = [nom for nom, debut in debuts.items() if date >= debut]
+    # Une date hors des fenêtres affichées n'invalide rien
+    if noms:
+        invalider(*noms)
+
+
+# ==================== SECTIONS ====================
+
+def _section_periode(nom):
+    def calculer(aujourdhui):
+        ventes = statistiques.ventes_par_periode(aujourdhui, noms=[nom])[nom]
+        return {'total': ventes['total'], 'nombre': ventes['nombre']}
+    return calculer
+
+
+def _section_jour(aujourdhui):
+    ventes = _section_periode('aujourdhui')(aujourdhui)
+    return {
+        'ventes_aujourdhui': ventes['total'],
+        'nombre_ventes_aujourdhui': ventes['nombre'],
+    }
+
+
+def _section_semaine(aujourdhui):
+    ventes = _section_periode('semaine')(aujourdhui)
+    return {
+        'ventes_semaine': ventes['total'],
+        'nombre_ventes_semaine': ventes['nombre'],
+        'ventes_par_jour': statistiques.ventes_par_jour(aujourdhui),
+    }
+
+
+def _section_mois(aujourdhui):
+    ventes = _section_periode('mois')(aujourdhui)
+    return {
+        'ventes_mois': ventes['total'],
+        'nombre_ventes_mois': ventes['nombre'],
+        'top_produits': statistiques.top_produits(aujourdhui),
+    }
+
+
+def _section_annee(aujourdhui):
+    ventes = statistiques.ventes_par_periode(aujourdhui, noms=['annee'])
+    return {
+        'ventes_annee': ventes['annee']['total'],
+        'nombre_ventes_annee': ventes['annee']['nombre'],
+        'prevision_mois': statistiques.prevision_mois(aujourdhui),
+    }
+
+
+def _section_categories(aujourdhui):
+    stats_categories = statistiques.statistiques_categories(aujourdhui)
+    return {
+        'stats_categories': stats_categories,
+        'total_categories': len(stats_categories),
+    }
+
+
+# Section -> (fonction de calcul, versions dont elle dépend)
+SECTIONS = {
+    'jour': (_section_jour, ('aujourdhui',)),
+    'semaine': (_section_semaine, ('semaine',)),
+    'mois': (_section_mois, ('mois',)),
+    'annee': (_section_annee, ('annee',)),
+    'categories': (_section_categories, ('catalogue', 'mois')),
+    'produits': (lambda aujourdhui: statistiques.statistiques_produits(), ('catalogue',)),
+    'reapprovisionnement': (lambda aujourdhui: statistiques.reapprovisionnement(), ('catalogue',)),
+    'commandes': (lambda aujourdhui: statistiques.statistiques_commandes(), ('commandes',)),
+}
+
+
+def _cle_section(section, aujourdhui):
+    return f'{PREFIXE}:section:{section}:{aujourdhui.isoformat()}'
+
+
+def _calculer_section(section, aujourdhui, versions):
+    """Calcule une section et l'enregistre dans le cache"""
+    params = parametres()
+    calculer, dependances = SECTIONS[section]
+    entree = {
+        'valeur': calculer(aujourdhui),
+        'calcule_le': time.time(),
+        'versions': versions,
+    }
+    _cache().set(
+        _cle_section(section, aujourdhui),
+        entree,
+        params['TTL'] + params['PERIODE_OBSOLESCENCE']
+    )
+    return entree['valeur']
+
+
+def _rafraichir_en_arriere_plan(section, aujourdhui, versions):
+    """Recalcule une section périmée sans bloquer la requête en cours"""
+    cache = _cache()
+    verrou = f'{_cle_section(section, aujourdhui)}:verrou'
+    # Un seul rafraîchissement à la fois par section
+    if not cache.add(verrou, True, 30):
+        return
+
+    def rafraichir():
+        try:
+            _calculer_section(section, aujourdhui, versions)
+        finally:
+            cache.delete(verrou)
+
+    if not parametres()['RAFRAICHISSEMENT_ASYNCHRONE']:
+        rafraichir()
+        return
+
+    def rafraichir_thread():
+        try:
+            rafraichir()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=rafraichir_thread, daemon=True).start()
+
+
+def section(nom, aujourdhui):
+    """Retourne une section du dashboard depuis le cache, en la recalculant si besoin"""
+    params = parametres()
+    versions = tuple(version(dependance) for dependance in SECTIONS[nom][1])
+    entree = _cache().get(_cle_section(nom, aujourdhui))
+    if entree is None:
+        return _calculer_section(nom, aujourdhui, versions)
+
+    age = time.time() - entree['calcule_le']
+    if entree['versions'] == versions and age < params['TTL']:
+        return entree['valeur']
+    if age < params['TTL'] + params['PERIODE_OBSOLESCENCE']:
+        _rafraichir_en_arriere_plan(nom, aujourdhui, versions)
+        return entree['valeur']
+    return _calculer_section(nom, aujourdhui, versions)
+
+
+def contexte_dashboard(aujourdhui=None):
+    """Contexte complet du dashboard assemblé à partir des sections en cache"""
+    if aujourdhui is None:
+        aujourdhui = timezone.localdate()
+    contexte = {}
+    for nom in SECTIONS:
+        contexte.update(section(nom, aujourdhui))
+    return contexte
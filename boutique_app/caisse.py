@@ -0,0 +1,252 @@
+"""
+Caisse : lecture des codes-barres et ventes au comptoir
+
+Les codes-barres scannés sont résolus dans un dictionnaire en mémoire
+``code_barre -> ArticleCaisse(id, nom, prix, stock)`` construit en une
+requête à partir des produits actifs : une lecture ne touche pas la base.
+Comme pour les suggestions, chaque processus possède son propre index, mis à
+jour incrémentalement par les signaux de ``Produit`` ; une version partagée
+dans le cache Django signale aux autres processus (autres caisses, autres
+workers) qu'ils doivent reconstruire le leur.
+
+Le stock affiché est indicatif : les commandes web le décrémentent sans
+signal, il est donc relu au plus tard après ``DUREE_VIE`` secondes. La vente
+elle-même le vérifie sous verrou : elle suit le chemin des commandes en ligne
+(panier, ``passer_commande``, ventes et cumuls créés par le signal de
+``Commande``) dans une seule transaction.
+"""
+import threading
+import time
+from collections import namedtuple
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Produit, Panier, ItemPanier
+from . import commandes
+
+
+CLE_VERSION = 'caisse:version'
+DUREE_VIE = 30  # secondes avant de relire les stocks
+SCANS_PAR_REQUETE_MAX = 500
+QUANTITE_MAX = 10000
+NOTE_VENTE_CAISSE = 'Vente en caisse'
+
+ArticleCaisse = namedtuple('ArticleCaisse', ['id', 'nom', 'prix', 'stock'])
+
+
+class CodesInconnus(commandes.ErreurCommande):
+    """Codes-barres sans produit actif"""
+
+    def __init__(self, codes):
+        self.codes = codes
+        super().__init__(f"Code(s)-barres inconnu(s) : {', '.join(codes)}")
+
+
+class ScansInvalides(ValueError):
+    """Liste de codes-barres scannés illisible"""
+
+
+def lire_scans(donnees):
+    """Quantités par code-barres ({code: quantité}) dans l'ordre du premier scan
+
+    ``donnees`` contient ``codes`` (un code par article scanné, répétable)
+    et/ou ``articles`` ([{"code_barre": ..., "quantite": ...}]).
+    """
+    if not isinstance(donnees, dict):
+        raise ScansInvalides("Objet JSON attendu")
+    codes = donnees.get('codes', [])
+    articles = donnees.get('articles', [])
+    if not isinstance(codes, list) or not isinstance(articles, list):
+        raise ScansInvalides("« codes » et « articles » doivent être des listes")
+    if len(codes) + len(articles) > SCANS_PAR_REQUETE_MAX:
+        raise ScansInvalides(f"{SCANS_PAR_REQUETE_MAX} codes-barres au plus par requête")
+
+    quantites = {}
+    lignes = [(code, 1) for code in codes]
+    for article in articles:
+        if not isinstance(article, dict):
+            raise ScansInvalides("Chaque article doit être un objet")
+        lignes.append((article.get('code_barre'), article.get('quantite', 1)))
+    for code, quantite in lignes:
+        if not isinstance(code, (str, int)) or isinstance(code, bool) or not str(code).strip():
+            raise ScansInvalides(f"Code-barres invalide : {code!r}")
+        if not isinstance(quantite, int) or isinstance(quantite, bool) or not 1 <= quantite <= QUANTITE_MAX:
+            raise ScansInvalides(f"Quantité invalide pour {code} : {quantite!r}")
+        code = str(code).strip()
+        quantites[code] = quantites.get(code, 0) + quantite
+    if not quantites:
+        raise ScansInvalides("Aucun code-barres")
+    if any(quantite > QUANTITE_MAX for quantite in quantites.values()):
+        raise ScansInvalides(f"{QUANTITE_MAX} unités au plus par produit")
+    return quantites
+
+
+def version_partagee():
+    return cache.get_or_set(CLE_VERSION, time.time_ns, None)
+
+
+def signaler_modification():
+    """Indique aux autres processus que leur index est périmé"""
+    try:
+        return cache.incr(CLE_VERSION)
+    except ValueError:
+        nouvelle = time.time_ns()
+        cache.set(CLE_VERSION, nouvelle, None)
+        return nouvelle
+
+
+def prix_affichage(prix_vente, prix_promo, en_promotion):
+    """Même règle que Produit.prix_affichage, à partir des colonnes"""
+    return prix_promo if en_promotion and prix_promo else prix_vente
+
+
+class IndexCodesBarres:
+    """Dictionnaire des codes-barres des produits actifs, sûr entre threads"""
+
+    def __init__(self):
+        self._verrou = threading.RLock()
+        self.vider()
+
+    def vider(self):
+        with self._verrou:
+            self._articles = {}   # code-barres -> ArticleCaisse
+            self._codes = {}      # id produit -> code-barres
+            self._version = None
+            self._construit_le = None
+
+    @property
+    def construit(self):
+        return self._construit_le is not None
+
+    def construire(self):
+        """Reconstruit l'index depuis la base (une requête)"""
+        produits = Produit.objects.actifs().exclude(code_barre__isnull=True).exclude(code_barre='').values_list(
+            'id', 'code_barre', 'nom', 'prix_vente', 'prix_promo', 'en_promotion', 'quantite_stock'
+        ).order_by()
+        articles = {}
+        codes = {}
+        for produit_id, code_barre, nom, prix_vente, prix_promo, en_promotion, stock in produits:
+            articles[code_barre] = ArticleCaisse(produit_id, nom, prix_affichage(prix_vente, prix_promo, en_promotion), stock)
+            codes[produit_id] = code_barre
+
+        version = version_partagee()
+        with self._verrou:
+            self._articles = articles
+            self._codes = codes
+            self._version = version
+            self._construit_le = time.monotonic()
+
+    def _a_jour(self):
+        return (
+            self.construit
+            and self._version == version_partagee()
+            and time.monotonic() - self._construit_le < DUREE_VIE
+        )
+
+    def verifier(self):
+        """Construit ou reconstruit l'index s'il est absent, périmé ou modifié ailleurs"""
+        if not self._a_jour():
+            self.construire()
+
+    # ---------- mises à jour incrémentales ----------
+
+    def _apres_modification(self):
+        """Publie la modification ; l'index local reste à jour sans reconstruction"""
+        version = signaler_modification()
+        if self._version is not None:
+            self._version = version
+
+    def _retirer(self, produit_id):
+        code_barre = self._codes.pop(produit_id, None)
+        if code_barre is not None:
+            self._articles.pop(code_barre, None)
+
+    def mettre_a_jour_produit(self, produit):
+        with self._verrou:
+            if self.construit:
+                self._retirer(produit.id)
+                if produit.active and produit.code_barre:
+                    self._articles[produit.code_barre] = ArticleCaisse(
+                        produit.id, produit.nom, produit.prix_affichage, produit.quantite_stock
+                    )
+                    self._codes[produit.id] = produit.code_barre
+            self._apres_modification()
+
+    def retirer_produit(self, produit_id):
+        with self._verrou:
+            if self.construit:
+                self._retirer(produit_id)
+            self._apres_modification()
+
+    def decompter(self, quantites):
+        """Retire localement les quantités vendues ({id produit: quantité}) du stock affiché"""
+        with self._verrou:
+            for produit_id, quantite in quantites.items():
+                code_barre = self._codes.get(produit_id)
+                if code_barre is not None:
+                    article = self._articles[code_barre]
+                    self._articles[code_barre] = article._replace(stock=article.stock - quantite)
+
+    # ---------- interrogation ----------
+
+    def resoudre(self, codes):
+        """Retourne ({code: ArticleCaisse}, [codes inconnus]) sans requête SQL si l'index est à jour"""
+        self.verifier()
+        articles = self._articles
+        trouves = {}
+        inconnus = []
+        for code in codes:
+            article = articles.get(code)
+            if article is None:
+                inconnus.append(code)
+            else:
+                trouves[code] = article
+        return trouves, inconnus
+
+
+index = IndexCodesBarres()
+
+
+def vendre(caissier, quantites_par_code):
+    """Enregistre une vente au comptoir ({code-barres: quantité})
+
+    Le panier est créé au nom du caissier puis validé comme une commande en
+    ligne : même numérotation, même contrôle du stock, mêmes ventes et cumuls.
+
+    Retourne la commande livrée et les articles du ticket
+    ({code-barres: ArticleCaisse}) : noms et prix relus dans la transaction,
+    ceux de la commande, et stock restant après la vente.
+
+    Lève CodesInconnus ou StockInsuffisant ; dans ce cas rien n'est enregistré.
+    """
+    articles, inconnus = index.resoudre(quantites_par_code)
+    if inconnus:
+        raise CodesInconnus(inconnus)
+    quantites = {articles[code].id: quantite for code, quantite in quantites_par_code.items()}
+
+    with transaction.atomic():
+        # Produits relus sous verrou, dans l'ordre des identifiants comme
+        # passer_commande : l'index peut avoir quelques instants de retard
+        vendus = {
+            produit_id: ArticleCaisse(produit_id, nom, prix_affichage(prix_vente, prix_promo, en_promotion), stock)
+            for produit_id, nom, prix_vente, prix_promo, en_promotion, stock in Produit.objects.select_for_update().filter(
+                id__in=quantites, active=True
+            ).order_by('id').values_list('id', 'nom', 'prix_vente', 'prix_promo', 'en_promotion', 'quantite_stock')
+        }
+        if len(vendus) != len(quantites):
+            raise CodesInconnus([code for code, article in articles.items() if article.id not in vendus])
+        panier = Panier.objects.create(utilisateur=caissier)
+        ItemPanier.objects.bulk_create([
+            ItemPanier(panier=panier, produit_id=produit_id, quantite=quantite, prix_unitaire=vendus[produit_id].prix)
+            for produit_id, quantite in quantites.items()
+        ])
+        commande = commandes.passer_commande(
+            panier, statut='livree', date_livraison=timezone.now(), notes=NOTE_VENTE_CAISSE
+        )
+
+    index.decompter(quantites)
+    ticket = {}
+    for code, quantite in quantites_par_code.items():
+        article = vendus[articles[code].id]
+        ticket[code] = article._replace(stock=article.stock - quantite)
+    return commande, ticket
@@ -0,0 +1,167 @@
+"""
+Validation des paniers en commandes
+
+Tout se fait dans une seule transaction et en un nombre de requêtes qui ne
+dépend pas de la taille du panier :
+
+1. le panier est verrouillé (une seule validation à la fois) ;
+2. les produits concernés sont verrouillés dans l'ordre des ids, pour que deux
+   commandes partageant des produits ne se bloquent pas mutuellement ;
+3. le stock est décrémenté en une requête ``UPDATE`` conditionnelle
+   (``quantite_stock >= quantité demandée``) : une survente fait échouer la
+   commande au lieu de ramener le stock à 0 ;
+4. les ventes sont créées en masse puis ajoutées aux cumuls journaliers.
+
+Les commandes créées ailleurs (administration) passent par le même chemin via
+le signal ``creer_ventes_commande`` ; le formulaire de l'administration
+vérifie le stock au préalable (``verifier_stock``) pour afficher l'erreur au
+lieu de la laisser remonter du signal.
+"""
+from django.db import transaction
+from django.db.models import Case, When, Value, F, Q, IntegerField, Prefetch, prefetch_related_objects
+from django.db.models.functions import Now
+from .models import Commande, Panier, ItemPanier, Produit, Vente
+from .cumuls import cumuler_ventes
+from . import cache_dashboard
+
+
+class ErreurCommande(Exception):
+    """Erreur de validation d'une commande"""
+
+
+class PanierVide(ErreurCommande):
+    """Le panier n'existe plus, est déjà validé ou ne contient aucun article"""
+
+    def __init__(self):
+        super().__init__('Votre panier est vide.')
+
+
+class StockInsuffisant(ErreurCommande):
+    """Un produit n'a pas assez de stock pour la quantité demandée"""
+
+    def __init__(self, produit, disponible, demande):
+        self.produit = produit
+        self.disponible = disponible
+        self.demande = demande
+        super().__init__(f'Stock insuffisant pour {produit}. Stock disponible: {disponible}')
+
+
+def decrementer_stock(quantites):
+    """Décrémente le stock de plusieurs produits ({produit_id: quantité}) en une requête
+
+    Les produits doivent être verrouillés par l'appelant. Lève
+    StockInsuffisant si l'un d'eux n'a pas assez de stock.
+    """
+    if not quantites:
+        return
+    condition = Q()
+    for produit_id, quantite in quantites.items():
+        condition |= Q(id=produit_id, quantite_stock__gte=quantite)
+    decrement = Case(
+        *[When(id=produit_id, then=Value(quantite)) for produit_id, quantite in quantites.items()],
+        output_field=IntegerField()
+    )
+    nombre = Produit.objects.filter(condition).update(
+        quantite_stock=F('quantite_stock') - decrement,
+        date_modification=Now(),
+    )
+    if nombre != len(quantites):
+        # Identifier le produit fautif pour le message (la transaction est annulée)
+        stocks = Produit.objects.filter(id__in=quantites).values_list('id', 'nom', 'quantite_stock')
+        for produit_id, nom, stock in stocks:
+            if stock < quantites[produit_id]:
+                raise StockInsuffisant(nom, stock, quantites[produit_id])
+        raise StockInsuffisant('un produit supprimé', 0, 0)
+
+
+def quantites_articles(items):
+    """Quantité totale demandée par produit : {produit_id: quantité}"""
+    quantites = {}
+    for item in items:
+        quantites[item.produit_id] = quantites.get(item.produit_id, 0) + item.quantite
+    return quantites
+
+
+def verrouiller_stock(quantites):
+    """Verrouille les produits dans l'ordre des ids et vérifie leur stock
+
+    À appeler dans une transaction : les verrous sont gardés jusqu'à sa fin.
+    Lève StockInsuffisant.
+    """
+    # Verrouillage dans un ordre constant pour éviter les interblocages
+    verrouilles = list(
+        Produit.objects.select_for_update().filter(id__in=quantites).order_by('id').values_list('id', 'nom', 'quantite_stock')
+    )
+    for produit_id, nom, stock in verrouilles:
+        if stock < quantites[produit_id]:
+            raise StockInsuffisant(nom, stock, quantites[produit_id])
+
+
+def verifier_stock(panier):
+    """Vérifie avant de créer sa commande que le stock couvre le panier
+
+    Pour les formulaires (administration) : les produits restent verrouillés
+    jusqu'à la fin de la transaction de la requête, le signal
+    ``creer_ventes_commande`` ne peut donc plus échouer. Lève StockInsuffisant.
+    """
+    with transaction.atomic():
+        verrouiller_stock(quantites_articles(panier.items.all()))
+
+
+def enregistrer_ventes(commande):
+    """Décrémente le stock et crée les ventes d'une commande, atomiquement"""
+    panier = commande.panier
+    if 'items' in getattr(panier, '_prefetched_objects_cache', {}):
+        items = list(panier.items.all())
+    else:
+        items = list(panier.items.select_related('produit'))
+    if not items:
+        return []
+
+    quantites = quantites_articles(items)
+
+    with transaction.atomic():
+        verrouiller_stock(quantites)
+        decrementer_stock(quantites)
+
+        ventes = Vente.objects.bulk_create([
+            Vente(
+                produit=item.produit,
+                quantite=item.quantite,
+                prix_unitaire=item.prix_unitaire,
+                montant_total=item.sous_total,
+                commande=commande
+            )
+            for item in items
+        ])
+        cumuler_ventes(ventes)
+
+    # Le stock a changé sans passer par Produit.save()
+    cache_dashboard.invalider('catalogue')
+    return ventes
+
+
+def passer_commande(panier, **champs):
+    """Valide un panier en cours : crée la commande, les ventes et décrémente le stock
+
+    ``champs`` complète la commande créée (statut, notes...). Lève PanierVide
+    ou StockInsuffisant ; dans ce cas rien n'est enregistré.
+    """
+    with transaction.atomic():
+        try:
+            panier = Panier.objects.select_for_update().get(pk=panier.pk, statut='en_cours')
+        except Panier.DoesNotExist:
+            raise PanierVide()
+        # Articles chargés une fois pour le total (signal pre_save) et les ventes (post_save)
+        prefetch_related_objects(
+            [panier],
+            Prefetch('items', queryset=ItemPanier.objects.select_related('produit'))
+        )
+        if not panier.items.all():
+            raise PanierVide()
+
+        commande = Commande.objects.create(panier=panier, **{'statut': 'en_attente', **champs})
+
+        panier.statut = 'valide'
+        panier.save(update_fields=['statut', 'date_modification'])
+    return commande
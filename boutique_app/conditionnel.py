@@ -0,0 +1,71 @@
+"""
+Réponses conditionnelles (ETag) du catalogue et de la fiche produit
+
+Un navigateur qui renvoie l'ETag de sa copie (``If-None-Match``) reçoit
+``304 Not Modified`` sans que la page soit recalculée ni rendue. L'ETag est
+une empreinte de ce que la page affiche :
+
+- l'état des produits listés : date de modification la plus récente et
+  nombre (``Produit.date_modification`` est mise à jour par toutes les
+  écritures, y compris les ``update()`` du stock et des notes) ;
+- l'état en base de ce que les produits ne datent pas : catégories et avis
+  (date de modification la plus récente et nombre), table des produits
+  similaires (recréée à chaque calcul : identifiant le plus grand). Lu en
+  base et non dans le cache, propre à chaque processus : une modification
+  faite par un autre processus (administration, calcul de nuit) est vue
+  aussitôt ;
+- le visiteur : utilisateur affiché et jeton CSRF des formulaires.
+
+Pas d'ETag quand des messages flash attendent d'être affichés : ils ne
+doivent pas être perdus dans une réponse 304.
+"""
+import hashlib
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import F, Func, Subquery
+from .models import Categorie, AvisProduit, ProduitSimilaire
+
+
+def _agregat(fonction, champ):
+    # Func et non Max/Count : agrégat sur toute la table, sans GROUP BY ajouté par l'ORM
+    return Func(F(champ), function=fonction)
+
+
+def _sous_requete(queryset, fonction, champ):
+    return Subquery(queryset.order_by().values_list(_agregat(fonction, champ))[:1])
+
+
+def etat_base():
+    """Catégories, avis approuvés et produits similaires, en une requête"""
+    return tuple(Categorie.objects.order_by().values_list(
+        _agregat('MAX', 'date_modification'),
+        _agregat('COUNT', 'id'),
+        _sous_requete(AvisProduit.objects.filter(approuve=True), 'MAX', 'date_modification'),
+        _sous_requete(AvisProduit.objects.filter(approuve=True), 'COUNT', 'id'),
+        _sous_requete(ProduitSimilaire.objects, 'MAX', 'id'),
+    )[:1])
+
+
+def visiteur(request):
+    """Ce que la page affiche du visiteur ; None si des messages attendent"""
+    if len(messages.get_messages(request)):
+        return None
+    utilisateur = request.user
+    identite = (utilisateur.pk, utilisateur.get_username(), utilisateur.first_name) if utilisateur.is_authenticated else None
+    return identite, request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+
+
+def etag(request, etat):
+    """Empreinte de ``etat()``, de l'état en base et du visiteur ; None sans réponse conditionnelle
+
+    ``etat`` (les requêtes sur les produits) n'est appelé que si la page peut
+    être conditionnelle ; il retourne None si la vue doit répondre elle-même
+    (produit introuvable).
+    """
+    personne = visiteur(request)
+    if personne is None:
+        return None
+    valeur = etat()
+    if valeur is None:
+        return None
+    return hashlib.sha256(repr((etat_base(), personne, valeur)).encode()).hexdigest()[:32]
@@ -0,0 +1,140 @@
+"""
+Maintenance de la table de cumuls journaliers des ventes (VenteJournaliere)
+
+Les cumuls sont mis à jour de façon incrémentale à chaque vente créée, modifiée
+ou supprimée et peuvent être reconstruits entièrement depuis l'historique avec
+la commande ``reconstruire_ventes_journalieres``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Count, Min, Max, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Vente, VenteJournaliere
+
+
+def _regrouper(ventes):
+    """Regroupe des ventes par (jour local, produit)"""
+    groupes = defaultdict(lambda: {'quantite': 0, 'montant_total': Decimal('0.00'), 'nombre_ventes': 0})
+    for vente in ventes:
+        cle = (timezone.localdate(vente.date_vente), vente.produit_id, vente.produit.categorie_id)
+        groupe = groupes[cle]
+        groupe['quantite'] += vente.quantite
+        groupe['montant_total'] += vente.montant_total
+        groupe['nombre_ventes'] += 1
+    return groupes
+
+
+def _incrementer(date, produit_id, valeurs):
+    return VenteJournaliere.objects.filter(date=date, produit_id=produit_id).update(
+        quantite=F('quantite') + valeurs['quantite'],
+        montant_total=F('montant_total') + valeurs['montant_total'],
+        nombre_ventes=F('nombre_ventes') + valeurs['nombre_ventes'],
+    )
+
+
+def cumuler_ventes(ventes):
+    """Ajoute des ventes nouvellement créées aux cumuls journaliers
+
+    Nombre de requêtes constant : lecture des cumuls existants, incréments
+    groupés (``bulk_update`` avec des expressions ``F()``) et création groupée
+    des cumuls manquants.
+    """
+    groupes = _regrouper(ventes)
+    if not groupes:
+        return
+    dates = {date for date, produit_id, categorie_id in groupes}
+    produit_ids = {produit_id for date, produit_id, categorie_id in groupes}
+
+    with transaction.atomic():
+        existants = {
+            (cumul.date, cumul.produit_id): cumul
+            for cumul in VenteJournaliere.objects.filter(date__in=dates, produit_id__in=produit_ids).only('id', 'date', 'produit_id')
+        }
+        a_incrementer = []
+        a_creer = []
+        for (date, produit_id, categorie_id), valeurs in groupes.items():
+            cumul = existants.get((date, produit_id))
+            if cumul is None:
+                a_creer.append(VenteJournaliere(date=date, produit_id=produit_id, categorie_id=categorie_id, **valeurs))
+                continue
+            cumul.quantite = F('quantite') + valeurs['quantite']
+            cumul.montant_total = F('montant_total') + valeurs['montant_total']
+            cumul.nombre_ventes = F('nombre_ventes') + valeurs['nombre_ventes']
+            a_incrementer.append(cumul)
+
+        if a_incrementer:
+            VenteJournaliere.objects.bulk_update(a_incrementer, ['quantite', 'montant_total', 'nombre_ventes'])
+        if not a_creer:
+            return
+        try:
+            with transaction.atomic():
+                VenteJournaliere.objects.bulk_create(a_creer)
+        except IntegrityError:
+            # Cumuls créés entre-temps par une autre requête : ligne par ligne
+            for cumul in a_creer:
+                valeurs = {
+                    'quantite': cumul.quantite,
+                    'montant_total': cumul.montant_total,
+                    'nombre_ventes': cumul.nombre_ventes,
+                }
+                if _incrementer(cumul.date, cumul.produit_id, valeurs):
+                    continue
+                try:
+                    with transaction.atomic():
+                        cumul.save(force_insert=True)
+                except IntegrityError:
+                    _incrementer(cumul.date, cumul.produit_id, valeurs)
+
+
+def decompter_vente(vente):
+    """Retire une vente supprimée des cumuls journaliers"""
+    date = timezone.localdate(vente.date_vente)
+    cumuls = VenteJournaliere.objects.filter(date=date, produit_id=vente.produit_id)
+    cumuls.update(
+        quantite=F('quantite') - vente.quantite,
+        montant_total=F('montant_total') - vente.montant_total,
+        nombre_ventes=F('nombre_ventes') - 1,
+    )
+    cumuls.filter(nombre_ventes__lte=0).delete()
+
+
+def reconstruire_cumuls(jours_par_lot=31):
+    """Reconstruit tous les cumuls depuis l'historique des ventes, par lots de jours"""
+    nombre_lignes = 0
+    with transaction.atomic():
+        VenteJournaliere.objects.all().delete()
+        bornes = Vente.objects.aggregate(debut=Min('date_vente'), fin=Max('date_vente'))
+        if bornes['debut'] is None:
+            return nombre_lignes
+
+        debut = timezone.localdate(bornes['debut'])
+        fin = timezone.localdate(bornes['fin'])
+        while debut <= fin:
+            fin_lot = debut + timedelta(days=jours_par_lot)
+            lignes = Vente.objects.entre(
+                debut, fin_lot - timedelta(days=1)
+            ).annotate(
+                jour=TruncDate('date_vente')
+            ).values('jour', 'produit_id', 'produit__categorie_id').annotate(
+                total_quantite=Sum('quantite'),
+                total_montant=Sum('montant_total'),
+                total_ventes=Count('id')
+            ).order_by()
+            cumuls = [
+                VenteJournaliere(
+                    date=ligne['jour'],
+                    produit_id=ligne['produit_id'],
+                    categorie_id=ligne['produit__categorie_id'],
+                    quantite=ligne['total_quantite'],
+                    montant_total=ligne['total_montant'],
+                    nombre_ventes=ligne['total_ventes'],
+                )
+                for ligne in lignes
+            ]
+            VenteJournaliere.objects.bulk_create(cumuls, batch_size=1000)
+            nombre_lignes += len(cumuls)
+            debut = fin_lot
+    return nombre_lignes
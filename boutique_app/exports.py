@@ -0,0 +1,222 @@
+"""
+Exports des ventes
+
+Les ventes sont lues par lots avec ``values_list(...).iterator()`` (curseur
+côté serveur sous PostgreSQL) et écrites au fil de l'eau : la mémoire
+utilisée ne dépend pas du nombre de lignes exportées.
+
+- CSV : produit par morceaux pour une ``StreamingHttpResponse`` ;
+- Parquet (pyarrow, optionnel) : un fichier par mois
+  (``mois=AAAA-MM/ventes.parquet``, partitionnement « hive » lu directement par
+  pandas, pyarrow, DuckDB ou Spark), écrit par groupes de lignes.
+"""
+import csv
+import os
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import Vente
+
+
+COLONNES = ['Date', 'Produit', 'Catégorie', 'Quantité', 'Prix unitaire', 'Montant total']
+CHAMPS = ['date_vente', 'produit__nom', 'produit__categorie__nom', 'quantite', 'prix_unitaire', 'montant_total']
+
+TAILLE_LOT = 2000          # lignes lues par aller-retour avec la base
+LIGNES_PAR_MORCEAU = 500   # lignes CSV envoyées ensemble au client
+
+
+class FiltresInvalides(ValueError):
+    """Paramètre de filtre d'export illisible"""
+
+
+def filtres_export(parametres):
+    """Lit les filtres ``debut``, ``fin`` (AAAA-MM-JJ, inclus) et ``categorie`` d'une requête"""
+    filtres = {}
+    for nom in ('debut', 'fin'):
+        valeur = parametres.get(nom)
+        if valeur:
+            try:
+                date = parse_date(valeur)
+            except ValueError:
+                date = None
+            if date is None:
+                raise FiltresInvalides(f'Date invalide pour « {nom} » : {valeur}')
+            filtres[nom] = date
+    categorie = parametres.get('categorie')
+    if categorie:
+        try:
+            filtres['categorie'] = int(categorie)
+        except ValueError:
+            raise FiltresInvalides(f'Catégorie invalide : {categorie}')
+    if 'debut' in filtres and 'fin' in filtres and filtres['debut'] > filtres['fin']:
+        raise FiltresInvalides('La date de début est postérieure à la date de fin')
+    return filtres
+
+
+def ventes_filtrees(debut=None, fin=None, categorie=None):
+    """Ventes d'une période (jours locaux inclus) et d'une catégorie, les plus récentes d'abord"""
+    ventes = Vente.objects.entre(debut, fin)
+    if categorie:
+        ventes = ventes.filter(produit__categorie_id=categorie)
+    return ventes.order_by('-date_vente', '-id')
+
+
+def lignes_ventes(ventes, taille_lot=TAILLE_LOT):
+    """Lignes d'export (tuples) lues par lots, sans instancier de modèles"""
+    for date_vente, produit, categorie, quantite, prix_unitaire, montant_total in (
+        ventes.values_list(*CHAMPS).iterator(chunk_size=taille_lot)
+    ):
+        yield (
+            timezone.localtime(date_vente).strftime('%Y-%m-%d %H:%M'),
+            produit,
+            categorie,
+            quantite,
+            float(prix_unitaire),
+            float(montant_total),
+        )
+
+
+class Tampon:
+    """Pseudo-fichier qui retourne ce qu'on y écrit (pour csv.writer)"""
+
+    def write(self, valeur):
+        return valeur
+
+
+def csv_ventes(ventes, lignes_par_morceau=LIGNES_PAR_MORCEAU):
+    """Génère le CSV des ventes par morceaux de texte"""
+    writer = csv.writer(Tampon())
+    yield writer.writerow(COLONNES)
+    morceau = []
+    for ligne in lignes_ventes(ventes):
+        morceau.append(writer.writerow(ligne))
+        if len(morceau) >= lignes_par_morceau:
+            yield ''.join(morceau)
+            morceau = []
+    if morceau:
+        yield ''.join(morceau)
+
+
+def nom_fichier(prefixe, extension, debut=None, fin=None):
+    """Nom de fichier d'export sans caractère spécial"""
+    morceaux = [prefixe]
+    if debut or fin:
+        morceaux.append(debut.strftime('%Y%m%d') if debut else 'origine')
+        morceaux.append(fin.strftime('%Y%m%d') if fin else 'aujourdhui')
+    else:
+        morceaux.append(timezone.localdate().strftime('%Y%m%d'))
+    return f"{'_'.join(morceaux)}.{extension}"
+
+
+# ==================== PARQUET ====================
+
+CHAMPS_PARQUET = [
+    'id', 'date_vente', 'quantite', 'prix_unitaire', 'montant_total',
+    'produit_id', 'produit__nom', 'produit__code_barre', 'produit__prix_achat',
+    'produit__categorie_id', 'produit__categorie__nom',
+    'commande_id', 'commande__numero_commande', 'commande__statut',
+]
+COLONNES_PARQUET = [
+    'vente_id', 'date_vente', 'quantite', 'prix_unitaire', 'montant_total',
+    'produit_id', 'produit', 'code_barre', 'prix_achat',
+    'categorie_id', 'categorie',
+    'commande_id', 'numero_commande', 'statut_commande',
+]
+TAILLE_GROUPE_PARQUET = 50000  # lignes par groupe de lignes (row group)
+NOM_FICHIER_PARQUET = 'ventes.parquet'
+
+
+class PyarrowIndisponible(ImportError):
+    """pyarrow n'est pas installé"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise PyarrowIndisponible("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def schema_parquet():
+    """Schéma Arrow des ventes exportées"""
+    pa = _pyarrow()
+    return pa.schema([
+        ('vente_id', pa.int64()),
+        ('date_vente', pa.timestamp('us', tz='UTC')),
+        ('quantite', pa.int32()),
+        ('prix_unitaire', pa.float64()),
+        ('montant_total', pa.float64()),
+        ('produit_id', pa.int64()),
+        ('produit', pa.string()),
+        ('code_barre', pa.string()),
+        ('prix_achat', pa.float64()),
+        ('categorie_id', pa.int64()),
+        ('categorie', pa.string()),
+        ('commande_id', pa.int64()),
+        ('numero_commande', pa.string()),
+        ('statut_commande', pa.string()),
+    ])
+
+
+COLONNES_MONTANTS = {'prix_unitaire', 'montant_total', 'prix_achat'}
+
+
+def _groupe(pa, schema, lignes):
+    """Groupe de lignes Arrow construit colonne par colonne"""
+    colonnes = list(zip(*lignes))
+    tableaux = []
+    for nom, valeurs in zip(COLONNES_PARQUET, colonnes):
+        if nom in COLONNES_MONTANTS:
+            valeurs = [float(v) if v is not None else None for v in valeurs]
+        tableaux.append(pa.array(valeurs, type=schema.field(nom).type))
+    return pa.RecordBatch.from_arrays(tableaux, schema=schema)
+
+
+def exporter_parquet(dossier, debut=None, fin=None, categorie=None, taille_groupe=TAILLE_GROUPE_PARQUET):
+    """Écrit les ventes filtrées dans ``dossier``, un fichier Parquet par mois
+
+    Les ventes sont lues dans l'ordre chronologique : un seul fichier est
+    ouvert à la fois et au plus ``taille_groupe`` lignes sont en mémoire.
+    Retourne la liste des (mois, chemin, nombre de lignes) écrits.
+    """
+    pa = _pyarrow()
+    schema = schema_parquet()
+    ventes = ventes_filtrees(debut, fin, categorie).order_by('date_vente', 'id')
+
+    fichiers = []
+    etat = {'mois': None, 'writer': None, 'chemin': None, 'lignes': 0}
+    lot = []
+
+    def vider_lot():
+        if lot:
+            etat['writer'].write_batch(_groupe(pa, schema, lot), row_group_size=taille_groupe)
+            etat['lignes'] += len(lot)
+            lot.clear()
+
+    def fermer_fichier():
+        if etat['writer'] is not None:
+            vider_lot()
+            etat['writer'].close()
+            etat['writer'] = None
+            fichiers.append((etat['mois'], etat['chemin'], etat['lignes']))
+
+    try:
+        for ligne in ventes.values_list(*CHAMPS_PARQUET).iterator(chunk_size=TAILLE_LOT):
+            mois = timezone.localtime(ligne[1]).strftime('%Y-%m')
+            if mois != etat['mois']:
+                fermer_fichier()
+                partition = os.path.join(dossier, f'mois={mois}')
+                os.makedirs(partition, exist_ok=True)
+                chemin = os.path.join(partition, NOM_FICHIER_PARQUET)
+                etat.update(mois=mois, chemin=chemin, lignes=0,
+                            writer=pa.parquet.ParquetWriter(chemin, schema, compression='snappy'))
+            lot.append(ligne)
+            if len(lot) >= taille_groupe:
+                vider_lot()
+        fermer_fichier()
+    finally:
+        # Fichier en cours laissé ouvert par une erreur
+        if etat['writer'] is not None:
+            etat['writer'].close()
+    return fichiers
@@ -3,7 +3,8 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column, Submit
-from .models import Produit, ItemPanier
+from .models import Produit, ItemPanier, Commande
+from .commandes import verifier_stock, ErreurCommande
 
 
 class InscriptionForm(UserCreationForm):
@@ -43,3 +44,35 @@ class AjoutPanierForm(forms.ModelForm):
         fields = ['quantite']
 
 
+class ImportProduitsForm(forms.Form):
+    fichier = forms.FileField(
+        label="Fichier",
+        help_text="CSV (séparateur « ; » ou « , », UTF-8) ou Excel .xlsx. Colonne code_barre obligatoire ; "
+                  "colonnes reconnues : nom, description, categorie, fournisseur, prix_achat, prix_vente, "
+                  "prix_promo, en_promotion, quantite_stock, quantite_minimum, active."
+    )
+    simulation = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Simulation",
+        help_text="Valider le fichier et afficher le rapport sans rien enregistrer"
+    )
+
+
+class CommandeAdminForm(forms.ModelForm):
+    """Commande saisie dans l'administration : stock vérifié avant l'enregistrement"""
+
+    class Meta:
+        model = Commande
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        panier = cleaned_data.get('panier')
+        if self.instance._state.adding and panier is not None:
+            # Les ventes sont créées par le signal post_save : l'erreur doit survenir ici
+            try:
+                verifier_stock(panier)
+            except ErreurCommande as erreur:
+                raise forms.ValidationError(str(erreur))
+        return cleaned_data
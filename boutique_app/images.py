@@ -0,0 +1,171 @@
+"""
+Images dérivées des produits et catégories
+
+Les images téléversées sont servies en plusieurs tailles au lieu de
+l'original : chaque variante (``VARIANTES``, côté maximal en pixels, sans
+agrandissement) est enregistrée en WebP et en JPEG sous
+``MEDIA_ROOT/derives/``. Le nom des fichiers dérive d'une empreinte SHA-256 du
+contenu de l'original : une même image n'est traitée qu'une fois, et une
+image remplacée produit de nouvelles URL (cache navigateur sans expiration
+possible).
+
+Les dérivés sont générés à l'enregistrement d'un produit ou d'une catégorie,
+sinon au premier affichage, et la commande ``generer_images_derivees`` crée
+ceux des images existantes en parallèle. L'empreinte et les dimensions de
+chaque image sont gardées dans le cache Django : un affichage ne relit pas le
+fichier. Sur un cache vide (processus redémarré), elles sont retrouvées à
+partir des noms des dérivés déjà écrits : l'original est relu et haché, les
+dimensions lues dans l'en-tête des dérivés, sans redimensionnement. Les gabarits utilisent ``{% image_responsive %}`` (``srcset``,
+``loading="lazy"``).
+"""
+import hashlib
+import io
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+VARIANTES = {
+    'vignette': 200,    # panier, commandes, administration
+    'grille': 600,      # cartes du catalogue
+    'detail': 1200,     # fiche produit
+}
+
+# Extension -> (format Pillow, options d'enregistrement)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DOSSIER = 'derives'
+CLE_CACHE = 'images:derivees:'
+DUREE_CACHE_ERREUR = 3600  # secondes avant de retenter une image illisible
+ILLISIBLE = 'illisible'
+
+
+class ImageIllisible(ValueError):
+    """Fichier absent ou qui n'est pas une image"""
+
+
+def nom_derive(empreinte, variante, extension):
+    return f'{DOSSIER}/{empreinte[:2]}/{empreinte}-{variante}.{extension}'
+
+
+def _fond_blanc(image):
+    """Image RGB, la transparence étant posée sur un fond blanc (JPEG)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        fond = Image.new('RGB', image.size, (255, 255, 255))
+        fond.paste(image, mask=image.getchannel('A'))
+        return fond
+    return image.convert('RGB')
+
+
+def _dimensions(chemin):
+    """Dimensions d'un dérivé existant (en-tête seulement, sans décoder les pixels)"""
+    with default_storage.open(chemin, 'rb') as fichier:
+        with Image.open(fichier) as image:
+            return image.size
+
+
+def generer(nom, forcer=False):
+    """Crée les dérivés manquants de l'image ``nom`` (chemin dans le stockage)
+
+    Retourne {'empreinte', 'dimensions': {variante: (largeur, hauteur)}, 'crees'}.
+    Les dérivés existants ne sont pas recalculés : leurs dimensions sont lues
+    dans leur en-tête, l'original n'est décodé que s'il en manque.
+    Sans accès à la base : peut s'exécuter dans un processus de travail.
+    """
+    try:
+        with default_storage.open(nom, 'rb') as fichier:
+            contenu = fichier.read()
+    except OSError as erreur:
+        raise ImageIllisible(f"{nom} : {erreur}")
+    empreinte = hashlib.sha256(contenu).hexdigest()[:32]
+
+    dimensions = {}
+    manquantes = {}
+    for variante in VARIANTES:
+        chemins = {extension: nom_derive(empreinte, variante, extension) for extension in FORMATS}
+        if forcer:
+            for chemin in chemins.values():
+                if default_storage.exists(chemin):
+                    default_storage.delete(chemin)
+        absents = [extension for extension, chemin in chemins.items() if not default_storage.exists(chemin)]
+        if absents:
+            manquantes[variante] = absents
+        else:
+            dimensions[variante] = _dimensions(chemins['jpg'])
+
+    crees = 0
+    if manquantes:
+        try:
+            original = Image.open(io.BytesIO(contenu))
+            original.load()
+        except (OSError, UnidentifiedImageError) as erreur:
+            raise ImageIllisible(f"{nom} : {erreur}")
+        # Orientation EXIF appliquée aux pixels (les dérivés n'ont plus de métadonnées)
+        original = _fond_blanc(ImageOps.exif_transpose(original))
+
+        for variante, extensions in manquantes.items():
+            image = original.copy()
+            image.thumbnail((VARIANTES[variante], VARIANTES[variante]), Image.LANCZOS)
+            dimensions[variante] = image.size
+            for extension in extensions:
+                format_pillow, options = FORMATS[extension]
+                tampon = io.BytesIO()
+                image.save(tampon, format_pillow, **options)
+                default_storage.save(nom_derive(empreinte, variante, extension), ContentFile(tampon.getvalue()))
+                crees += 1
+    return {'empreinte': empreinte, 'dimensions': {variante: dimensions[variante] for variante in VARIANTES}, 'crees': crees}
+
+
+def memoriser(nom, resultat):
+    """Garde l'empreinte et les dimensions des dérivés de ``nom`` (sans expiration)"""
+    cache.set(CLE_CACHE + nom, {'empreinte': resultat['empreinte'], 'dimensions': resultat['dimensions']}, None)
+
+
+def preparer(nom):
+    """Génère les dérivés d'une image si nécessaire ; retourne leurs informations ou None"""
+    informations = cache.get(CLE_CACHE + nom)
+    if isinstance(informations, dict) and informations['dimensions'].keys() != VARIANTES.keys():
+        informations = None  # variantes modifiées depuis la mise en cache
+    if informations is None:
+        try:
+            informations = generer(nom)
+        except ImageIllisible:
+            cache.set(CLE_CACHE + nom, ILLISIBLE, DUREE_CACHE_ERREUR)
+            return None
+        memoriser(nom, informations)
+    if informations == ILLISIBLE:
+        return None
+    return informations
+
+
+class Derivees:
+    """URL et dimensions des dérivés d'une image"""
+
+    def __init__(self, empreinte, dimensions):
+        self.empreinte = empreinte
+        self.dimensions = dimensions
+
+    def url(self, variante, extension='jpg'):
+        return default_storage.url(nom_derive(self.empreinte, variante, extension))
+
+    def srcset(self, variantes, extension):
+        """``url largeurw, ...`` sans doublon (une petite image donne des variantes identiques)"""
+        largeurs = {}
+        for variante in variantes:
+            largeurs.setdefault(self.dimensions[variante][0], variante)
+        return ', '.join(f'{self.url(variante, extension)} {largeur}w' for largeur, variante in sorted(largeurs.items()))
+
+
+def derivees(fichier):
+    """Dérivés d'un ImageField (``FieldFile``), générés au premier appel ; None si indisponibles"""
+    if not fichier:
+        return None
+    informations = preparer(fichier.name)
+    if informations is None:
+        return None
+    return Derivees(informations['empreinte'], informations['dimensions'])
@@ -0,0 +1,486 @@
+"""
+Import en masse des produits (CSV ou Excel)
+
+Le fichier est lu au fil de l'eau (ligne à ligne pour le CSV, mode
+``read_only`` d'openpyxl pour l'Excel) et traité par lots de
+``TAILLE_LOT`` lignes. Pour chaque lot :
+
+1. les lignes sont validées (les erreurs sont relevées avec leur numéro de
+   ligne, les lignes valides sont conservées) ;
+2. les produits existants sont chargés en une requête par ``code_barre`` ;
+3. les catégories et fournisseurs inconnus sont créés en masse ;
+4. les nouveaux produits sont insérés et les produits modifiés mis à jour
+   par des requêtes préparées exécutées en masse (``executemany``) : seules
+   les colonnes qui changent sont écrites, les cellules vides sont ignorées.
+
+Tout l'import se fait dans une transaction. En mode simulation, elle est
+annulée à la fin : le rapport est identique à celui d'un import réel mais la
+base n'est pas modifiée.
+
+Ces écritures n'envoient pas de signaux : l'index de recherche est mis à
+jour par lot (produits créés ou renommés seulement), les statistiques du
+catalogue, l'index des suggestions et celui des codes-barres de la caisse
+sont invalidés une fois à la fin.
+"""
+import csv
+import io
+import os
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+from .models import Produit, Categorie, Fournisseur
+from .recherche import normaliser, indexer_produits
+from . import cache_dashboard
+from . import suggestions
+from . import caisse
+
+
+TAILLE_LOT = 2000
+EXTENSIONS_CSV = ('.csv', '.txt')
+EXTENSIONS_EXCEL = ('.xlsx', '.xlsm')
+
+# Colonnes reconnues -> type de valeur
+COLONNES = {
+    'code_barre': 'texte',
+    'nom': 'texte',
+    'description': 'texte',
+    'categorie': 'texte',
+    'fournisseur': 'texte',
+    'prix_achat': 'prix',
+    'prix_vente': 'prix',
+    'prix_promo': 'prix',
+    'en_promotion': 'booleen',
+    'quantite_stock': 'entier',
+    'quantite_minimum': 'entier',
+    'active': 'booleen',
+}
+# Autres intitulés acceptés (après normalisation : minuscules sans accents, « _ » entre les mots)
+ALIAS = {
+    'code_barres': 'code_barre',
+    'ean': 'code_barre',
+    'produit': 'nom',
+    'stock': 'quantite_stock',
+    'stock_minimum': 'quantite_minimum',
+    'actif': 'active',
+    'promotion': 'en_promotion',
+}
+OBLIGATOIRES_CREATION = ('nom', 'categorie', 'prix_achat', 'prix_vente')
+CHAMPS_PRODUIT = [colonne for colonne in COLONNES if colonne not in ('code_barre', 'categorie', 'fournisseur')]
+
+LONGUEURS = {
+    'code_barre': Produit._meta.get_field('code_barre').max_length,
+    'nom': Produit._meta.get_field('nom').max_length,
+    'categorie': Categorie._meta.get_field('nom').max_length,
+    'fournisseur': Fournisseur._meta.get_field('nom').max_length,
+}
+VRAI = {'1', 'oui', 'o', 'vrai', 'true', 'yes', 'x'}
+FAUX = {'0', 'non', 'n', 'faux', 'false', 'no'}
+
+
+class FichierInvalide(ValueError):
+    """Fichier d'import illisible ou sans colonne code_barre"""
+
+
+class OpenpyxlIndisponible(ImportError):
+    """openpyxl n'est pas installé"""
+
+
+class LigneInvalide(ValueError):
+    """Valeur refusée dans une ligne du fichier"""
+
+
+class RapportImport:
+    """Résultat d'un import : compteurs et erreurs par ligne"""
+
+    def __init__(self, simulation=False):
+        self.simulation = simulation
+        self.lignes = 0
+        self.crees = 0
+        self.modifies = 0
+        self.inchanges = 0
+        self.categories_creees = 0
+        self.fournisseurs_crees = 0
+        self.erreurs = []  # (numéro de ligne, message)
+        self.duree = 0.0
+
+    @property
+    def lignes_par_seconde(self):
+        return self.lignes / self.duree if self.duree else 0
+
+    def resume(self):
+        prefixe = "Simulation : " if self.simulation else ""
+        return (
+            f"{prefixe}{self.lignes} ligne(s) lue(s), {self.crees} produit(s) créé(s), "
+            f"{self.modifies} modifié(s), {self.inchanges} inchangé(s), {len(self.erreurs)} erreur(s) ; "
+            f"{self.categories_creees} catégorie(s) et {self.fournisseurs_crees} fournisseur(s) créé(s)"
+        )
+
+
+# ==================== LECTURE ====================
+
+def _colonne(entete):
+    cle = '_'.join(normaliser(str(entete or '')).replace('-', ' ').split())
+    cle = ALIAS.get(cle, cle)
+    return cle if cle in COLONNES else None
+
+
+def _colonnes(entetes):
+    """Nom de colonne reconnu (ou None) pour chaque en-tête ; code_barre obligatoire"""
+    colonnes = [_colonne(entete) for entete in entetes]
+    if 'code_barre' not in colonnes:
+        raise FichierInvalide("Le fichier doit contenir une colonne « code_barre »")
+    return colonnes
+
+
+def _lignes(rangees, debut=2):
+    """(numéro de ligne, {colonne: valeur}) à partir des rangées, en-tête compris"""
+    rangees = iter(rangees)
+    try:
+        entetes = next(rangees)
+    except StopIteration:
+        raise FichierInvalide("Le fichier est vide")
+    colonnes = _colonnes(entetes)
+    for numero, rangee in enumerate(rangees, start=debut):
+        valeurs = {
+            colonne: valeur for colonne, valeur in zip(colonnes, rangee)
+            if colonne is not None and valeur is not None and str(valeur).strip() != ''
+        }
+        if valeurs:
+            yield numero, valeurs
+
+
+def lire_csv(fichier):
+    """Lignes d'un CSV (fichier binaire) ; séparateur « ; », « , » ou tabulation détecté sur l'en-tête"""
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    try:
+        entete = texte.readline()
+    except UnicodeDecodeError:
+        raise FichierInvalide("Le fichier CSV doit être encodé en UTF-8")
+    separateur = max(';,\t', key=entete.count)
+    try:
+        yield from _lignes(csv.reader(chain([entete], texte), delimiter=separateur))
+    except UnicodeDecodeError:
+        raise FichierInvalide("Le fichier CSV doit être encodé en UTF-8")
+    finally:
+        # Le fichier appartient à l'appelant : ne pas le fermer avec le wrapper
+        texte.detach()
+
+
+def _openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise OpenpyxlIndisponible("L'import Excel nécessite openpyxl (pip install openpyxl)")
+    return openpyxl
+
+
+def lire_excel(fichier):
+    """Lignes de la première feuille d'un classeur Excel, lues sans charger le classeur en mémoire"""
+    openpyxl = _openpyxl()
+    try:
+        classeur = openpyxl.load_workbook(fichier, read_only=True, data_only=True)
+    except Exception as erreur:
+        raise FichierInvalide(f"Classeur Excel illisible : {erreur}")
+    try:
+        yield from _lignes(classeur.active.iter_rows(values_only=True))
+    finally:
+        classeur.close()
+
+
+def lire_fichier(fichier, nom):
+    """Lignes d'un fichier CSV ou Excel selon l'extension de ``nom``"""
+    extension = os.path.splitext(nom)[1].lower()
+    if extension in EXTENSIONS_CSV:
+        return lire_csv(fichier)
+    if extension in EXTENSIONS_EXCEL:
+        _openpyxl()
+        return lire_excel(fichier)
+    raise FichierInvalide(f"Format non pris en charge : « {extension or nom} » (CSV ou XLSX attendu)")
+
+
+# ==================== VALIDATION ====================
+
+def _texte(valeur, colonne):
+    if isinstance(valeur, float) and valeur.is_integer():
+        # Code-barres saisi comme un nombre dans Excel
+        valeur = int(valeur)
+    texte = str(valeur).strip()
+    longueur = LONGUEURS.get(colonne)
+    if longueur and len(texte) > longueur:
+        raise LigneInvalide(f"{colonne} : {longueur} caractères maximum")
+    return texte
+
+
+def _prix(valeur, colonne):
+    if isinstance(valeur, str):
+        valeur = valeur.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        prix = Decimal(str(valeur)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise LigneInvalide(f"{colonne} : « {valeur} » n'est pas un prix")
+    if prix < Decimal('0.01') or prix >= Decimal('1E8'):
+        raise LigneInvalide(f"{colonne} : prix hors limites ({prix})")
+    return prix
+
+
+def _entier(valeur, colonne):
+    try:
+        nombre = Decimal(str(valeur).strip())
+    except InvalidOperation:
+        raise LigneInvalide(f"{colonne} : « {valeur} » n'est pas un nombre entier")
+    if nombre != nombre.to_integral_value() or nombre < 0:
+        raise LigneInvalide(f"{colonne} : entier positif attendu ({valeur})")
+    return int(nombre)
+
+
+def _booleen(valeur, colonne):
+    if isinstance(valeur, bool):
+        return valeur
+    texte = normaliser(str(valeur).strip())
+    if texte in VRAI:
+        return True
+    if texte in FAUX:
+        return False
+    raise LigneInvalide(f"{colonne} : « {valeur} » n'est ni oui ni non")
+
+
+CONVERTISSEURS = {'texte': _texte, 'prix': _prix, 'entier': _entier, 'booleen': _booleen}
+
+
+def valider_ligne(brute):
+    """Valeurs converties d'une ligne ; lève LigneInvalide"""
+    valeurs = {colonne: CONVERTISSEURS[COLONNES[colonne]](valeur, colonne) for colonne, valeur in brute.items()}
+    if not valeurs.get('code_barre'):
+        raise LigneInvalide("code_barre manquant")
+    return valeurs
+
+
+# ==================== ÉCRITURE ====================
+
+class _Referentiels:
+    """Catégories et fournisseurs par nom (sans tenir compte de la casse ni des accents), créés à la demande"""
+
+    def __init__(self):
+        self.objets = {'categorie': {}, 'fournisseur': {}}
+        self._cles = {}
+        for categorie in Categorie.objects.all():
+            self.objets['categorie'][normaliser(categorie.nom)] = categorie
+        for fournisseur in Fournisseur.objects.order_by('id'):
+            self.objets['fournisseur'].setdefault(normaliser(fournisseur.nom), fournisseur)
+
+    def _cle(self, nom):
+        # Les mêmes noms reviennent à chaque ligne : normalisation mémorisée
+        cle = self._cles.get(nom)
+        if cle is None:
+            cle = self._cles[nom] = normaliser(nom)
+        return cle
+
+    def trouver(self, colonne, nom):
+        return self.objets[colonne][self._cle(nom)]
+
+    def creer_manquants(self, lignes, rapport):
+        """Crée en deux requêtes au plus les catégories et fournisseurs cités et inconnus"""
+        manquants = {'categorie': {}, 'fournisseur': {}}
+        for _, valeurs in lignes:
+            for colonne, noms in manquants.items():
+                nom = valeurs.get(colonne)
+                if nom and self._cle(nom) not in self.objets[colonne]:
+                    noms.setdefault(self._cle(nom), nom)
+        for modele, colonne in ((Categorie, 'categorie'), (Fournisseur, 'fournisseur')):
+            noms = manquants[colonne]
+            if noms:
+                for objet in modele.objects.bulk_create([modele(nom=nom) for nom in noms.values()]):
+                    self.objets[colonne][self._cle(objet.nom)] = objet
+        rapport.categories_creees += len(manquants['categorie'])
+        rapport.fournisseurs_crees += len(manquants['fournisseur'])
+
+
+class _Ecriture:
+    """INSERT et UPDATE des produits avec ``executemany``
+
+    ``bulk_create`` et ``bulk_update`` instancient et préparent chaque champ
+    de chaque produit (et ``bulk_update`` génère un ``CASE`` par colonne) :
+    mesurés à 150 et 300 µs par ligne sous SQLite, contre quelques µs pour une
+    requête préparée exécutée une fois par ligne.
+    """
+
+    def __init__(self, maintenant):
+        # Connexion résolue une fois : ``django.db.connection`` est un proxy coûteux à chaque accès
+        self.connexion = connections[DEFAULT_DB_ALIAS]
+        self.table = self.connexion.ops.quote_name(Produit._meta.db_table)
+        self.champs = {
+            champ.attname: champ for champ in Produit._meta.concrete_fields if not champ.primary_key
+        }
+        self.defauts = {}
+        for attname, champ in self.champs.items():
+            if getattr(champ, 'auto_now', False) or getattr(champ, 'auto_now_add', False):
+                self.defauts[attname] = maintenant
+            else:
+                self.defauts[attname] = champ.get_default()
+        self.maintenant = maintenant
+
+    def _preparer(self, attname, valeur):
+        return self.champs[attname].get_db_prep_save(valeur, self.connexion)
+
+    def inserer(self, lignes):
+        """Insère des produits ({attname: valeur}, valeurs par défaut pour les autres champs)"""
+        if not lignes:
+            return
+        colonnes = list(self.champs)
+        defauts = {attname: self._preparer(attname, valeur) for attname, valeur in self.defauts.items()}
+        parametres = [
+            [self._preparer(attname, ligne[attname]) if attname in ligne else defauts[attname] for attname in colonnes]
+            for ligne in lignes
+        ]
+        noms = ', '.join(self.connexion.ops.quote_name(self.champs[attname].column) for attname in colonnes)
+        marqueurs = ', '.join(['%s'] * len(colonnes))
+        with self.connexion.cursor() as curseur:
+            curseur.executemany(f'INSERT INTO {self.table} ({noms}) VALUES ({marqueurs})', parametres)
+
+    def mettre_a_jour(self, modifications):
+        """Met à jour les produits ({id: {attname: valeur}}), une requête préparée par jeu de colonnes"""
+        par_colonnes = defaultdict(list)
+        for produit_id, valeurs in modifications.items():
+            attnames = tuple(sorted(valeurs))
+            par_colonnes[attnames].append(
+                [self._preparer(attname, valeurs[attname]) for attname in attnames]
+                + [self._preparer('date_modification', self.maintenant), produit_id]
+            )
+        with self.connexion.cursor() as curseur:
+            for attnames, parametres in par_colonnes.items():
+                affectations = ', '.join(
+                    f'{self.connexion.ops.quote_name(self.champs[attname].column)} = %s'
+                    for attname in attnames + ('date_modification',)
+                )
+                curseur.executemany(f'UPDATE {self.table} SET {affectations} WHERE id = %s', parametres)
+
+
+# Attributs lus par les moteurs de recherche : évite d'instancier des Produit pour l'indexation
+_ProduitIndexe = namedtuple('_ProduitIndexe', ['id', 'nom', 'description', 'categorie'])
+
+CHAMPS_EXISTANTS = ['id', 'code_barre', 'categorie_id', 'fournisseur_id'] + CHAMPS_PRODUIT
+# Champs lus par l'index de recherche
+CHAMPS_INDEXES = {'nom', 'description', 'categorie_id'}
+
+
+def _modifications(actuel, valeurs, referentiels):
+    """Champs d'un produit ({attname: valeur}) que la ligne modifie"""
+    modifications = {}
+    for champ in CHAMPS_PRODUIT:
+        if champ in valeurs and actuel.get(champ) != valeurs[champ]:
+            modifications[champ] = valeurs[champ]
+    for colonne in ('categorie', 'fournisseur'):
+        if colonne in valeurs:
+            objet_id = referentiels.trouver(colonne, valeurs[colonne]).id
+            if actuel.get(f'{colonne}_id') != objet_id:
+                modifications[f'{colonne}_id'] = objet_id
+    en_promotion = modifications.get('en_promotion', actuel.get('en_promotion'))
+    prix_promo = modifications.get('prix_promo', actuel.get('prix_promo'))
+    if en_promotion and not prix_promo:
+        raise LigneInvalide("en_promotion : un prix_promo est nécessaire")
+    return modifications
+
+
+def _importer_lot(lot, vus, referentiels, ecriture, rapport, simulation):
+    valides = []
+    for numero, brute in lot:
+        rapport.lignes += 1
+        try:
+            valeurs = valider_ligne(brute)
+        except LigneInvalide as erreur:
+            rapport.erreurs.append((numero, str(erreur)))
+            continue
+        code = valeurs['code_barre']
+        if code in vus:
+            rapport.erreurs.append((numero, f"code_barre {code} déjà présent ligne {vus[code]}"))
+            continue
+        vus[code] = numero
+        valides.append((numero, valeurs))
+
+    existants = {
+        produit['code_barre']: produit for produit in
+        Produit.objects.filter(code_barre__in=[valeurs['code_barre'] for _, valeurs in valides])
+        .values(*CHAMPS_EXISTANTS).order_by()
+    }
+    a_traiter = []
+    for numero, valeurs in valides:
+        if valeurs['code_barre'] not in existants:
+            manquants = [colonne for colonne in OBLIGATOIRES_CREATION if colonne not in valeurs]
+            if manquants:
+                rapport.erreurs.append((numero, f"Nouveau produit : {', '.join(manquants)} manquant(s)"))
+                continue
+        a_traiter.append((numero, valeurs))
+    referentiels.creer_manquants(a_traiter, rapport)
+
+    nouveaux = []
+    modifications = {}
+    for numero, valeurs in a_traiter:
+        actuel = existants.get(valeurs['code_barre'])
+        try:
+            champs = _modifications(actuel or ecriture.defauts, valeurs, referentiels)
+        except LigneInvalide as erreur:
+            rapport.erreurs.append((numero, str(erreur)))
+            continue
+        if actuel is None:
+            nouveaux.append({'code_barre': valeurs['code_barre'], **champs})
+        elif champs:
+            modifications[actuel['id']] = champs
+        else:
+            rapport.inchanges += 1
+
+    ecriture.inserer(nouveaux)
+    ecriture.mettre_a_jour(modifications)
+    rapport.crees += len(nouveaux)
+    rapport.modifies += len(modifications)
+    if not simulation:
+        _indexer(nouveaux, existants, modifications, referentiels)
+
+
+def _indexer(nouveaux, existants, modifications, referentiels):
+    """Met à jour l'index de recherche des produits créés ou dont le nom, la description ou la catégorie change"""
+    categories = {categorie.id: categorie for categorie in referentiels.objets['categorie'].values()}
+    ids = dict(
+        Produit.objects.filter(code_barre__in=[produit['code_barre'] for produit in nouveaux])
+        .values_list('code_barre', 'id').order_by()
+    ) if nouveaux else {}
+    a_indexer = [{**produit, 'id': ids[produit['code_barre']]} for produit in nouveaux]
+    for existant in existants.values():
+        champs = modifications.get(existant['id'], {})
+        if CHAMPS_INDEXES & set(champs):
+            a_indexer.append({**existant, **champs})
+    indexer_produits([
+        _ProduitIndexe(produit['id'], produit['nom'], produit.get('description', ''), categories[produit['categorie_id']])
+        for produit in a_indexer
+    ])
+
+
+def importer_produits(lignes, simulation=False, taille_lot=TAILLE_LOT):
+    """Crée ou met à jour les produits (rapprochés par code_barre) ; retourne un RapportImport
+
+    ``lignes`` est un itérable de (numéro de ligne, {colonne: valeur brute}),
+    par exemple le résultat de ``lire_fichier``.
+    """
+    rapport = RapportImport(simulation)
+    debut = time.perf_counter()
+    lignes = iter(lignes)
+    vus = {}
+    with transaction.atomic():
+        referentiels = _Referentiels()
+        ecriture = _Ecriture(timezone.now())
+        while True:
+            lot = list(islice(lignes, taille_lot))
+            if not lot:
+                break
+            _importer_lot(lot, vus, referentiels, ecriture, rapport, simulation)
+        if simulation:
+            transaction.set_rollback(True)
+    rapport.duree = time.perf_counter() - debut
+
+    if not simulation and (rapport.crees or rapport.modifies or rapport.categories_creees):
+        cache_dashboard.invalider('catalogue')
+        suggestions.signaler_modification()
+        caisse.signaler_modification()
+    return rapport
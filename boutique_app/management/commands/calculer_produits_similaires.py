@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.similarites import calculer, parametres
+
+
+class Command(BaseCommand):
+    help = "Recalcule les produits similaires de tout le catalogue d'après les achats communs (à lancer chaque nuit)"
+
+    def add_arguments(self, parser):
+        params = parametres()
+        parser.add_argument(
+            '--fenetre-jours',
+            type=int,
+            default=params['FENETRE_JOURS'],
+            help=f"Nombre de jours de commandes analysés (défaut: {params['FENETRE_JOURS']})"
+        )
+        parser.add_argument(
+            '--voisins',
+            type=int,
+            default=params['VOISINS'],
+            help=f"Nombre de produits similaires conservés par produit (défaut: {params['VOISINS']})"
+        )
+        parser.add_argument(
+            '--achats-communs-min',
+            type=int,
+            default=params['ACHATS_COMMUNS_MIN'],
+            help=f"Nombre minimum de commandes communes pour rapprocher deux produits (défaut: {params['ACHATS_COMMUNS_MIN']})"
+        )
+
+    def handle(self, *args, **options):
+        for option in ('fenetre_jours', 'voisins', 'achats_communs_min'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} doit être supérieur ou égal à 1")
+
+        nombre_voisins, nombre_produits = calculer(
+            FENETRE_JOURS=options['fenetre_jours'],
+            VOISINS=options['voisins'],
+            ACHATS_COMMUNS_MIN=options['achats_communs_min'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre_voisins} produit(s) similaire(s) enregistré(s) pour {nombre_produits} produit(s)"
+        ))
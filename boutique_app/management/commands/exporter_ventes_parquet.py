@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.exports import exporter_parquet, filtres_export, FiltresInvalides, PyarrowIndisponible, TAILLE_GROUPE_PARQUET
+
+
+class Command(BaseCommand):
+    help = "Exporte les ventes au format Parquet, un fichier par mois (mois=AAAA-MM/ventes.parquet)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dossier', help="Dossier de destination (créé si besoin)")
+        parser.add_argument('--debut', help="Premier jour exporté (AAAA-MM-JJ)")
+        parser.add_argument('--fin', help="Dernier jour exporté (AAAA-MM-JJ)")
+        parser.add_argument('--categorie', help="Identifiant de la catégorie exportée")
+        parser.add_argument(
+            '--taille-groupe',
+            type=int,
+            default=TAILLE_GROUPE_PARQUET,
+            help=f"Nombre de lignes par groupe de lignes Parquet (défaut: {TAILLE_GROUPE_PARQUET})"
+        )
+
+    def handle(self, *args, **options):
+        if options['taille_groupe'] < 1:
+            raise CommandError("--taille-groupe doit être supérieur ou égal à 1")
+        try:
+            filtres = filtres_export({nom: options[nom] for nom in ('debut', 'fin', 'categorie')})
+            fichiers = exporter_parquet(options['dossier'], taille_groupe=options['taille_groupe'], **filtres)
+        except (FiltresInvalides, PyarrowIndisponible) as erreur:
+            raise CommandError(str(erreur))
+
+        for mois, chemin, nombre in fichiers:
+            self.stdout.write(f"{mois} : {nombre} vente(s) -> {chemin}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(nombre for _, _, nombre in fichiers)} vente(s) exportée(s) dans {len(fichiers)} fichier(s)"
+        ))
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.models import Produit, Categorie
+from boutique_app.images import generer, ImageIllisible
+
+
+def _generer(nom, forcer):
+    """Traitement d'une image dans un processus de travail : (nom, résultat, erreur)"""
+    try:
+        return nom, generer(nom, forcer=forcer), None
+    except ImageIllisible as erreur:
+        return nom, None, str(erreur)
+
+
+class Command(BaseCommand):
+    help = "Génère les vignettes WebP/JPEG des images de produits et de catégories déjà téléversées"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processus',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Nombre de processus de travail (défaut: nombre de processeurs)"
+        )
+        parser.add_argument(
+            '--forcer',
+            action='store_true',
+            help="Régénère les dérivés existants (après un changement de taille ou de qualité)"
+        )
+
+    def handle(self, *args, **options):
+        if options['processus'] < 1:
+            raise CommandError("--processus doit être supérieur ou égal à 1")
+
+        noms = set()
+        for modele in (Produit, Categorie):
+            noms.update(modele.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+        noms = sorted(noms)
+
+        traitees = crees = erreurs = 0
+        # Les processus de travail ne lisent et n'écrivent que des fichiers ; seuls
+        # les dérivés sont préparés : le cache des serveurs web n'est pas rempli
+        with ProcessPoolExecutor(max_workers=options['processus']) as executeur:
+            resultats = executeur.map(
+                _generer, noms, [options['forcer']] * len(noms), chunksize=max(1, len(noms) // (options['processus'] * 8))
+            )
+            for nom, resultat, erreur in resultats:
+                if erreur:
+                    erreurs += 1
+                    self.stderr.write(erreur)
+                    continue
+                traitees += 1
+                crees += resultat['crees']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{traitees} image(s) traitée(s), {crees} fichier(s) dérivé(s) créé(s), {erreurs} erreur(s)"
+        ))
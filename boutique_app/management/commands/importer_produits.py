@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.imports import (
+    importer_produits, lire_fichier, FichierInvalide, OpenpyxlIndisponible, TAILLE_LOT
+)
+
+
+class Command(BaseCommand):
+    help = "Crée ou met à jour les produits depuis un fichier CSV ou Excel (rapprochement par code_barre)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Fichier .csv ou .xlsx (colonne code_barre obligatoire)")
+        parser.add_argument(
+            '--simulation',
+            action='store_true',
+            help="Valide le fichier et affiche le rapport sans rien enregistrer"
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=TAILLE_LOT,
+            help=f"Nombre de lignes traitées par lot (défaut: {TAILLE_LOT})"
+        )
+
+    def handle(self, *args, **options):
+        if options['taille_lot'] < 1:
+            raise CommandError("--taille-lot doit être supérieur ou égal à 1")
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                rapport = importer_produits(
+                    lire_fichier(fichier, options['fichier']),
+                    simulation=options['simulation'],
+                    taille_lot=options['taille_lot']
+                )
+        except OSError as erreur:
+            raise CommandError(f"Impossible de lire {options['fichier']} : {erreur.strerror}")
+        except (FichierInvalide, OpenpyxlIndisponible) as erreur:
+            raise CommandError(str(erreur))
+
+        for numero, message in rapport.erreurs:
+            self.stderr.write(f"Ligne {numero} : {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{rapport.resume()} ({rapport.lignes_par_seconde:.0f} lignes/s)"
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.reapprovisionnement import planifier, parametres
+from boutique_app.models import PlanReapprovisionnement
+
+
+class Command(BaseCommand):
+    help = "Recalcule les points de commande et les quantités à commander de tout le catalogue (à lancer chaque nuit)"
+
+    def add_arguments(self, parser):
+        params = parametres()
+        parser.add_argument(
+            '--fenetre-jours',
+            type=int,
+            default=params['FENETRE_JOURS'],
+            help=f"Nombre de jours de ventes utilisés pour la vitesse de vente (défaut: {params['FENETRE_JOURS']})"
+        )
+        parser.add_argument(
+            '--niveau-service',
+            type=float,
+            default=params['NIVEAU_SERVICE'],
+            help=f"Probabilité visée de ne pas tomber en rupture pendant le délai de livraison (défaut: {params['NIVEAU_SERVICE']})"
+        )
+
+    def handle(self, *args, **options):
+        if options['fenetre_jours'] < 2:
+            raise CommandError("--fenetre-jours doit être supérieur ou égal à 2")
+        if not 0 < options['niveau_service'] < 1:
+            raise CommandError("--niveau-service doit être compris entre 0 et 1 (exclus)")
+
+        nombre_plans = planifier(
+            FENETRE_JOURS=options['fenetre_jours'],
+            NIVEAU_SERVICE=options['niveau_service'],
+        )
+        a_commander = PlanReapprovisionnement.objects.a_commander().count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre_plans} plan(s) de réapprovisionnement calculé(s), {a_commander} produit(s) à commander"
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from boutique_app.recherche import moteur
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des produits"
+
+    def handle(self, *args, **options):
+        moteur_recherche = moteur()
+        if not moteur_recherche.disponible():
+            raise CommandError("Index de recherche absent : appliquez les migrations (python manage.py migrate)")
+
+        with transaction.atomic():
+            nombre = moteur_recherche.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{nombre} produit(s) indexé(s)"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.notes import reconstruire_notes, TAILLE_LOT
+
+
+class Command(BaseCommand):
+    help = "Recalcule la note moyenne et la répartition des notes de tous les produits depuis les avis approuvés"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=TAILLE_LOT,
+            help=f"Nombre de produits recalculés par lot (défaut: {TAILLE_LOT})"
+        )
+
+    def handle(self, *args, **options):
+        if options['taille_lot'] < 1:
+            raise CommandError("--taille-lot doit être supérieur ou égal à 1")
+
+        modifies = reconstruire_notes(taille_lot=options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(f"{modifies} produit(s) mis à jour"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.cumuls import reconstruire_cumuls
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table des ventes journalières depuis l'historique des ventes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours-par-lot',
+            type=int,
+            default=31,
+            help="Nombre de jours d'historique agrégés par requête (défaut: 31)"
+        )
+
+    def handle(self, *args, **options):
+        jours_par_lot = options['jours_par_lot']
+        if jours_par_lot < 1:
+            raise CommandError("--jours-par-lot doit être supérieur ou égal à 1")
+
+        nombre_lignes = reconstruire_cumuls(jours_par_lot=jours_par_lot)
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre_lignes} cumul(s) journalier(s) reconstruit(s)"
+        ))
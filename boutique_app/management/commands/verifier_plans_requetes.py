@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from boutique_app.plans_requetes import verifier_plans
+
+
+class Command(BaseCommand):
+    help = "Passe les requêtes fréquentes des vues à EXPLAIN et échoue si l'une parcourt entièrement une table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help="Affiche le plan d'exécution complet de chaque requête"
+        )
+
+    def handle(self, *args, **options):
+        echecs = []
+        for nom, plan, tables in verifier_plans():
+            if tables:
+                echecs.append(nom)
+                self.stdout.write(self.style.ERROR(f"{nom} : parcours complet de {', '.join(tables)}"))
+            else:
+                self.stdout.write(f"{nom} : OK")
+            if options['plans'] or tables:
+                self.stdout.write(plan)
+
+        if echecs:
+            raise CommandError(f"{len(echecs)} requête(s) sans index adapté : {', '.join(echecs)}")
+        self.stdout.write(self.style.SUCCESS("Toutes les requêtes fréquentes utilisent un index"))
@@ -0,0 +1,33 @@
+"""
+Middleware de la boutique
+"""
+import re
+from django.conf import settings
+from boutique_app import images
+
+# Cache navigateur d'un an, sans revalidation
+CACHE_IMMUABLE = 'public, max-age=31536000, immutable'
+
+# Nom produit par ManifestStaticFilesStorage : css/client.3f1a9c2b7d4e.css
+EMPREINTE_STATIQUE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+
+def fichier_immuable(chemin):
+    """Vrai si l'URL désigne un fichier dont le nom change avec le contenu"""
+    if chemin.startswith(settings.STATIC_URL):
+        return EMPREINTE_STATIQUE.search(chemin) is not None
+    # Images dérivées : nommées d'après l'empreinte de l'original (images.py)
+    return chemin.startswith(f'{settings.MEDIA_URL}{images.DOSSIER}/')
+
+
+class EnTetesCacheMiddleware:
+    """``Cache-Control: immutable`` sur les fichiers statiques et images à empreinte"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code == 200 and fichier_immuable(request.path):
+            response['Cache-Control'] = CACHE_IMMUABLE
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:06
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0002_fournisseur_produit_en_promotion_produit_prix_promo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenteJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantite', models.IntegerField(default=0)),
+                ('montant_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('nombre_ventes', models.IntegerField(default=0)),
+                ('categorie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventes_journalieres', to='boutique_app.categorie')),
+                ('produit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventes_journalieres', to='boutique_app.produit')),
+            ],
+            options={
+                'verbose_name': 'Vente journalière',
+                'verbose_name_plural': 'Ventes journalières',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'produit')},
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+
+SQLITE_CREATION = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS boutique_app_produit_fts
+    USING fts5(nom, description, categorie, tokenize = 'unicode61 remove_diacritics 2')
+    """,
+    """
+    INSERT INTO boutique_app_produit_fts (rowid, nom, description, categorie)
+    SELECT p.id, p.nom, p.description, c.nom
+    FROM boutique_app_produit p
+    JOIN boutique_app_categorie c ON c.id = p.categorie_id
+    """,
+]
+
+SQLITE_SUPPRESSION = ["DROP TABLE IF EXISTS boutique_app_produit_fts"]
+
+POSTGRESQL_CREATION = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'boutique_fr') THEN
+            CREATE TEXT SEARCH CONFIGURATION boutique_fr (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION boutique_fr
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS boutique_app_produit_recherche (
+        produit_id bigint PRIMARY KEY REFERENCES boutique_app_produit (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS boutique_app_produit_recherche_document
+    ON boutique_app_produit_recherche USING GIN (document)
+    """,
+    """
+    INSERT INTO boutique_app_produit_recherche (produit_id, document)
+    SELECT p.id,
+           setweight(to_tsvector('boutique_fr', p.nom), 'A') ||
+           setweight(to_tsvector('boutique_fr', c.nom), 'B') ||
+           setweight(to_tsvector('boutique_fr', p.description), 'C')
+    FROM boutique_app_produit p
+    JOIN boutique_app_categorie c ON c.id = p.categorie_id
+    ON CONFLICT (produit_id) DO NOTHING
+    """,
+]
+
+POSTGRESQL_SUPPRESSION = [
+    "DROP TABLE IF EXISTS boutique_app_produit_recherche",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS boutique_fr",
+]
+
+
+def executer(requetes_par_moteur):
+    def operation(apps, schema_editor):
+        for requete in requetes_par_moteur.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(requete)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boutique_app", "0003_ventejournaliere"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            executer({'sqlite': SQLITE_CREATION, 'postgresql': POSTGRESQL_CREATION}),
+            executer({'sqlite': SQLITE_SUPPRESSION, 'postgresql': POSTGRESQL_SUPPRESSION}),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0004_index_recherche_produits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCommande',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('dernier', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Séquence de commandes',
+                'verbose_name_plural': 'Séquences de commandes',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0005_sequencecommande'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fournisseur',
+            name='delai_livraison_jours',
+            field=models.PositiveIntegerField(default=7, help_text='Délai moyen entre la commande et la livraison, utilisé pour les points de commande'),
+        ),
+        migrations.CreateModel(
+            name='PlanReapprovisionnement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ventes_par_jour', models.FloatField(default=0, help_text='Quantité vendue par jour en moyenne')),
+                ('ecart_type_jour', models.FloatField(default=0, help_text='Écart-type des ventes quotidiennes')),
+                ('delai_livraison_jours', models.PositiveIntegerField()),
+                ('stock_securite', models.PositiveIntegerField(default=0)),
+                ('point_commande', models.PositiveIntegerField(default=0)),
+                ('stock_cible', models.PositiveIntegerField(default=0)),
+                ('date_calcul', models.DateTimeField()),
+                ('fournisseur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='plans_reapprovisionnement', to='boutique_app.fournisseur')),
+                ('produit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='plan_reapprovisionnement', to='boutique_app.produit')),
+            ],
+            options={
+                'verbose_name': 'Plan de réapprovisionnement',
+                'verbose_name_plural': 'Plans de réapprovisionnement',
+                'ordering': ['fournisseur', 'produit'],
+            },
+        ),
+    ]
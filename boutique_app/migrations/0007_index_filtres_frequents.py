@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0006_planreapprovisionnement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avisproduit',
+            index=models.Index(condition=models.Q(('approuve', True)), fields=['produit', '-date_creation'], name='avis_approuves_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['statut', '-date_commande'], name='commande_statut_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['-date_commande', '-id'], name='commande_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='panier',
+            index=models.Index(fields=['utilisateur', 'statut'], name='panier_utilisateur_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-date_creation', '-id'], name='produit_actif_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(condition=models.Q(('active', True)), fields=['categorie', '-date_creation', '-id'], name='produit_actif_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(condition=models.Q(('active', True), ('en_promotion', True)), fields=['-date_creation', '-id'], name='produit_promo_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vente',
+            index=models.Index(fields=['date_vente'], name='vente_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vente',
+            index=models.Index(fields=['produit', 'date_vente'], name='vente_produit_date_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:54
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def calculer_notes(apps, schema_editor):
+    """Notes initiales à partir des avis approuvés existants"""
+    Produit = apps.get_model('boutique_app', 'Produit')
+    AvisProduit = apps.get_model('boutique_app', 'AvisProduit')
+    lignes = AvisProduit.objects.filter(approuve=True).values('produit_id').annotate(
+        **{f'nombre_avis_{note}': Count('id', filter=Q(note=note)) for note in range(1, 6)}
+    ).order_by()
+    for ligne in lignes:
+        produit_id = ligne.pop('produit_id')
+        nombre = sum(ligne.values())
+        somme = sum(note * ligne[f'nombre_avis_{note}'] for note in range(1, 6))
+        Produit.objects.filter(id=produit_id).update(
+            nombre_avis=nombre,
+            note_moyenne=(Decimal(somme) / nombre).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            **ligne
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0007_index_filtres_frequents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produit',
+            name='nombre_avis',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='nombre_avis_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='nombre_avis_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='nombre_avis_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='nombre_avis_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='nombre_avis_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='produit',
+            name='note_moyenne',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=3),
+        ),
+        migrations.AddIndex(
+            model_name='produit',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-note_moyenne', '-nombre_avis', '-id'], name='produit_actif_note_idx'),
+        ),
+        migrations.RunPython(calculer_notes, migrations.RunPython.noop),
+    ]
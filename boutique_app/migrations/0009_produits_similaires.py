@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0008_notes_produits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProduitSimilaire',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rang', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Similarité cosinus des achats (1 : toujours achetés ensemble)')),
+                ('produit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similaires', to='boutique_app.produit')),
+                ('similaire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similaire_de', to='boutique_app.produit')),
+            ],
+            options={
+                'verbose_name': 'Produit similaire',
+                'verbose_name_plural': 'Produits similaires',
+                'ordering': ['produit', 'rang'],
+                'unique_together': {('produit', 'rang')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def remplir_cumuls(apps, schema_editor):
+    """Cumuls de l'historique existant (0003 a créé la table vide)"""
+    Vente = apps.get_model('boutique_app', 'Vente')
+    VenteJournaliere = apps.get_model('boutique_app', 'VenteJournaliere')
+    VenteJournaliere.objects.all().delete()
+    lignes = Vente.objects.annotate(jour=TruncDate('date_vente')).values(
+        'jour', 'produit_id', 'produit__categorie_id'
+    ).annotate(
+        total_quantite=Sum('quantite'),
+        total_montant=Sum('montant_total'),
+        total_ventes=Count('id'),
+    ).order_by()
+    VenteJournaliere.objects.bulk_create([
+        VenteJournaliere(
+            date=ligne['jour'],
+            produit_id=ligne['produit_id'],
+            categorie_id=ligne['produit__categorie_id'],
+            quantite=ligne['total_quantite'],
+            montant_total=ligne['total_montant'],
+            nombre_ventes=ligne['total_ventes'],
+        )
+        for ligne in lignes.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0009_produits_similaires'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_cumuls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boutique_app', '0010_remplir_ventes_journalieres'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avisproduit',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='categorie',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,10 +1,10 @@
 from django.db import models
+from django.db.models.functions import Cast, Greatest
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from django.utils import timezone
-from datetime import timedelta
-import time
+from datetime import datetime, time, timedelta
 
 
 class Categorie(models.Model):
@@ -13,6 +13,7 @@ class Categorie(models.Model):
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True)
 
     class Meta:
@@ -46,6 +47,10 @@ class Fournisseur(models.Model):
     telephone = models.CharField(max_length=20, blank=True)
     email = models.EmailField(blank=True)
     adresse = models.TextField(blank=True)
+    delai_livraison_jours = models.PositiveIntegerField(
+        default=7,
+        help_text="Délai moyen entre la commande et la livraison, utilisé pour les points de commande"
+    )
     date_creation = models.DateTimeField(auto_now_add=True)
     actif = models.BooleanField(default=True)
 
@@ -58,6 +63,59 @@ class Fournisseur(models.Model):
         return self.nom
 
 
+class ProduitQuerySet(models.QuerySet):
+    """Requêtes sur les produits avec les indicateurs financiers calculés en SQL"""
+
+    def actifs(self):
+        return self.filter(active=True)
+
+    def stock_faible(self):
+        """Produits dont le stock est inférieur ou égal au minimum"""
+        return self.filter(quantite_stock__lte=models.F('quantite_minimum'))
+
+    def with_financials(self):
+        """Annote le prix effectif, la valeur du stock et les marges (comme les propriétés du modèle)
+
+        - prix_effectif : prix promo si le produit est en promotion, sinon prix de vente
+        - valeur_stock_calculee : quantite_stock * prix_achat
+        - marge_unitaire : prix_effectif - prix_achat
+        - marge_pourcentage : marge_unitaire / prix_achat * 100
+        """
+        montant = models.DecimalField(max_digits=14, decimal_places=2)
+        prix_effectif = models.Case(
+            models.When(en_promotion=True, prix_promo__isnull=False, then=models.F('prix_promo')),
+            default=models.F('prix_vente'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+        return self.annotate(
+            prix_effectif=prix_effectif,
+            valeur_stock_calculee=models.ExpressionWrapper(
+                models.F('quantite_stock') * models.F('prix_achat'), output_field=montant
+            ),
+            marge_unitaire=models.ExpressionWrapper(
+                models.F('prix_effectif') - models.F('prix_achat'), output_field=montant
+            ),
+            marge_pourcentage=models.Case(
+                # Division en virgule flottante : SQLite divise des prix entiers en entiers
+                models.When(prix_achat__gt=0, then=models.ExpressionWrapper(
+                    Cast(models.F('prix_effectif') - models.F('prix_achat'), models.FloatField()) * 100 / models.F('prix_achat'),
+                    output_field=montant
+                )),
+                default=models.Value(Decimal('0')),
+                output_field=montant,
+            ),
+        )
+
+    def statistiques_financieres(self):
+        """Agrège valeur du stock et marges sans charger les produits"""
+        return self.with_financials().aggregate(
+            valeur_stock_total=models.Sum('valeur_stock_calculee'),
+            marge_min=models.Min('marge_unitaire'),
+            marge_max=models.Max('marge_unitaire'),
+            marge_moyenne=models.Avg('marge_pourcentage'),
+        )
+
+
 class Produit(models.Model):
     """Produit de la boutique"""
     nom = models.CharField(max_length=200)
@@ -76,11 +134,28 @@ class Produit(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True)
+    # Notes des avis approuvés, maintenues par les signaux de AvisProduit (voir notes.py)
+    note_moyenne = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.00'), editable=False)
+    nombre_avis = models.PositiveIntegerField(default=0, editable=False)
+    nombre_avis_1 = models.PositiveIntegerField(default=0, editable=False)
+    nombre_avis_2 = models.PositiveIntegerField(default=0, editable=False)
+    nombre_avis_3 = models.PositiveIntegerField(default=0, editable=False)
+    nombre_avis_4 = models.PositiveIntegerField(default=0, editable=False)
+    nombre_avis_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProduitQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
         ordering = ['-date_creation']
+        indexes = [
+            # Catalogue client : produits actifs, nouveautés d'abord (pagination par curseur)
+            models.Index(fields=['-date_creation', '-id'], condition=models.Q(active=True), name='produit_actif_date_idx'),
+            models.Index(fields=['categorie', '-date_creation', '-id'], condition=models.Q(active=True), name='produit_actif_cat_idx'),
+            models.Index(fields=['-date_creation', '-id'], condition=models.Q(active=True, en_promotion=True), name='produit_promo_date_idx'),
+            models.Index(fields=['-note_moyenne', '-nombre_avis', '-id'], condition=models.Q(active=True), name='produit_actif_note_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nom} - {self.categorie.nom}"
@@ -92,6 +167,16 @@ class Produit(models.Model):
             return self.prix_promo
         return self.prix_vente
     
+    @property
+    def repartition_notes(self):
+        """Nombre et pourcentage d'avis approuvés pour chaque note, de 5 à 1"""
+        repartition = []
+        for note in range(5, 0, -1):
+            nombre = getattr(self, f'nombre_avis_{note}')
+            pourcentage = nombre * 100 / self.nombre_avis if self.nombre_avis else 0
+            repartition.append({'note': note, 'nombre': nombre, 'pourcentage': pourcentage})
+        return repartition
+    
     @property
     def reduction(self):
         """Calcule le pourcentage de réduction en promotion"""
@@ -137,14 +222,25 @@ class Panier(models.Model):
         verbose_name = "Panier"
         verbose_name_plural = "Paniers"
         ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['utilisateur', 'statut'], name='panier_utilisateur_statut_idx'),
+        ]
 
     def __str__(self):
         return f"Panier #{self.id} - {self.get_statut_display()}"
 
     @property
     def total(self):
-        """Calcule le total du panier"""
-        return sum(item.sous_total for item in self.items.all())
+        """Calcule le total du panier (sans requête si les articles sont préchargés)"""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum(item.sous_total for item in self.items.all())
+        total = self.items.aggregate(
+            total=models.Sum(
+                models.F('quantite') * models.F('prix_unitaire'),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2)
+            )
+        )['total']
+        return total or 0
 
 
 class ItemPanier(models.Model):
@@ -192,18 +288,37 @@ class Commande(models.Model):
         verbose_name = "Commande"
         verbose_name_plural = "Commandes"
         ordering = ['-date_commande']
+        indexes = [
+            models.Index(fields=['statut', '-date_commande'], name='commande_statut_date_idx'),
+            # Pagination par curseur de l'historique des commandes
+            models.Index(fields=['-date_commande', '-id'], name='commande_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"Commande #{self.numero_commande}"
 
     def save(self, *args, **kwargs):
         if not self.numero_commande:
-            # Générer un numéro unique basé sur le timestamp
-            timestamp = int(time.time() * 1000) % 1000000
-            self.numero_commande = f"CMD-{timezone.now().strftime('%Y%m%d')}-{timestamp}"
+            # Numéro attribué par l'allocateur configuré (voir numerotation.py)
+            from .numerotation import nouveau_numero
+            self.numero_commande = nouveau_numero()
         super().save(*args, **kwargs)
 
 
+class SequenceCommande(models.Model):
+    """Dernier numéro de commande réservé pour chaque jour"""
+    date = models.DateField(unique=True)
+    dernier = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Séquence de commandes"
+        verbose_name_plural = "Séquences de commandes"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date.strftime('%d/%m/%Y')} : {self.dernier}"
+
+
 class AvisProduit(models.Model):
     """Avis/note sur un produit"""
     produit = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='avis')
@@ -211,6 +326,7 @@ class AvisProduit(models.Model):
     note = models.IntegerField(choices=[(i, i) for i in range(1, 6)], default=5)
     commentaire = models.TextField(blank=True)
     date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
     approuve = models.BooleanField(default=False)
 
     class Meta:
@@ -218,11 +334,42 @@ class AvisProduit(models.Model):
         verbose_name_plural = "Avis"
         ordering = ['-date_creation']
         unique_together = ['produit', 'utilisateur']
+        indexes = [
+            # Avis publiés d'un produit, les plus récents d'abord
+            models.Index(fields=['produit', '-date_creation'], condition=models.Q(approuve=True), name='avis_approuves_idx'),
+        ]
 
     def __str__(self):
         return f"Avis de {self.utilisateur.username} sur {self.produit.nom}"
 
 
+def minuit_local(jour):
+    """Premier instant d'un jour calendaire dans le fuseau courant (TIME_ZONE)"""
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+class VenteQuerySet(models.QuerySet):
+    """Filtres par jours calendaires locaux, traduits en intervalles sur date_vente
+
+    Un filtre ``date_vente__date`` applique une conversion de fuseau à chaque
+    ligne et empêche l'utilisation de l'index ; ici la colonne est comparée à
+    des instants fixes (``debut <= date_vente < fin``).
+    """
+
+    def entre(self, debut=None, fin=None):
+        """Ventes des jours ``debut`` à ``fin`` inclus (bornes facultatives)"""
+        ventes = self
+        if debut is not None:
+            ventes = ventes.filter(date_vente__gte=minuit_local(debut))
+        if fin is not None:
+            ventes = ventes.filter(date_vente__lt=minuit_local(fin + timedelta(days=1)))
+        return ventes
+
+    def du_jour(self, jour):
+        """Ventes d'un jour calendaire"""
+        return self.entre(jour, jour)
+
+
 class Vente(models.Model):
     """Enregistrement de vente"""
     produit = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='ventes')
@@ -232,11 +379,104 @@ class Vente(models.Model):
     commande = models.ForeignKey(Commande, on_delete=models.CASCADE, related_name='ventes', null=True, blank=True)
     date_vente = models.DateTimeField(auto_now_add=True)
 
+    objects = VenteQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Vente"
         verbose_name_plural = "Ventes"
         ordering = ['-date_vente']
+        indexes = [
+            models.Index(fields=['date_vente'], name='vente_date_idx'),
+            models.Index(fields=['produit', 'date_vente'], name='vente_produit_date_idx'),
+        ]
 
     def __str__(self):
         return f"Vente {self.produit.nom} - {self.date_vente.strftime('%d/%m/%Y')}"
 
+
+
+class VenteJournaliere(models.Model):
+    """Cumul journalier des ventes par produit (maintenu par les signaux)"""
+    date = models.DateField()
+    produit = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='ventes_journalieres')
+    categorie = models.ForeignKey(Categorie, on_delete=models.CASCADE, related_name='ventes_journalieres')
+    quantite = models.IntegerField(default=0)
+    montant_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    nombre_ventes = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Vente journalière"
+        verbose_name_plural = "Ventes journalières"
+        ordering = ['-date']
+        unique_together = ['date', 'produit']
+
+    def __str__(self):
+        return f"{self.produit.nom} - {self.date.strftime('%d/%m/%Y')}"
+
+
+class PlanReapprovisionnementQuerySet(models.QuerySet):
+    """Requêtes sur les plans avec le stock courant des produits"""
+
+    def avec_stock(self):
+        """Annote le stock courant et la quantité à commander pour atteindre le stock cible"""
+        return self.annotate(
+            stock_actuel=models.F('produit__quantite_stock'),
+            quantite_a_commander=Greatest(
+                models.F('stock_cible') - models.F('produit__quantite_stock'), models.Value(0)
+            ),
+        )
+
+    def a_commander(self):
+        """Plans des produits actifs dont le stock a atteint le point de commande"""
+        return self.avec_stock().filter(
+            produit__active=True,
+            produit__quantite_stock__lte=models.F('point_commande'),
+        )
+
+
+class PlanReapprovisionnement(models.Model):
+    """Point de commande et stock cible d'un produit (recalculés chaque nuit)"""
+    produit = models.OneToOneField(Produit, on_delete=models.CASCADE, related_name='plan_reapprovisionnement')
+    fournisseur = models.ForeignKey(Fournisseur, on_delete=models.SET_NULL, null=True, blank=True, related_name='plans_reapprovisionnement')
+    ventes_par_jour = models.FloatField(default=0, help_text="Quantité vendue par jour en moyenne")
+    ecart_type_jour = models.FloatField(default=0, help_text="Écart-type des ventes quotidiennes")
+    delai_livraison_jours = models.PositiveIntegerField()
+    stock_securite = models.PositiveIntegerField(default=0)
+    point_commande = models.PositiveIntegerField(default=0)
+    stock_cible = models.PositiveIntegerField(default=0)
+    date_calcul = models.DateTimeField()
+
+    objects = PlanReapprovisionnementQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Plan de réapprovisionnement"
+        verbose_name_plural = "Plans de réapprovisionnement"
+        ordering = ['fournisseur', 'produit']
+
+    def __str__(self):
+        return f"{self.produit.nom} : commander à {self.point_commande}"
+
+    @property
+    def jours_couverture(self):
+        """Nombre de jours de ventes couverts par le stock courant"""
+        if not self.ventes_par_jour:
+            return None
+        return self.produit.quantite_stock / self.ventes_par_jour
+
+
+class ProduitSimilaire(models.Model):
+    """Voisin d'un produit d'après les achats communs (recalculé chaque nuit)"""
+    produit = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='similaires')
+    similaire = models.ForeignKey(Produit, on_delete=models.CASCADE, related_name='similaire_de')
+    rang = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Similarité cosinus des achats (1 : toujours achetés ensemble)")
+
+    class Meta:
+        verbose_name = "Produit similaire"
+        verbose_name_plural = "Produits similaires"
+        ordering = ['produit', 'rang']
+        # L'index de la contrainte sert la lecture des voisins d'un produit, déjà triés
+        unique_together = ['produit', 'rang']
+
+    def __str__(self):
+        return f"{self.produit.nom} -> {self.similaire.nom} ({self.score:.2f})"
@@ -0,0 +1,82 @@
+"""
+Notes des produits dénormalisées
+
+La note moyenne, le nombre d'avis et la répartition par nombre d'étoiles des
+avis approuvés sont enregistrés sur Produit : le catalogue peut les
+afficher, trier et filtrer sans requête supplémentaire. Ils sont recalculés
+par les signaux de AvisProduit (création, modification, approbation,
+suppression) et peuvent être reconstruits avec la commande
+``reconstruire_notes_produits``.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Produit, AvisProduit
+
+NOTES = range(1, 6)
+CHAMPS_NOTES = ['note_moyenne', 'nombre_avis'] + [f'nombre_avis_{note}' for note in NOTES]
+TAILLE_LOT = 1000
+
+
+def _valeurs(repartition):
+    """Valeurs des champs de notes à partir du nombre d'avis par note"""
+    nombre = sum(repartition.values())
+    somme = sum(note * nombre_note for note, nombre_note in repartition.items())
+    moyenne = Decimal(somme) / nombre if nombre else Decimal('0')
+    valeurs = {
+        'note_moyenne': moyenne.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+        'nombre_avis': nombre,
+    }
+    for note in NOTES:
+        valeurs[f'nombre_avis_{note}'] = repartition.get(note, 0)
+    return valeurs
+
+
+def recalculer_notes(produit_ids):
+    """Recalcule les notes des produits indiqués en trois requêtes
+
+    Seuls les produits dont les notes changent sont mis à jour (leur date de
+    modification aussi, la fiche affichée ayant changé). Retourne le nombre
+    de produits modifiés.
+    """
+    produit_ids = set(produit_ids)
+    if not produit_ids:
+        return 0
+
+    repartitions = {produit_id: {} for produit_id in produit_ids}
+    lignes = AvisProduit.objects.filter(
+        produit_id__in=produit_ids, approuve=True
+    ).values('produit_id').annotate(
+        **{f'nombre_{note}': Count('id', filter=Q(note=note)) for note in NOTES}
+    ).order_by()
+    for ligne in lignes:
+        repartitions[ligne['produit_id']] = {note: ligne[f'nombre_{note}'] for note in NOTES}
+
+    maintenant = timezone.now()
+    modifies = []
+    for produit in Produit.objects.filter(id__in=produit_ids).only('id', *CHAMPS_NOTES):
+        valeurs = _valeurs(repartitions[produit.id])
+        if all(getattr(produit, champ) == valeur for champ, valeur in valeurs.items()):
+            continue
+        for champ, valeur in valeurs.items():
+            setattr(produit, champ, valeur)
+        produit.date_modification = maintenant
+        modifies.append(produit)
+
+    # bulk_update : pas de signal post_save (réindexation inutile)
+    Produit.objects.bulk_update(modifies, CHAMPS_NOTES + ['date_modification'], batch_size=TAILLE_LOT)
+    return len(modifies)
+
+
+def reconstruire_notes(taille_lot=TAILLE_LOT):
+    """Recalcule les notes de tout le catalogue, par lots de produits"""
+    modifies = 0
+    dernier_id = 0
+    while True:
+        ids = list(
+            Produit.objects.filter(id__gt=dernier_id).order_by('id').values_list('id', flat=True)[:taille_lot]
+        )
+        if not ids:
+            return modifies
+        modifies += recalculer_notes(ids)
+        dernier_id = ids[-1]
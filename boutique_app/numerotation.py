@@ -0,0 +1,179 @@
+"""
+Attribution des numéros de commande
+
+L'allocateur est choisi par le réglage ``NUMEROTATION_COMMANDES`` :
+
+- ``AllocateurSequence`` (par défaut) : séquence quotidienne en base
+  (``CMD-20250101-000042``). Chaque processus réserve un bloc de numéros en
+  une requête puis les distribue depuis la mémoire ; les numéros d'un bloc
+  abandonné sont perdus (trous dans la séquence), jamais réattribués.
+- ``AllocateurHorodate`` : identifiants ordonnés dans le temps sans accès à
+  la base (horodatage en millisecondes + 50 bits aléatoires, en base 32).
+
+Aucun des deux ne repose sur la contrainte d'unicité pour détecter les
+collisions.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+PARAMETRES_PAR_DEFAUT = {
+    'ALLOCATEUR': 'boutique_app.numerotation.AllocateurSequence',
+    'TAILLE_BLOC': 100,
+}
+
+PREFIXE = 'CMD'
+
+
+def parametres():
+    """Paramètres de numérotation (réglage NUMEROTATION_COMMANDES complété par les valeurs par défaut)"""
+    return {**PARAMETRES_PAR_DEFAUT, **getattr(settings, 'NUMEROTATION_COMMANDES', {})}
+
+
+class AllocateurNumeros:
+    """Interface des allocateurs de numéros de commande"""
+
+    def allouer(self):
+        """Retourne un numéro de commande jamais attribué"""
+        raise NotImplementedError
+
+
+class AllocateurSequence(AllocateurNumeros):
+    """Séquence quotidienne en base, réservée par blocs pour chaque processus
+
+    Un bloc n'est mis à disposition des autres threads qu'une fois la
+    transaction qui l'a réservé validée : si elle est annulée, le compteur en
+    base revient en arrière et le bloc est oublié, sans risque qu'un autre
+    processus obtienne les mêmes numéros.
+    """
+
+    def __init__(self, taille_bloc=100):
+        self.taille_bloc = taille_bloc
+        self._verrou = threading.Lock()
+        self._jour = None
+        self._blocs = deque()  # intervalles [début, fin] disponibles pour self._jour
+        self._pid = os.getpid()
+
+    def reserver(self, jour, taille):
+        """Réserve ``taille`` numéros pour le jour donné ; retourne (premier, dernier)"""
+        from .models import SequenceCommande
+        with transaction.atomic():
+            mis_a_jour = SequenceCommande.objects.filter(date=jour).update(dernier=F('dernier') + taille)
+            if not mis_a_jour:
+                try:
+                    with transaction.atomic():
+                        SequenceCommande.objects.create(date=jour, dernier=taille)
+                except IntegrityError:
+                    # Séquence du jour créée entre-temps par un autre processus
+                    SequenceCommande.objects.filter(date=jour).update(dernier=F('dernier') + taille)
+            dernier = SequenceCommande.objects.filter(date=jour).values_list('dernier', flat=True).get()
+        return dernier - taille + 1, dernier
+
+    def _prendre(self, jour):
+        with self._verrou:
+            if os.getpid() != self._pid:
+                # Processus issu d'un fork : les blocs du parent ne lui appartiennent pas
+                self._pid = os.getpid()
+                self._blocs.clear()
+            if self._jour != jour:
+                self._jour = jour
+                self._blocs.clear()
+            if self._blocs:
+                debut, fin = self._blocs[0]
+                if debut == fin:
+                    self._blocs.popleft()
+                else:
+                    self._blocs[0] = (debut + 1, fin)
+                return debut
+            return None
+
+    def _rendre_disponible(self, jour, debut, fin):
+        with self._verrou:
+            if self._jour == jour and os.getpid() == self._pid:
+                self._blocs.append((debut, fin))
+
+    def allouer(self):
+        jour = timezone.localdate()
+        numero = self._prendre(jour)
+        if numero is None:
+            debut, fin = self.reserver(jour, self.taille_bloc)
+            numero = debut
+            if debut < fin:
+                transaction.on_commit(lambda: self._rendre_disponible(jour, debut + 1, fin))
+        return f'{PREFIXE}-{jour:%Y%m%d}-{numero:06d}'
+
+
+ALPHABET_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # base 32 de Crockford
+
+
+def base32(nombre, longueur):
+    chiffres = []
+    for _ in range(longueur):
+        nombre, reste = divmod(nombre, 32)
+        chiffres.append(ALPHABET_BASE32[reste])
+    return ''.join(reversed(chiffres))
+
+
+class AllocateurHorodate(AllocateurNumeros):
+    """Identifiants ordonnés dans le temps, sans coordination entre processus
+
+    Horodatage en millisecondes (50 bits) suivi de 50 bits aléatoires ; au
+    sein d'une même milliseconde, un processus incrémente la partie aléatoire
+    pour garder l'ordre.
+    """
+
+    BITS_ALEATOIRES = 50
+
+    def __init__(self, **kwargs):
+        self._verrou = threading.Lock()
+        self._derniere_ms = -1
+        self._aleatoire = 0
+
+    def allouer(self):
+        with self._verrou:
+            ms = time.time_ns() // 1_000_000
+            if ms <= self._derniere_ms:
+                ms = self._derniere_ms
+                self._aleatoire += 1
+            else:
+                self._derniere_ms = ms
+                self._aleatoire = secrets.randbits(self.BITS_ALEATOIRES - 1)
+            aleatoire = self._aleatoire
+        jour = timezone.localdate()
+        return f'{PREFIXE}-{jour:%Y%m%d}-{base32(ms, 10)}{base32(aleatoire, 10)}'
+
+
+_allocateur = None
+_verrou_allocateur = threading.Lock()
+
+
+def allocateur():
+    """Allocateur configuré (une instance par processus)"""
+    global _allocateur
+    with _verrou_allocateur:
+        if _allocateur is None:
+            params = parametres()
+            _allocateur = import_string(params['ALLOCATEUR'])(taille_bloc=params['TAILLE_BLOC'])
+        return _allocateur
+
+
+def nouveau_numero():
+    """Numéro pour une nouvelle commande"""
+    return allocateur().allouer()
+
+
+@receiver(setting_changed)
+def reinitialiser_allocateur(setting, **kwargs):
+    global _allocateur
+    if setting == 'NUMEROTATION_COMMANDES':
+        _allocateur = None
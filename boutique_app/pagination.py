@@ -0,0 +1,276 @@
+"""
+Pagination par curseur (keyset)
+
+Au lieu d'un ``OFFSET`` dont le coût croît avec le numéro de page, chaque page
+reprend après la dernière ligne de la précédente
+(``WHERE (date, id) < (dernière date, dernier id)``) : la page 500 coûte
+autant que la page 1. Les curseurs transmis dans l'URL sont opaques
+(JSON encodé en base64) et le nombre total de résultats est facultatif,
+éventuellement approximatif (mis en cache quelques instants).
+
+Les listes de l'administration, paginées par numéro de page, utilisent
+``PaginateurEstime`` : sur les grandes tables le ``COUNT(*)`` de chaque
+affichage est remplacé par les statistiques du planificateur (PostgreSQL) ou
+par un comptage mis en cache.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+PARAMETRE_CURSEUR = 'curseur'
+DUREE_CACHE_COMPTAGE = 60  # secondes
+SEUIL_ESTIMATION = 10000   # en dessous, la table est comptée exactement
+ENTIER_MAX = 2 ** 63 - 1   # entiers acceptés dans un curseur (BIGINT ; SQLite ne déclare pas de bornes)
+
+SUIVANT = 's'
+PRECEDENT = 'p'
+
+
+class CurseurInvalide(ValueError):
+    """Curseur illisible ou ne correspondant pas à l'ordre de tri"""
+
+
+def _serialiser(valeur):
+    if isinstance(valeur, (datetime, date)):
+        # isoformat conserve les microsecondes, indispensables à la comparaison
+        return valeur.isoformat()
+    if isinstance(valeur, Decimal):
+        # Chaîne exacte, reconvertie par DecimalField.to_python
+        return str(valeur)
+    return valeur
+
+
+def encoder_curseur(valeurs, sens=SUIVANT):
+    """Jeton opaque représentant une position dans l'ordre de tri"""
+    donnees = json.dumps({'v': [_serialiser(v) for v in valeurs], 's': sens}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(donnees.encode()).decode().rstrip('=')
+
+
+def decoder_curseur(jeton):
+    """Retourne (valeurs, sens) ; lève CurseurInvalide si le jeton est illisible"""
+    try:
+        rembourrage = '=' * (-len(jeton) % 4)
+        donnees = json.loads(base64.urlsafe_b64decode(jeton + rembourrage))
+        valeurs, sens = donnees['v'], donnees['s']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise CurseurInvalide(jeton)
+    if not isinstance(valeurs, list) or sens not in (SUIVANT, PRECEDENT):
+        raise CurseurInvalide(jeton)
+    return valeurs, sens
+
+
+class PageCurseur:
+    """Page de résultats avec les curseurs des pages voisines"""
+
+    def __init__(self, objets, curseur_suivant=None, curseur_precedent=None, nombre_total=None):
+        self.object_list = objets
+        self.curseur_suivant = curseur_suivant
+        self.curseur_precedent = curseur_precedent
+        self.nombre_total = nombre_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.curseur_suivant is not None
+
+    def has_previous(self):
+        return self.curseur_precedent is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class PaginateurCurseur:
+    """Pagine un queryset selon un ordre de tri total (le dernier champ doit être unique)
+
+    ``comptage`` vaut ``None`` (pas de total), ``'exact'`` (COUNT à chaque
+    page) ou ``'approximatif'`` (COUNT mis en cache ``DUREE_CACHE_COMPTAGE``
+    secondes).
+    """
+
+    def __init__(self, queryset, par_page, ordre=('-date_creation', '-id'), comptage=None):
+        self.queryset = queryset
+        self.par_page = par_page
+        self.ordre = tuple(ordre)
+        self.comptage = comptage
+        self.champs = [champ.lstrip('-') for champ in self.ordre]
+
+    # ---------- conditions ----------
+
+    def _valeurs(self, objet):
+        return [getattr(objet, champ) for champ in self.champs]
+
+    def _convertir(self, valeurs):
+        """Reconvertit les valeurs d'un curseur dans le type des champs du modèle
+
+        Valeurs nulles ou hors des bornes du champ (entier de plus de 64 bits,
+        décimal trop long) refusées : elles ne peuvent pas être comparées en SQL.
+        """
+        if len(valeurs) != len(self.champs):
+            raise CurseurInvalide(valeurs)
+        meta = self.queryset.model._meta
+        converties = []
+        try:
+            for champ, valeur in zip(self.champs, valeurs):
+                champ = meta.get_field(champ)
+                valeur = champ.to_python(valeur)
+                if valeur is None or (isinstance(valeur, int) and not -ENTIER_MAX - 1 <= valeur <= ENTIER_MAX):
+                    raise CurseurInvalide(valeurs)
+                champ.run_validators(valeur)
+                converties.append(valeur)
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            raise CurseurInvalide(valeurs)
+        return converties
+
+    def _apres(self, valeurs, inverse=False):
+        """Lignes situées après la position donnée dans l'ordre de tri (ou avant si ``inverse``)"""
+        condition = Q()
+        egalites = {}
+        for ordre, champ, valeur in zip(self.ordre, self.champs, valeurs):
+            decroissant = ordre.startswith('-') != inverse
+            comparaison = f'{champ}__lt' if decroissant else f'{champ}__gt'
+            condition |= Q(**egalites, **{comparaison: valeur})
+            egalites[champ] = valeur
+        return condition
+
+    @staticmethod
+    def _inverser(ordre):
+        return ordre[1:] if ordre.startswith('-') else f'-{ordre}'
+
+    # ---------- pages ----------
+
+    def _position(self, curseur):
+        """Valeurs et sens d'un curseur ; (None, SUIVANT) s'il est vide ou invalide"""
+        if curseur:
+            try:
+                valeurs, sens = decoder_curseur(curseur)
+                return self._convertir(valeurs), sens
+            except CurseurInvalide:
+                pass
+        return None, SUIVANT
+
+    def _requete(self, valeurs, sens):
+        """Lignes d'une page, plus une pour savoir s'il y en a d'autres (ordre inversé vers l'arrière)"""
+        if sens == PRECEDENT:
+            qs = self.queryset.filter(self._apres(valeurs, inverse=True))
+            return qs.order_by(*[self._inverser(ordre) for ordre in self.ordre])[:self.par_page + 1]
+        qs = self.queryset
+        if valeurs is not None:
+            qs = qs.filter(self._apres(valeurs))
+        return qs.order_by(*self.ordre)[:self.par_page + 1]
+
+    def requete(self, curseur=None):
+        """Queryset non évalué de la page désignée par un curseur (pour ``EXPLAIN``)"""
+        return self._requete(*self._position(curseur))
+
+    def page(self, curseur=None):
+        """Page désignée par un curseur (la première si ``curseur`` est vide ou invalide)"""
+        valeurs, sens = self._position(curseur)
+        objets = list(self._requete(valeurs, sens))
+        if sens == PRECEDENT:
+            plus = len(objets) > self.par_page
+            objets = objets[:self.par_page][::-1]
+            a_precedent, a_suivant = plus, True
+        else:
+            a_suivant = len(objets) > self.par_page
+            objets = objets[:self.par_page]
+            a_precedent = valeurs is not None
+
+        if not objets:
+            # Page vide (dernière page dépassée ou curseur obsolète)
+            return PageCurseur([], nombre_total=self.nombre_total())
+
+        return PageCurseur(
+            objets,
+            curseur_suivant=encoder_curseur(self._valeurs(objets[-1]), SUIVANT) if a_suivant else None,
+            curseur_precedent=encoder_curseur(self._valeurs(objets[0]), PRECEDENT) if a_precedent else None,
+            nombre_total=self.nombre_total(),
+        )
+
+    def nombre_total(self):
+        """Nombre total de résultats selon le mode de comptage (``None`` si désactivé)"""
+        if self.comptage is None:
+            return None
+        if self.comptage == 'exact':
+            return self.queryset.count()
+        return comptage_en_cache(self.queryset)
+
+
+def comptage_en_cache(queryset):
+    """COUNT du queryset mis en cache ``DUREE_CACHE_COMPTAGE`` secondes (clé : la requête SQL)"""
+    requete = str(queryset.order_by().query)
+    cle = 'pagination:comptage:' + hashlib.md5(requete.encode()).hexdigest()
+    return cache.get_or_set(cle, queryset.count, DUREE_CACHE_COMPTAGE)
+
+
+def estimation_postgresql(queryset):
+    """Nombre de lignes de la table estimé par le planificateur (pg_class.reltuples, sans parcours)
+
+    Retourne ``None`` si la table n'a jamais été analysée.
+    """
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table]
+        )
+        ligne = cursor.fetchone()
+    # -1 (PostgreSQL 14+) ou 0 avant le premier ANALYZE
+    if ligne is None or ligne[0] <= 0:
+        return None
+    return ligne[0]
+
+
+class PaginateurEstime(Paginator):
+    """Paginateur de l'administration pour les grandes tables (``ModelAdmin.paginator``)
+
+    Sans filtre, sous PostgreSQL, le nombre de lignes vient des statistiques
+    du planificateur dès que la table dépasse ``SEUIL_ESTIMATION`` lignes ;
+    sinon (filtres, SQLite) le COUNT est mis en cache quelques instants. Le
+    total affiché peut donc être légèrement décalé : une page est toujours
+    remplie avec les lignes présentes, même au-delà du total estimé.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if connections[queryset.db].vendor == 'postgresql' and not queryset.query.where:
+            estimation = estimation_postgresql(queryset)
+            if estimation is not None and estimation >= SEUIL_ESTIMATION:
+                return estimation
+        return comptage_en_cache(queryset)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        debut = (number - 1) * self.per_page
+        # Pas de troncature au total : il peut être en retard sur la table
+        return self._get_page(self.object_list[debut:debut + self.per_page], number, self)
+
+
+def url_page(request, **parametres):
+    """Chaîne de requête de la page courante avec certains paramètres remplacés"""
+    requete = request.GET.copy()
+    for nom, valeur in parametres.items():
+        if valeur is None:
+            requete.pop(nom, None)
+        else:
+            requete[nom] = valeur
+    return '?' + requete.urlencode()
@@ -0,0 +1,114 @@
+"""
+Vérification des plans d'exécution des requêtes fréquentes
+
+Les requêtes des vues les plus sollicitées (catalogue, fiche produit, panier,
+historique des commandes, dashboard, exports) sont obtenues des fonctions qui
+les construisent pour les vues (``views``, ``similarites``, ``statistiques``,
+``PaginateurCurseur.requete``) avec des paramètres représentatifs, puis
+passées à ``EXPLAIN`` : une requête modifiée dans une vue est vérifiée telle
+quelle. Une requête qui parcourt entièrement l'une des tables volumineuses
+(``TABLES_SURVEILLEES``) signale un index manquant.
+
+Sous PostgreSQL, les parcours séquentiels sont désactivés le temps de
+l'``EXPLAIN`` (``enable_seqscan = off``) : sur une petite base de test le
+planificateur les préférerait même en présence d'un index adapté.
+"""
+import re
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Produit, Commande, Panier, AvisProduit, ItemPanier, Vente, VenteJournaliere, ProduitSimilaire
+from .exports import ventes_filtrees
+from .pagination import PaginateurCurseur, encoder_curseur
+from . import similarites, statistiques, views
+
+TABLES_SURVEILLEES = {
+    Produit._meta.db_table,
+    Vente._meta.db_table,
+    VenteJournaliere._meta.db_table,
+    Panier._meta.db_table,
+    Commande._meta.db_table,
+    AvisProduit._meta.db_table,
+    ItemPanier._meta.db_table,
+    ProduitSimilaire._meta.db_table,
+}
+
+# Parcours complet d'une table : « SCAN table » (SQLite, sans index) ou « Seq Scan on table » (PostgreSQL)
+_PARCOURS_SQLITE = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?: AS \w+)?(?P<index> USING (?:COVERING )?INDEX)?')
+_PARCOURS_POSTGRESQL = re.compile(r'Seq Scan on (\w+)')
+
+
+def page_catalogue(parametres, curseur=None):
+    """Requête d'une page du catalogue, construite comme dans la vue"""
+    produits, filtres = views.produits_catalogue(parametres)
+    paginateur = PaginateurCurseur(produits, views.PRODUITS_PAR_PAGE, ordre=views.TRIS_CATALOGUE[filtres['tri']])
+    return paginateur.requete(curseur)
+
+
+def requetes_critiques():
+    """Liste de (nom, queryset) : les requêtes des vues fréquentes, obtenues des fonctions qui les construisent"""
+    utilisateur_id = 1
+    produit_id = 1
+    categorie_id = 1
+    aujourdhui = timezone.localdate()
+    page_suivante = encoder_curseur([timezone.now(), 1])
+    commandes = PaginateurCurseur(views.commandes_client(utilisateur_id), views.COMMANDES_PAR_PAGE, ordre=views.ORDRE_COMMANDES)
+
+    return [
+        # catalogue : première page et page suivante (curseur)
+        ('catalogue', page_catalogue({})),
+        ('catalogue_page_suivante', page_catalogue({}, page_suivante)),
+        ('catalogue_categorie', page_catalogue({'categorie': str(categorie_id)})),
+        ('catalogue_promotions', page_catalogue({'promotion': '1'})),
+        ('catalogue_par_note', page_catalogue({'tri': 'note'})),
+        # detail_produit
+        ('produits_similaires', similarites.similaires_calcules(produit_id)),
+        ('produits_similaires_categorie', similarites.produits_meme_categorie(categorie_id, [produit_id])),
+        ('avis_produit', views.avis_approuves(produit_id)),
+        # panier, ajouter_panier, passer_commande
+        ('panier_en_cours', views.paniers_en_cours(utilisateur_id)),
+        ('articles_panier', views.articles_panier().filter(panier_id__in=[1])),
+        # mes_commandes : première page et page suivante
+        ('mes_commandes', commandes.requete()),
+        ('mes_commandes_page_suivante', commandes.requete(page_suivante)),
+        # dashboard et exports
+        ('ventes_par_jour', statistiques.requete_ventes_par_jour(aujourdhui)),
+        ('ventes_categories', statistiques.requete_ventes_categories(aujourdhui)),
+        ('top_produits', statistiques.requete_top_produits(aujourdhui)),
+        ('ventes_periode', ventes_filtrees(debut=aujourdhui - timedelta(days=30), fin=aujourdhui)[:100]),
+    ]
+
+
+def parcours_complets(plan, vendor=None):
+    """Tables surveillées parcourues entièrement d'après le texte d'un plan"""
+    vendor = vendor or connection.vendor
+    tables = set()
+    if vendor == 'postgresql':
+        tables.update(_PARCOURS_POSTGRESQL.findall(plan))
+    else:
+        for correspondance in _PARCOURS_SQLITE.finditer(plan):
+            # « SCAN table USING INDEX » parcourt un index dans l'ordre : pas un parcours de table
+            if not correspondance.group('index'):
+                tables.add(correspondance.group(1))
+    return sorted(tables & TABLES_SURVEILLEES)
+
+
+def expliquer(queryset):
+    """Texte du plan d'exécution d'un queryset"""
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic():
+        with connection.cursor() as curseur:
+            curseur.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def verifier_plans(requetes=None):
+    """Retourne [(nom, plan, tables parcourues entièrement)] pour chaque requête fréquente"""
+    if requetes is None:
+        requetes = requetes_critiques()
+    resultats = []
+    for nom, queryset in requetes:
+        plan = expliquer(queryset)
+        resultats.append((nom, plan, parcours_complets(plan)))
+    return resultats
@@ -0,0 +1,268 @@
+"""
+Prévisions des ventes
+
+Les ventes quotidiennes sont lues en une requête dans les cumuls journaliers
+(VenteJournaliere) et rangées dans une matrice NumPy (une ligne par série :
+produit, catégorie ou total de la boutique ; une colonne par jour). Toutes les
+séries sont ensuite lissées en même temps par un modèle de Holt-Winters
+additif (niveau, tendance amortie, saisonnalité hebdomadaire) : la boucle
+porte sur les jours, jamais sur les produits.
+
+Les paramètres de lissage de chaque série sont choisis par recherche sur
+une grille (erreur de prévision à un jour la plus faible), évaluée elle aussi
+en bloc, puis mis en cache ``DUREE_CACHE_PARAMETRES`` secondes : les appels
+suivants ne font qu'un passage sur l'historique.
+"""
+from datetime import timedelta
+from itertools import product
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from .models import VenteJournaliere
+
+
+SAISON = 7                      # saisonnalité hebdomadaire
+NOMBRE_JOURS_HISTORIQUE = 365
+HORIZON = 30                    # jours prévus par défaut (« mois prochain »)
+AMORTISSEMENT = 0.9             # amortissement de la tendance (phi)
+DUREE_CACHE_PARAMETRES = 24 * 3600
+
+GRILLE_ALPHA = (0.05, 0.1, 0.2, 0.3, 0.5)
+GRILLE_BETA = (0.0, 0.02, 0.1)
+GRILLE_GAMMA = (0.05, 0.15, 0.3)
+
+# Niveau -> champ de regroupement des cumuls (None : total de la boutique)
+NIVEAUX = {
+    'produit': 'produit_id',
+    'categorie': 'categorie_id',
+    'total': None,
+}
+GRANDEURS = ('montant_total', 'quantite')
+
+
+class NiveauInconnu(ValueError):
+    """Niveau de prévision différent de produit, catégorie ou total"""
+
+
+# ==================== SÉRIES ====================
+
+def series_journalieres(debut, fin, niveau='total', grandeur='montant_total'):
+    """Ventes quotidiennes de ``debut`` à ``fin`` inclus, en une requête
+
+    Retourne (identifiants, matrice) : une ligne par série, une colonne par
+    jour, les jours sans vente valant 0. Pour le niveau ``total`` la seule
+    série a l'identifiant ``None``.
+    """
+    if niveau not in NIVEAUX:
+        raise NiveauInconnu(niveau)
+    if grandeur not in GRANDEURS:
+        raise ValueError(grandeur)
+    champ = NIVEAUX[niveau]
+    nombre_jours = (fin - debut).days + 1
+    cumuls = VenteJournaliere.objects.filter(date__gte=debut, date__lte=fin)
+
+    if champ is None:
+        lignes = cumuls.values('date').annotate(valeur=Sum(grandeur)).values_list('date', 'valeur').order_by()
+        lignes = [(None, date, valeur) for date, valeur in lignes]
+    else:
+        lignes = cumuls.values(champ, 'date').annotate(valeur=Sum(grandeur)).values_list(champ, 'date', 'valeur').order_by()
+
+    if champ is None:
+        identifiants = [None]
+    else:
+        identifiants = sorted({identifiant for identifiant, date, valeur in lignes})
+    matrice = np.zeros((len(identifiants), max(nombre_jours, 0)))
+    if lignes:
+        rang = {identifiant: i for i, identifiant in enumerate(identifiants)}
+        lignes_idx = np.fromiter((rang[identifiant] for identifiant, date, valeur in lignes), dtype=np.intp, count=len(lignes))
+        colonnes = np.fromiter(((date - debut).days for identifiant, date, valeur in lignes), dtype=np.intp, count=len(lignes))
+        valeurs = np.fromiter((float(valeur or 0) for identifiant, date, valeur in lignes), dtype=float, count=len(lignes))
+        np.add.at(matrice, (lignes_idx, colonnes), valeurs)
+    return identifiants, matrice
+
+
+def _sans_jours_initiaux_vides(y):
+    """Retire les jours antérieurs à la première vente (boutique récente)"""
+    jours_vendus = np.flatnonzero(y.any(axis=0))
+    return y[:, jours_vendus[0]:] if len(jours_vendus) else y[:, :0]
+
+
+# ==================== MODÈLE ====================
+
+def _etat_initial(y):
+    """Niveau, tendance et saisons initiaux à partir des deux premières semaines"""
+    semaine_1 = y[:, :SAISON].mean(axis=1)
+    semaine_2 = y[:, SAISON:2 * SAISON].mean(axis=1)
+    niveau = semaine_1
+    tendance = (semaine_2 - semaine_1) / SAISON
+    saisons = y[:, :SAISON] - semaine_1[:, None]
+    return niveau, tendance, saisons
+
+
+def lisser(y, alpha, beta, gamma, phi=AMORTISSEMENT):
+    """Passe de Holt-Winters sur toutes les séries de ``y`` (séries x jours)
+
+    ``alpha``, ``beta`` et ``gamma`` sont des scalaires ou des tableaux
+    diffusables vers (..., nombre de séries) : une forme (G, n) évalue G jeux
+    de paramètres sur les n séries en une seule passe. Retourne l'état final
+    (niveau, tendance, saisons) et la somme des carrés des erreurs à un jour.
+    """
+    alpha, beta, gamma = (np.asarray(p, dtype=float) for p in (alpha, beta, gamma))
+    nombre_series, nombre_jours = y.shape
+    forme = np.broadcast_shapes(alpha.shape, beta.shape, gamma.shape, (nombre_series,))
+
+    niveau, tendance, saisons = _etat_initial(y)
+    niveau = np.broadcast_to(niveau, forme).copy()
+    tendance = np.broadcast_to(tendance, forme).copy()
+    saisons = np.broadcast_to(saisons, forme + (SAISON,)).copy()
+    erreurs = np.zeros(forme)
+
+    for t in range(nombre_jours):
+        observe = y[:, t]
+        saison = saisons[..., t % SAISON]
+        prevu = niveau + phi * tendance + saison
+        erreurs += (observe - prevu) ** 2
+        precedent = niveau
+        niveau = alpha * (observe - saison) + (1 - alpha) * (precedent + phi * tendance)
+        tendance = beta * (niveau - precedent) + (1 - beta) * phi * tendance
+        saisons[..., t % SAISON] = gamma * (observe - niveau) + (1 - gamma) * saison
+    return (niveau, tendance, saisons), erreurs
+
+
+def ajuster(y, phi=AMORTISSEMENT):
+    """Paramètres (alpha, beta, gamma) de chaque série, choisis sur la grille
+
+    Retourne un tableau (nombre de séries, 3).
+    """
+    grille = np.array(list(product(GRILLE_ALPHA, GRILLE_BETA, GRILLE_GAMMA)))
+    alpha, beta, gamma = (grille[:, i, None] for i in range(3))
+    _, erreurs = lisser(y, alpha, beta, gamma, phi)
+    meilleurs = erreurs.argmin(axis=0)
+    return grille[meilleurs]
+
+
+def projeter(etat, nombre_jours_historique, horizon, phi=AMORTISSEMENT):
+    """Prévisions quotidiennes (séries x horizon) à partir de l'état final, jamais négatives"""
+    niveau, tendance, saisons = etat
+    pas = np.arange(1, horizon + 1)
+    cumul_amorti = np.cumsum(phi ** pas)
+    indices = (nombre_jours_historique + pas - 1) % SAISON
+    prevu = niveau[:, None] + tendance[:, None] * cumul_amorti + saisons[:, indices]
+    return np.clip(prevu, 0, None)
+
+
+def prevoir_series(y, parametres=None, horizon=HORIZON, phi=AMORTISSEMENT):
+    """Prévisions quotidiennes de chaque série de ``y`` (ajuste les paramètres si absents)
+
+    Les séries de moins de deux semaines sont prolongées par leur moyenne.
+    """
+    nombre_series, nombre_jours = y.shape
+    if nombre_jours < 2 * SAISON:
+        moyenne = y.mean(axis=1) if nombre_jours else np.zeros(nombre_series)
+        return np.repeat(moyenne[:, None], horizon, axis=1), parametres
+    if parametres is None:
+        parametres = ajuster(y, phi)
+    etat, _ = lisser(y, parametres[:, 0], parametres[:, 1], parametres[:, 2], phi)
+    return projeter(etat, nombre_jours, horizon, phi), parametres
+
+
+# ==================== PRÉVISIONS ====================
+
+def _cle_parametres(niveau, grandeur):
+    return f'previsions:parametres:{niveau}:{grandeur}'
+
+
+def prevoir(niveau='total', horizon=HORIZON, aujourdhui=None, grandeur='montant_total',
+            nombre_jours_historique=NOMBRE_JOURS_HISTORIQUE):
+    """Prévisions des ``horizon`` prochains jours à partir de l'historique jusqu'à hier
+
+    Retourne {identifiant: tableau des prévisions quotidiennes}. Les
+    paramètres ajustés sont réutilisés depuis le cache ; seules les séries
+    nouvelles (produit récemment vendu) sont ajustées.
+    """
+    if aujourdhui is None:
+        aujourdhui = timezone.localdate()
+    fin = aujourdhui - timedelta(days=1)
+    debut = aujourdhui - timedelta(days=nombre_jours_historique)
+    identifiants, y = series_journalieres(debut, fin, niveau, grandeur)
+    if not identifiants:
+        return {}
+    y = _sans_jours_initiaux_vides(y)
+
+    connus = cache.get(_cle_parametres(niveau, grandeur)) or {}
+    manquants = [i for i, identifiant in enumerate(identifiants) if identifiant not in connus]
+    if manquants and y.shape[1] >= 2 * SAISON:
+        for i, parametres in zip(manquants, ajuster(y[manquants])):
+            connus[identifiants[i]] = tuple(parametres)
+        cache.set(_cle_parametres(niveau, grandeur), connus, DUREE_CACHE_PARAMETRES)
+
+    parametres = np.array([connus.get(identifiant, (0, 0, 0)) for identifiant in identifiants])
+    prevues, _ = prevoir_series(y, parametres, horizon)
+    return dict(zip(identifiants, prevues))
+
+
+def prevision_produits(horizon=HORIZON, aujourdhui=None, grandeur='montant_total'):
+    """Total prévu sur ``horizon`` jours pour chaque produit vendu ({produit_id: total})"""
+    return {
+        produit_id: float(prevues.sum())
+        for produit_id, prevues in prevoir('produit', horizon, aujourdhui, grandeur).items()
+    }
+
+
+def prevision_categories(horizon=HORIZON, aujourdhui=None, grandeur='montant_total'):
+    """Total prévu sur ``horizon`` jours pour chaque catégorie vendue ({categorie_id: total})"""
+    return {
+        categorie_id: float(prevues.sum())
+        for categorie_id, prevues in prevoir('categorie', horizon, aujourdhui, grandeur).items()
+    }
+
+
+def prevision_totale(horizon=HORIZON, aujourdhui=None):
+    """Chiffre d'affaires prévu sur ``horizon`` jours pour toute la boutique"""
+    prevues = prevoir('total', horizon, aujourdhui).get(None)
+    return float(prevues.sum()) if prevues is not None else 0.0
+
+
+def invalider_parametres():
+    """Oublie les paramètres ajustés (ils seront recalculés au prochain appel)"""
+    cache.delete_many([_cle_parametres(niveau, grandeur) for niveau in NIVEAUX for grandeur in GRANDEURS])
+
+
+# ==================== ÉVALUATION ====================
+
+def backtest(niveau='total', horizon=HORIZON, aujourdhui=None, grandeur='montant_total',
+             nombre_jours_historique=NOMBRE_JOURS_HISTORIQUE):
+    """Compare le modèle à l'ancienne moyenne des 3 derniers mois sur les ``horizon`` derniers jours
+
+    Le modèle est ajusté sur l'historique qui précède la période de test.
+    L'erreur est le WAPE (somme des écarts absolus / somme des ventes) des
+    totaux par série sur la période et des ventes jour par jour.
+    """
+    if aujourdhui is None:
+        aujourdhui = timezone.localdate()
+    fin = aujourdhui - timedelta(days=1)
+    debut = aujourdhui - timedelta(days=nombre_jours_historique)
+    identifiants, y = series_journalieres(debut, fin, niveau, grandeur)
+    y = _sans_jours_initiaux_vides(y)
+    if not identifiants or y.shape[1] < horizon + 2 * SAISON:
+        return None
+    apprentissage, reel = y[:, :-horizon], y[:, -horizon:]
+
+    modele, _ = prevoir_series(apprentissage, horizon=horizon)
+    # Ancienne méthode : moyenne journalière des 90 derniers jours
+    moyenne = np.repeat(apprentissage[:, -90:].mean(axis=1)[:, None], horizon, axis=1)
+
+    def wape(prevu, observe):
+        total = np.abs(observe).sum()
+        return float(np.abs(prevu - observe).sum() / total) if total else None
+
+    return {
+        'nombre_series': len(identifiants),
+        'horizon': horizon,
+        'total_reel': float(reel.sum()),
+        'wape_modele': wape(modele.sum(axis=1), reel.sum(axis=1)),
+        'wape_moyenne': wape(moyenne.sum(axis=1), reel.sum(axis=1)),
+        'wape_journalier_modele': wape(modele, reel),
+        'wape_journalier_moyenne': wape(moyenne, reel),
+    }
@@ -0,0 +1,124 @@
+"""
+Planification du réapprovisionnement
+
+Pour chaque produit actif, la vitesse de vente (moyenne et écart-type des
+quantités vendues par jour sur ``FENETRE_JOURS``) est calculée en une seule
+requête groupée sur les cumuls journaliers (VenteJournaliere), les jours sans
+vente comptant pour 0. On en déduit :
+
+- le stock de sécurité : z × écart-type × √délai, z dépendant du niveau de
+  service visé ;
+- le point de commande : ventes attendues pendant le délai de livraison du
+  fournisseur + stock de sécurité, jamais inférieur à ``quantite_minimum`` ;
+- le stock cible : point de commande + ventes attendues pendant
+  ``JOURS_COUVERTURE`` jours. La quantité à commander est l'écart entre le
+  stock cible et le stock courant.
+
+Les résultats sont enregistrés dans PlanReapprovisionnement par la commande
+``planifier_reapprovisionnement`` (à lancer chaque nuit) ; le dashboard et
+l'administration les lisent sans recalcul, avec le stock courant.
+"""
+import math
+from datetime import timedelta
+from statistics import NormalDist
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, F
+from django.utils import timezone
+from .models import Produit, VenteJournaliere, PlanReapprovisionnement
+from . import cache_dashboard
+
+
+PARAMETRES_PAR_DEFAUT = {
+    'FENETRE_JOURS': 56,
+    'NIVEAU_SERVICE': 0.95,
+    'JOURS_COUVERTURE': 14,
+    'DELAI_PAR_DEFAUT': 7,  # produits sans fournisseur
+}
+
+TAILLE_LOT = 1000
+
+
+def parametres():
+    """Paramètres du planificateur (réglage REAPPROVISIONNEMENT complété par les valeurs par défaut)"""
+    return {**PARAMETRES_PAR_DEFAUT, **getattr(settings, 'REAPPROVISIONNEMENT', {})}
+
+
+def vitesses_de_vente(aujourdhui, fenetre_jours):
+    """Moyenne et écart-type des ventes quotidiennes par produit, en une requête
+
+    Retourne {produit_id: (moyenne, écart-type)} pour les produits vendus sur
+    les ``fenetre_jours`` jours précédant ``aujourdhui``.
+    """
+    debut = aujourdhui - timedelta(days=fenetre_jours)
+    lignes = VenteJournaliere.objects.filter(
+        date__gte=debut,
+        date__lt=aujourdhui
+    ).values('produit_id').annotate(
+        somme=Sum('quantite'),
+        somme_carres=Sum(F('quantite') * F('quantite')),
+    ).values_list('produit_id', 'somme', 'somme_carres').order_by()
+
+    vitesses = {}
+    for produit_id, somme, somme_carres in lignes:
+        moyenne = somme / fenetre_jours
+        # Variance d'échantillon sur tous les jours de la fenêtre, y compris ceux sans vente
+        variance = (somme_carres - somme * somme / fenetre_jours) / (fenetre_jours - 1) if fenetre_jours > 1 else 0
+        vitesses[produit_id] = (moyenne, math.sqrt(max(variance, 0)))
+    return vitesses
+
+
+def calculer_plan(moyenne, ecart_type, delai, quantite_minimum, z, jours_couverture):
+    """Retourne (stock de sécurité, point de commande, stock cible) d'un produit"""
+    stock_securite = math.ceil(z * ecart_type * math.sqrt(delai))
+    point_commande = max(math.ceil(moyenne * delai) + stock_securite, quantite_minimum)
+    stock_cible = point_commande + math.ceil(moyenne * jours_couverture)
+    return stock_securite, point_commande, stock_cible
+
+
+def planifier(aujourdhui=None, **reglages):
+    """Recalcule les plans de réapprovisionnement de tout le catalogue actif
+
+    Nombre de requêtes constant : vitesses de vente, produits actifs, puis
+    remplacement des plans en masse dans une transaction. Retourne le nombre
+    de plans enregistrés.
+    """
+    params = {**parametres(), **reglages}
+    if aujourdhui is None:
+        aujourdhui = timezone.localdate()
+    fenetre = params['FENETRE_JOURS']
+    z = NormalDist().inv_cdf(params['NIVEAU_SERVICE'])
+
+    vitesses = vitesses_de_vente(aujourdhui, fenetre)
+    produits = Produit.objects.actifs().values_list(
+        'id', 'fournisseur_id', 'fournisseur__delai_livraison_jours', 'quantite_minimum'
+    )
+
+    maintenant = timezone.now()
+    plans = []
+    for produit_id, fournisseur_id, delai, quantite_minimum in produits:
+        if delai is None:
+            delai = params['DELAI_PAR_DEFAUT']
+        moyenne, ecart_type = vitesses.get(produit_id, (0.0, 0.0))
+        stock_securite, point_commande, stock_cible = calculer_plan(
+            moyenne, ecart_type, delai, quantite_minimum, z, params['JOURS_COUVERTURE']
+        )
+        plans.append(PlanReapprovisionnement(
+            produit_id=produit_id,
+            fournisseur_id=fournisseur_id,
+            ventes_par_jour=moyenne,
+            ecart_type_jour=ecart_type,
+            delai_livraison_jours=delai,
+            stock_securite=stock_securite,
+            point_commande=point_commande,
+            stock_cible=stock_cible,
+            date_calcul=maintenant,
+        ))
+
+    with transaction.atomic():
+        PlanReapprovisionnement.objects.all().delete()
+        PlanReapprovisionnement.objects.bulk_create(plans, batch_size=TAILLE_LOT)
+
+    cache_dashboard.invalider('catalogue')
+    return len(plans)
+
@@ -0,0 +1,222 @@
+"""
+Recherche plein texte des produits
+
+- SQLite : table virtuelle FTS5 (tokenizer ``unicode61 remove_diacritics 2``),
+  classement par ``bm25`` ;
+- PostgreSQL : table ``tsvector`` indexée en GIN avec une configuration
+  française sans accents (``unaccent`` + ``french_stem``), classement par
+  ``ts_rank`` ;
+- autres bases : repli sur ``icontains``.
+
+L'index est tenu à jour par les signaux de ``Produit`` et ``Categorie`` et
+peut être reconstruit avec la commande ``reconstruire_index_recherche``.
+"""
+import re
+import unicodedata
+from django.db import connection
+from django.db.models import Q
+
+
+TABLE_FTS = 'boutique_app_produit_fts'
+TABLE_TSVECTOR = 'boutique_app_produit_recherche'
+CONFIGURATION_PG = 'boutique_fr'
+TABLE_PRODUIT = 'boutique_app_produit'
+
+# Poids des colonnes : nom > catégorie > description
+POIDS_FTS = (10.0, 1.0, 3.0)  # nom, description, categorie
+
+TAILLE_LOT = 1000
+LONGUEUR_MAX_REQUETE = 200
+
+
+def normaliser(texte):
+    """Minuscules sans accents (« Crème Brûlée » -> « creme brulee »)"""
+    decompose = unicodedata.normalize('NFKD', texte or '')
+    return ''.join(c for c in decompose if not unicodedata.combining(c)).lower()
+
+
+def mots(texte):
+    """Mots significatifs d'une requête utilisateur"""
+    return re.findall(r'\w+', (texte or '')[:LONGUEUR_MAX_REQUETE])
+
+
+class MoteurRecherche:
+    """Repli sans index : recherche par sous-chaîne, sans classement"""
+
+    def disponible(self):
+        return True
+
+    def indexer(self, produits):
+        pass
+
+    def supprimer(self, ids):
+        pass
+
+    def vider(self):
+        pass
+
+    def filtrer(self, queryset, texte):
+        filtre = Q()
+        for mot in mots(texte):
+            filtre &= Q(nom__icontains=mot) | Q(description__icontains=mot)
+        return queryset.filter(filtre)
+
+    def reconstruire(self):
+        """Réindexe tous les produits par lots"""
+        from .models import Produit
+        self.vider()
+        nombre = 0
+        produits = Produit.objects.select_related('categorie').order_by('id')
+        lot = []
+        for produit in produits.iterator(chunk_size=TAILLE_LOT):
+            lot.append(produit)
+            if len(lot) >= TAILLE_LOT:
+                self._inserer(lot)
+                nombre += len(lot)
+                lot = []
+        if lot:
+            self._inserer(lot)
+            nombre += len(lot)
+        return nombre
+
+    def _inserer(self, produits):
+        self.indexer(produits)
+
+
+class MoteurSQLite(MoteurRecherche):
+    """Index FTS5 (accents ignorés par le tokenizer)"""
+
+    def disponible(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE_FTS]
+            )
+            return cursor.fetchone() is not None
+
+    def indexer(self, produits):
+        produits = list(produits)
+        if not produits:
+            return
+        self.supprimer([p.id for p in produits])
+        self._inserer(produits)
+
+    def _inserer(self, produits):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE_FTS} (rowid, nom, description, categorie) VALUES (%s, %s, %s, %s)',
+                [(p.id, p.nom, p.description, p.categorie.nom) for p in produits]
+            )
+
+    def supprimer(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            for debut in range(0, len(ids), TAILLE_LOT):
+                lot = ids[debut:debut + TAILLE_LOT]
+                marqueurs = ', '.join(['%s'] * len(lot))
+                cursor.execute(f'DELETE FROM {TABLE_FTS} WHERE rowid IN ({marqueurs})', lot)
+
+    def vider(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE_FTS}')
+
+    def expression(self, texte):
+        """Requête FTS5 : chaque mot entre guillemets, en préfixe, tous requis"""
+        return ' '.join('"{}"*'.format(mot.replace('"', '""')) for mot in mots(texte))
+
+    def filtrer(self, queryset, texte):
+        requete = self.expression(texte)
+        if not requete:
+            return queryset
+        poids = ', '.join(str(p) for p in POIDS_FTS)
+        # Jointure directe sur la table FTS : bm25() n'est disponible que dans
+        # la requête qui porte le MATCH (une sous-requête corrélée le
+        # réévaluerait pour chaque ligne). bm25 est négatif : plus il est
+        # petit, plus le résultat est pertinent.
+        return queryset.extra(
+            tables=[TABLE_FTS],
+            where=[f'{TABLE_FTS}.rowid = "{TABLE_PRODUIT}"."id"', f'{TABLE_FTS} MATCH %s'],
+            params=[requete],
+            select={'pertinence': f'-bm25({TABLE_FTS}, {poids})'},
+        ).order_by('-pertinence', '-date_creation', '-id')
+
+
+class MoteurPostgreSQL(MoteurRecherche):
+    """Index tsvector + GIN avec la configuration française sans accents"""
+
+    DOCUMENT = (
+        f"setweight(to_tsvector('{CONFIGURATION_PG}', %s), 'A') || "
+        f"setweight(to_tsvector('{CONFIGURATION_PG}', %s), 'B') || "
+        f"setweight(to_tsvector('{CONFIGURATION_PG}', %s), 'C')"
+    )
+
+    def disponible(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [TABLE_TSVECTOR])
+            return cursor.fetchone()[0] is not None
+
+    def indexer(self, produits):
+        produits = list(produits)
+        if not produits:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE_TSVECTOR} (produit_id, document) VALUES (%s, {self.DOCUMENT}) '
+                f'ON CONFLICT (produit_id) DO UPDATE SET document = EXCLUDED.document',
+                [(p.id, p.nom, p.categorie.nom, p.description) for p in produits]
+            )
+
+    def supprimer(self, ids):
+        ids = list(ids)
+        if ids:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {TABLE_TSVECTOR} WHERE produit_id = ANY(%s)', [ids])
+
+    def vider(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {TABLE_TSVECTOR}')
+
+    def expression(self, texte):
+        """Requête tsquery : tous les mots requis, en préfixe"""
+        return ' & '.join(f'{mot}:*' for mot in mots(texte))
+
+    def filtrer(self, queryset, texte):
+        requete = self.expression(texte)
+        if not requete:
+            return queryset
+        tsquery = f"to_tsquery('{CONFIGURATION_PG}', %s)"
+        return queryset.extra(
+            tables=[TABLE_TSVECTOR],
+            where=[f'{TABLE_TSVECTOR}.produit_id = "{TABLE_PRODUIT}"."id"', f'{TABLE_TSVECTOR}.document @@ {tsquery}'],
+            params=[requete],
+            select={'pertinence': f'ts_rank({TABLE_TSVECTOR}.document, {tsquery})'},
+            select_params=[requete],
+        ).order_by('-pertinence', '-date_creation', '-id')
+
+
+def moteur():
+    """Moteur de recherche adapté à la base de données courante"""
+    if connection.vendor == 'sqlite':
+        return MoteurSQLite()
+    if connection.vendor == 'postgresql':
+        return MoteurPostgreSQL()
+    return MoteurRecherche()
+
+
+def rechercher(queryset, texte):
+    """Filtre un queryset de produits et le trie par pertinence (colonne ``pertinence``)"""
+    return moteur().filtrer(queryset, texte)
+
+
+def indexer_produits(produits):
+    moteur().indexer(produits)
+
+
+def desindexer_produits(ids):
+    moteur().supprimer(ids)
+
+
+def reconstruire_index():
+    """Reconstruit entièrement l'index ; retourne le nombre de produits indexés"""
+    return moteur().reconstruire()
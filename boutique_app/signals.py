@@ -1,26 +1,167 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import Commande, Panier, Vente, ItemPanier
+from django.utils import timezone
+from .models import Commande, Panier, Vente, ItemPanier, Produit, Categorie, AvisProduit
+from .cumuls import cumuler_ventes, decompter_vente
+from .commandes import enregistrer_ventes
+from . import cache_dashboard
+from .recherche import indexer_produits, desindexer_produits
+from . import suggestions
+from . import caisse
+from .notes import recalculer_notes
+from . import images
 
 
 @receiver(post_save, sender=Commande)
 def creer_ventes_commande(sender, instance, created, **kwargs):
-    """Crée des enregistrements de vente lorsqu'une commande est créée"""
+    """Crée les ventes et décrémente le stock lorsqu'une commande est créée"""
     if created and instance.panier:
-        # Créer une vente pour chaque article du panier
-        for item in instance.panier.items.all():
-            Vente.objects.create(
-                produit=item.produit,
-                quantite=item.quantite,
-                prix_unitaire=item.prix_unitaire,
-                montant_total=item.sous_total,
-                commande=instance
-            )
-            # Mettre à jour le stock
-            item.produit.quantite_stock -= item.quantite
-            if item.produit.quantite_stock < 0:
-                item.produit.quantite_stock = 0
-            item.produit.save()
+        enregistrer_ventes(instance)
+
+
+@receiver(pre_save, sender=Vente)
+def memoriser_vente(sender, instance, **kwargs):
+    """Retient l'état enregistré d'une vente modifiée (pour corriger ses cumuls)"""
+    if instance.pk and not kwargs.get('raw'):
+        instance._ancienne_vente = Vente.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Vente)
+def cumuler_vente(sender, instance, created, **kwargs):
+    """Ajoute une vente aux cumuls journaliers ; une vente modifiée y remplace l'ancienne"""
+    ancienne = getattr(instance, '_ancienne_vente', None)
+    if ancienne is not None:
+        instance._ancienne_vente = None
+        champs = ('produit_id', 'quantite', 'montant_total', 'date_vente')
+        if all(getattr(ancienne, champ) == getattr(instance, champ) for champ in champs):
+            return
+        with transaction.atomic():
+            decompter_vente(ancienne)
+            cumuler_ventes([instance])
+    elif created:
+        cumuler_ventes([instance])
+
+
+@receiver(post_delete, sender=Vente)
+def retirer_vente_cumuls(sender, instance, **kwargs):
+    """Retire une vente supprimée des cumuls journaliers"""
+    decompter_vente(instance)
+
+
+@receiver(post_save, sender=Vente)
+@receiver(post_delete, sender=Vente)
+def invalider_dashboard_ventes(sender, instance, **kwargs):
+    """Invalide les périodes du dashboard touchées par une vente"""
+    cache_dashboard.invalider_ventes(timezone.localdate(instance.date_vente))
+
+
+@receiver(post_save, sender=Commande)
+@receiver(post_delete, sender=Commande)
+def invalider_dashboard_commandes(sender, instance, created=False, **kwargs):
+    """Invalide les compteurs de commandes (et les ventes du jour à la création)"""
+    cache_dashboard.invalider('commandes')
+    if created:
+        # Les ventes de la commande sont créées en masse, sans signal par vente
+        cache_dashboard.invalider_ventes()
+
+
+@receiver(post_save, sender=Panier)
+def invalider_dashboard_paniers(sender, instance, **kwargs):
+    """Invalide le nombre de paniers validés"""
+    cache_dashboard.invalider('commandes')
+
+
+@receiver(post_save, sender=Produit)
+@receiver(post_delete, sender=Produit)
+@receiver(post_save, sender=Categorie)
+@receiver(post_delete, sender=Categorie)
+def invalider_dashboard_catalogue(sender, instance, **kwargs):
+    """Invalide les statistiques du catalogue (stock, prix, catégories)"""
+    cache_dashboard.invalider('catalogue')
+
+
+@receiver(post_save, sender=Produit)
+def indexer_produit(sender, instance, **kwargs):
+    """Met à jour l'index de recherche du produit"""
+    indexer_produits([instance])
+
+
+@receiver(post_delete, sender=Produit)
+def desindexer_produit(sender, instance, **kwargs):
+    """Retire le produit de l'index de recherche"""
+    desindexer_produits([instance.id])
+
+
+@receiver(post_save, sender=Categorie)
+def reindexer_categorie(sender, instance, created, **kwargs):
+    """Réindexe les produits d'une catégorie (le nom de la catégorie est indexé)"""
+    if not created:
+        indexer_produits(instance.produits.select_related('categorie'))
+
+
+CHAMPS_SUGGESTIONS = ('nom', 'code_barre', 'active', 'categorie_id')
+
+
+@receiver(pre_save, sender=Produit)
+def memoriser_produit_suggestions(sender, instance, **kwargs):
+    """Retient les champs d'un produit modifié que l'index des suggestions affiche"""
+    if instance.pk and not kwargs.get('raw'):
+        instance._anciennes_suggestions = Produit.objects.filter(pk=instance.pk).values_list(*CHAMPS_SUGGESTIONS).first()
+
+
+@receiver(post_save, sender=Produit)
+def suggestions_produit(sender, instance, created, **kwargs):
+    """Met à jour l'index des suggestions si le nom, le code-barres, l'état ou la catégorie change
+
+    Une modification du stock ou du prix ne touche pas l'index : les autres
+    processus ne sont pas invités à reconstruire le leur.
+    """
+    ancien = getattr(instance, '_anciennes_suggestions', None)
+    instance._anciennes_suggestions = None
+    if created or ancien != tuple(getattr(instance, champ) for champ in CHAMPS_SUGGESTIONS):
+        suggestions.index.mettre_a_jour_produit(instance)
+
+
+@receiver(post_delete, sender=Produit)
+def suggestions_retirer_produit(sender, instance, **kwargs):
+    suggestions.index.retirer_produit(instance.id)
+
+
+@receiver(post_save, sender=Produit)
+def caisse_produit(sender, instance, **kwargs):
+    """Met à jour l'index des codes-barres de la caisse"""
+    caisse.index.mettre_a_jour_produit(instance)
+
+
+@receiver(post_delete, sender=Produit)
+def caisse_retirer_produit(sender, instance, **kwargs):
+    caisse.index.retirer_produit(instance.id)
+
+
+@receiver(post_save, sender=Categorie)
+def suggestions_categorie(sender, instance, **kwargs):
+    suggestions.index.mettre_a_jour_categorie(instance)
+
+
+@receiver(post_delete, sender=Categorie)
+def suggestions_retirer_categorie(sender, instance, **kwargs):
+    suggestions.index.retirer_categorie(instance.id)
+
+
+@receiver(pre_save, sender=AvisProduit)
+def memoriser_produit_avis(sender, instance, **kwargs):
+    """Retient le produit d'origine d'un avis modifié (pour recalculer ses notes s'il change)"""
+    if instance.pk and not kwargs.get('raw'):
+        instance._ancien_produit_id = AvisProduit.objects.filter(pk=instance.pk).values_list('produit_id', flat=True).first()
+
+
+@receiver(post_save, sender=AvisProduit)
+@receiver(post_delete, sender=AvisProduit)
+def recalculer_notes_produit(sender, instance, **kwargs):
+    """Met à jour la note moyenne et la répartition des notes du produit"""
+    produit_ids = {instance.produit_id, getattr(instance, '_ancien_produit_id', None)}
+    recalculer_notes(produit_ids - {None})
 
 
 @receiver(pre_save, sender=Commande)
@@ -36,3 +177,11 @@ def definir_prix_unitaire(sender, instance, **kwargs):
     if not instance.prix_unitaire and instance.produit:
         instance.prix_unitaire = instance.produit.prix_vente
 
+
+@receiver(post_save, sender=Produit)
+@receiver(post_save, sender=Categorie)
+def generer_images_derivees(sender, instance, **kwargs):
+    """Génère les vignettes d'une image téléversée (après validation de la transaction)"""
+    if instance.image:
+        nom = instance.image.name
+        transaction.on_commit(lambda: images.preparer(nom))
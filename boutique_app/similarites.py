@@ -0,0 +1,139 @@
+"""
+Produits similaires (« les clients ont aussi acheté »)
+
+Les ventes rattachées à une commande non annulée (en ligne ou en caisse) sur
+``FENETRE_JOURS`` sont lues en une requête et rangées dans une matrice creuse
+SciPy commandes × produits (1 si le produit figure dans la commande). Le
+produit matriciel transposé donne en un calcul le nombre de commandes communes
+à chaque paire de produits ; la similarité est le cosinus de ces vecteurs
+d'achats :
+
+    score(a, b) = commandes(a et b) / √(commandes(a) × commandes(b))
+
+Les paires achetées ensemble moins de ``ACHATS_COMMUNS_MIN`` fois sont
+ignorées (bruit), puis les ``VOISINS`` meilleurs voisins de chaque produit
+sont retenus par un tri NumPy global, sans boucle sur les produits.
+
+Les résultats sont enregistrés dans ProduitSimilaire par la commande
+``calculer_produits_similaires`` (à lancer chaque nuit) ; la page produit les
+lit en une requête sur l'index (produit, rang) et complète avec la même
+catégorie lorsque l'historique est insuffisant.
+"""
+from datetime import timedelta
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Produit, Vente, ProduitSimilaire
+
+
+PARAMETRES_PAR_DEFAUT = {
+    'FENETRE_JOURS': 365,
+    'VOISINS': 8,
+    'ACHATS_COMMUNS_MIN': 2,
+}
+
+NOMBRE_AFFICHES = 4
+TAILLE_LOT = 5000
+
+
+def parametres():
+    """Paramètres du calcul (réglage PRODUITS_SIMILAIRES complété par les valeurs par défaut)"""
+    return {**PARAMETRES_PAR_DEFAUT, **getattr(settings, 'PRODUITS_SIMILAIRES', {})}
+
+
+def matrice_achats(debut, fin):
+    """Matrice creuse commandes × produits des ventes des jours ``debut`` à ``fin``, en une requête
+
+    Retourne (identifiants des produits, matrice CSR de 0/1) ; la colonne ``j``
+    correspond au produit ``identifiants[j]``.
+    """
+    lignes = Vente.objects.entre(debut, fin).filter(
+        commande__isnull=False,
+        produit__active=True,
+    ).exclude(commande__statut='annulee').values_list('commande_id', 'produit_id').distinct().order_by()
+    paires = np.array(list(lignes), dtype=np.int64).reshape(-1, 2)
+
+    commandes, ligne_commande = np.unique(paires[:, 0], return_inverse=True)
+    identifiants, colonne_produit = np.unique(paires[:, 1], return_inverse=True)
+    achats = sparse.csr_matrix(
+        (np.ones(len(paires)), (ligne_commande, colonne_produit)),
+        shape=(len(commandes), len(identifiants)),
+    )
+    return identifiants, achats
+
+
+def voisins(achats, nombre_voisins, achats_communs_min):
+    """Meilleurs voisins de chaque colonne de la matrice d'achats
+
+    Retourne des tableaux alignés (produit, voisin, rang, score), indices de
+    colonnes, triés par produit puis par rang (0 = plus similaire).
+    """
+    communs = (achats.T @ achats).tocoo()
+    par_produit = achats.sum(axis=0).A1
+
+    garder = (communs.row != communs.col) & (communs.data >= achats_communs_min)
+    produits, similaires, nombres = communs.row[garder], communs.col[garder], communs.data[garder]
+    scores = nombres / np.sqrt(par_produit[produits] * par_produit[similaires])
+
+    # Tri par produit, score décroissant, achats communs décroissants puis voisin (ordre stable)
+    ordre = np.lexsort((similaires, -nombres, -scores, produits))
+    produits, similaires, scores = produits[ordre], similaires[ordre], scores[ordre]
+    debuts = np.searchsorted(produits, produits, side='left')
+    rangs = np.arange(len(produits)) - debuts
+    garder = rangs < nombre_voisins
+    return produits[garder], similaires[garder], rangs[garder], scores[garder]
+
+
+def calculer(aujourdhui=None, **reglages):
+    """Recalcule les produits similaires de tout le catalogue actif
+
+    Nombre de requêtes constant : ventes de la fenêtre, puis remplacement de
+    la table en masse dans une transaction. Retourne (nombre de voisins
+    enregistrés, nombre de produits ayant des voisins).
+    """
+    params = {**parametres(), **reglages}
+    if aujourdhui is None:
+        aujourdhui = timezone.localdate()
+    debut = aujourdhui - timedelta(days=params['FENETRE_JOURS'])
+
+    identifiants, achats = matrice_achats(debut, aujourdhui)
+    produits, similaires, rangs, scores = voisins(achats, params['VOISINS'], params['ACHATS_COMMUNS_MIN'])
+    lignes = [
+        ProduitSimilaire(produit_id=produit_id, similaire_id=similaire_id, rang=rang, score=score)
+        for produit_id, similaire_id, rang, score in zip(
+            identifiants[produits].tolist(), identifiants[similaires].tolist(), rangs.tolist(), scores.tolist()
+        )
+    ]
+
+    with transaction.atomic():
+        ProduitSimilaire.objects.all().delete()
+        ProduitSimilaire.objects.bulk_create(lignes, batch_size=TAILLE_LOT)
+
+    return len(lignes), len(np.unique(produits))
+
+
+def similaires_calcules(produit_id, nombre=NOMBRE_AFFICHES):
+    """Voisins actifs calculés d'un produit, par rang"""
+    return Produit.objects.filter(similaire_de__produit_id=produit_id, active=True).order_by('similaire_de__rang')[:nombre]
+
+
+def produits_meme_categorie(categorie_id, exclus, nombre=NOMBRE_AFFICHES):
+    """Produits actifs d'une catégorie, hors ``exclus`` (identifiants)"""
+    return Produit.objects.filter(categorie_id=categorie_id, active=True).exclude(id__in=exclus)[:nombre]
+
+
+def produits_similaires(produit, nombre=NOMBRE_AFFICHES):
+    """Produits recommandés sur la page d'un produit
+
+    Une requête sur l'index (produit, rang) ; si le produit a moins de
+    ``nombre`` voisins actifs, la liste est complétée par des produits de la
+    même catégorie (seconde requête, seulement dans ce cas).
+    """
+    resultat = list(similaires_calcules(produit.id, nombre))
+    if len(resultat) < nombre:
+        resultat += produits_meme_categorie(
+            produit.categorie_id, [produit.id] + [p.id for p in resultat], nombre - len(resultat)
+        )
+    return resultat
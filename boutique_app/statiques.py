@@ -0,0 +1,106 @@
+"""
+Fichiers statiques pour la production
+
+``collectstatic`` (stockage ``StockageStatiques``) :
+
+- minifie les feuilles de style (commentaires et espaces superflus) ;
+- nomme chaque fichier d'après une empreinte de son contenu
+  (``css/client.3f1a9c2b7d4e.css``) et écrit la correspondance dans
+  ``STATIC_ROOT/staticfiles.json`` : ``{% static %}`` produit ces noms, qui
+  changent à chaque modification et peuvent donc être gardés un an par les
+  navigateurs (``EnTetesCacheMiddleware``) ;
+- écrit à côté de chaque fichier texte une version gzip (``.gz``) et, si le
+  paquet ``brotli`` est installé, Brotli (``.br``), servies telles quelles par
+  le serveur web (``gzip_static`` / ``brotli_static`` de nginx) au lieu d'être
+  compressées à chaque requête.
+"""
+import gzip
+import re
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # facultatif : seules les versions gzip sont produites
+    brotli = None
+
+
+EXTENSIONS_COMPRESSEES = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico')
+TAILLE_MIN_COMPRESSION = 256  # octets : en dessous, l'en-tête gzip annule le gain
+RATIO_MAX = 0.95  # version compressée gardée seulement si elle fait gagner au moins 5 %
+
+# Chaînes et url(...) conservées telles quelles ; commentaires retirés
+_COMMENTAIRES_CSS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\([^)]*\))|/\*.*?\*/''', re.S)
+_ESPACES_CSS = re.compile(
+    r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\([^)]*\))|\s*;?\s*(})\s*|\s*([{;,>])\s*|:\s+|\s+''', re.S
+)
+
+
+def _espaces(correspondance):
+    protege, fin_bloc, separateur = correspondance.groups()
+    if protege:
+        return protege
+    if fin_bloc:
+        return fin_bloc
+    if separateur:
+        return separateur
+    if correspondance.group(0).startswith(':'):
+        return ':'
+    return ' '
+
+
+def minifier_css(texte):
+    """Feuille de style sans commentaires ni espaces superflus
+
+    L'espace avant ``:`` est gardé (``a :hover`` n'est pas ``a:hover``).
+    """
+    texte = _COMMENTAIRES_CSS.sub(lambda c: c.group(1) or ' ', texte)
+    return _ESPACES_CSS.sub(_espaces, texte).strip()
+
+
+def compressions(contenu):
+    """Versions précompressées intéressantes de ``contenu`` : [(extension, octets)]"""
+    if len(contenu) < TAILLE_MIN_COMPRESSION:
+        return []
+    versions = [('.gz', gzip.compress(contenu, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        versions.append(('.br', brotli.compress(contenu, quality=11)))
+    return [(extension, octets) for extension, octets in versions if len(octets) <= len(contenu) * RATIO_MAX]
+
+
+class StockageStatiques(ManifestStaticFilesStorage):
+    """Fichiers statiques minifiés, nommés d'après leur empreinte et précompressés"""
+
+    def _save(self, name, content):
+        if name.endswith('.css'):
+            content = ContentFile(minifier_css(b''.join(content.chunks()).decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def stored_name(self, name):
+        # Sans manifeste (collectstatic pas encore exécuté : développement, tests),
+        # les noms d'origine sont servis par les finders
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for nom in sorted(set(self.hashed_files.values())):
+            if nom.endswith(EXTENSIONS_COMPRESSEES):
+                for chemin in self.compresser(nom):
+                    yield nom, chemin, True
+
+    def compresser(self, nom):
+        """Écrit les versions .gz / .br de ``nom`` ; retourne leurs chemins"""
+        with self.open(nom) as fichier:
+            contenu = fichier.read()
+        chemins = []
+        for extension, octets in compressions(contenu):
+            chemin = nom + extension
+            if self.exists(chemin):
+                self.delete(chemin)
+            self._save(chemin, ContentFile(octets))
+            chemins.append(chemin)
+        return chemins
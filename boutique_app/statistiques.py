@@ -0,0 +1,234 @@
+"""
+Statistiques du tableau de bord
+
+Chaque fonction calcule un bloc du dashboard avec un nombre fixe de requêtes
+(agrégations conditionnelles et regroupements par jour), quel que soit le
+nombre de catégories, de produits ou de jours affichés. Les chiffres de ventes
+sont lus dans les cumuls journaliers (VenteJournaliere) : leur coût dépend du
+nombre de jours et non du nombre de ventes.
+"""
+from datetime import timedelta
+from django.db.models import Sum, Count, Avg, Max, Min, Q, F, DecimalField
+from django.utils import timezone
+from .models import Produit, Categorie, Commande, Panier, VenteJournaliere, PlanReapprovisionnement
+from . import previsions
+
+
+NOMBRE_JOURS_TENDANCE = 7
+
+
+def periodes(aujourdhui):
+    """Retourne les dates de début des fenêtres du dashboard"""
+    return {
+        'aujourdhui': aujourdhui,
+        'semaine': aujourdhui - timedelta(days=7),
+        'mois': aujourdhui - timedelta(days=30),
+        'annee': aujourdhui - timedelta(days=365),
+    }
+
+
+def ventes_par_periode(aujourdhui, noms=None):
+    """Totaux des ventes par période, en une seule requête
+
+    ``noms`` restreint le calcul à certaines périodes (utilisé par le cache du
+    dashboard).
+    """
+    debuts = periodes(aujourdhui)
+    if noms is not None:
+        debuts = {nom: debuts[nom] for nom in noms}
+    debut_historique = min(debuts.values())
+
+    agregats = {}
+    for nom, debut in debuts.items():
+        if nom == 'aujourdhui':
+            filtre = Q(date=debut)
+        else:
+            filtre = Q(date__gte=debut)
+        agregats[f'total_{nom}'] = Sum('montant_total', filter=filtre)
+        agregats[f'nombre_{nom}'] = Sum('nombre_ventes', filter=filtre)
+
+    resultat = VenteJournaliere.objects.filter(date__gte=debut_historique).aggregate(**agregats)
+
+    ventes = {}
+    for nom in debuts:
+        ventes[nom] = {
+            'total': resultat[f'total_{nom}'] or 0,
+            'nombre': resultat[f'nombre_{nom}'] or 0,
+        }
+    return ventes
+
+
+def requete_ventes_par_jour(aujourdhui, nombre_jours=NOMBRE_JOURS_TENDANCE):
+    """Queryset des (jour, total des ventes) des ``nombre_jours`` derniers jours"""
+    debut = aujourdhui - timedelta(days=nombre_jours - 1)
+    return VenteJournaliere.objects.filter(
+        date__gte=debut,
+        date__lte=aujourdhui
+    ).values('date').annotate(
+        total=Sum('montant_total')
+    ).values_list('date', 'total')
+
+
+def ventes_par_jour(aujourdhui, nombre_jours=NOMBRE_JOURS_TENDANCE):
+    """Total des ventes de chaque jour (du plus ancien au plus récent), en une requête"""
+    debut = aujourdhui - timedelta(days=nombre_jours - 1)
+    totaux = dict(requete_ventes_par_jour(aujourdhui, nombre_jours))
+
+    jours = []
+    for i in range(nombre_jours):
+        date = debut + timedelta(days=i)
+        jours.append({
+            'date': date.strftime('%d/%m'),
+            'total': float(totaux.get(date) or 0)
+        })
+    return jours
+
+
+def requete_ventes_categories(aujourdhui):
+    """Queryset des (catégorie, total des ventes) des 30 derniers jours"""
+    return VenteJournaliere.objects.filter(
+        date__gte=periodes(aujourdhui)['mois']
+    ).values('categorie').annotate(
+        total=Sum('montant_total')
+    ).values_list('categorie', 'total')
+
+
+def statistiques_categories(aujourdhui):
+    """Produits, valeur du stock et ventes du mois par catégorie active, en trois requêtes"""
+    categories = Categorie.objects.filter(active=True).values_list('id', 'nom')
+
+    produits = {
+        ligne['categorie']: ligne
+        for ligne in Produit.objects.actifs().with_financials().values('categorie').annotate(
+            nombre_produits=Count('id'),
+            valeur_stock=Sum('valeur_stock_calculee'),
+        ).order_by()
+    }
+
+    ventes_mois = dict(requete_ventes_categories(aujourdhui))
+
+    stats = []
+    for categorie_id, nom in categories:
+        produits_cat = produits.get(categorie_id, {})
+        stats.append({
+            'nom': nom,
+            'nombre_produits': produits_cat.get('nombre_produits', 0),
+            'valeur_stock': produits_cat.get('valeur_stock') or 0,
+            'ventes_mois': ventes_mois.get(categorie_id) or 0,
+        })
+    return stats
+
+
+def requete_top_produits(aujourdhui, limite=10):
+    """Queryset des produits les plus vendus sur les 30 derniers jours"""
+    ce_mois = periodes(aujourdhui)['mois']
+    return VenteJournaliere.objects.filter(
+        date__gte=ce_mois
+    ).values('produit__nom').annotate(
+        total_ventes=Sum('montant_total'),
+        quantite_vendue=Sum('quantite')
+    ).order_by('-total_ventes')[:limite]
+
+
+def top_produits(aujourdhui, limite=10):
+    """Produits les plus vendus sur les 30 derniers jours"""
+    return list(requete_top_produits(aujourdhui, limite))
+
+
+def statistiques_produits():
+    """Statistiques min/max/moyenne, valeur du stock et alertes sur les produits actifs"""
+    produits_actifs = Produit.objects.actifs().with_financials()
+    produits_stats = produits_actifs.aggregate(
+        total_produits=Count('id'),
+        stock_faible=Count('id', filter=Q(quantite_stock__lte=F('quantite_minimum'))),
+        valeur_stock_total=Sum('valeur_stock_calculee'),
+        prix_min=Min('prix_vente'),
+        prix_max=Max('prix_vente'),
+        prix_moyen=Avg('prix_vente'),
+        stock_min=Min('quantite_stock'),
+        stock_max=Max('quantite_stock'),
+        stock_moyen=Avg('quantite_stock'),
+        marge_min=Min('marge_unitaire'),
+        marge_max=Max('marge_unitaire'),
+    )
+    produits_stats['marge_min'] = produits_stats['marge_min'] or 0
+    produits_stats['marge_max'] = produits_stats['marge_max'] or 0
+
+    return {
+        'total_produits': produits_stats.pop('total_produits'),
+        'produits_stock_faible': produits_stats.pop('stock_faible'),
+        'valeur_stock_total': produits_stats.pop('valeur_stock_total') or 0,
+        'produits_stats': produits_stats,
+    }
+
+
+def reapprovisionnement():
+    """Produits à commander par fournisseur selon les plans de la nuit, en une requête"""
+    lignes = PlanReapprovisionnement.objects.a_commander().values('fournisseur__nom').annotate(
+        nombre_produits=Count('id'),
+        quantite=Sum('quantite_a_commander'),
+        cout=Sum(
+            F('quantite_a_commander') * F('produit__prix_achat'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+    ).order_by('-cout', 'fournisseur__nom')
+    commandes = [
+        {
+            'fournisseur': ligne['fournisseur__nom'] or 'Sans fournisseur',
+            'nombre_produits': ligne['nombre_produits'],
+            'quantite': ligne['quantite'] or 0,
+            'cout': ligne['cout'] or 0,
+        }
+        for ligne in lignes
+    ]
+    return {
+        'reapprovisionnement': commandes,
+        'produits_a_commander': sum(ligne['nombre_produits'] for ligne in commandes),
+    }
+
+
+def statistiques_commandes():
+    """Compteurs de commandes et de paniers validés"""
+    commandes = Commande.objects.aggregate(
+        total=Count('id'),
+        en_attente=Count('id', filter=Q(statut='en_attente'))
+    )
+    return {
+        'total_commandes': commandes['total'],
+        'commandes_en_attente': commandes['en_attente'],
+        'total_paniers': Panier.objects.filter(statut='valide').count(),
+    }
+
+
+def prevision_mois(aujourdhui):
+    """Chiffre d'affaires prévu pour les 30 prochains jours (Holt-Winters, saisonnalité hebdomadaire)"""
+    return previsions.prevision_totale(horizon=previsions.HORIZON, aujourdhui=aujourdhui)
+
+
+def statistiques_dashboard(aujourdhui=None):
+    """Calcule le contexte complet du dashboard en un nombre constant de requêtes"""
+    if aujourdhui is None:
+        aujourdhui = timezone.localdate()
+
+    ventes = ventes_par_periode(aujourdhui)
+    stats_categories = statistiques_categories(aujourdhui)
+
+    contexte = {
+        'total_categories': len(stats_categories),
+        'ventes_aujourdhui': ventes['aujourdhui']['total'],
+        'nombre_ventes_aujourdhui': ventes['aujourdhui']['nombre'],
+        'ventes_semaine': ventes['semaine']['total'],
+        'nombre_ventes_semaine': ventes['semaine']['nombre'],
+        'ventes_mois': ventes['mois']['total'],
+        'nombre_ventes_mois': ventes['mois']['nombre'],
+        'ventes_annee': ventes['annee']['total'],
+        'nombre_ventes_annee': ventes['annee']['nombre'],
+        'stats_categories': stats_categories,
+        'top_produits': top_produits(aujourdhui),
+        'prevision_mois': prevision_mois(aujourdhui),
+        'ventes_par_jour': ventes_par_jour(aujourdhui),
+    }
+    contexte.update(statistiques_produits())
+    contexte.update(reapprovisionnement())
+    contexte.update(statistiques_commandes())
+    return contexte
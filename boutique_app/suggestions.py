@@ -0,0 +1,235 @@
+"""
+Suggestions de recherche (autocomplétion) servies depuis la mémoire
+
+L'index est une liste triée de clés normalisées (minuscules, sans accents)
+interrogée par ``bisect`` : chaque mot d'un nom de produit ou de catégorie et
+chaque code-barres est une clé. Il est construit à la première demande à
+partir des produits et catégories actifs, puis mis à jour incrémentalement
+par les signaux de sauvegarde et de suppression.
+
+Chaque processus possède son propre index : une version partagée dans le
+cache Django signale aux autres processus qu'ils doivent reconstruire le leur.
+Les suggestions sont classées par volume de ventes récent.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+from .models import Produit, Categorie, VenteJournaliere
+from .recherche import normaliser, mots
+
+
+CLE_VERSION = 'suggestions:version'
+JOURS_VENTES = 30
+DUREE_VIE = 600  # secondes avant de recharger les volumes de ventes
+LIMITE_PAR_DEFAUT = 8
+LIMITE_MAX = 20
+LONGUEUR_MIN = 2
+# Nombre maximal de clés parcourues pour un préfixe très court
+CLES_PARCOURUES_MAX = 2000
+
+
+def version_partagee():
+    return cache.get_or_set(CLE_VERSION, time.time_ns, None)
+
+
+def signaler_modification():
+    """Indique aux autres processus que leur index est périmé"""
+    try:
+        return cache.incr(CLE_VERSION)
+    except ValueError:
+        nouvelle = time.time_ns()
+        cache.set(CLE_VERSION, nouvelle, None)
+        return nouvelle
+
+
+def volumes_ventes(produit_ids=None):
+    """Quantités vendues par produit sur les derniers jours, en une requête"""
+    ventes = VenteJournaliere.objects.filter(date__gte=timezone.localdate() - timedelta(days=JOURS_VENTES))
+    if produit_ids is not None:
+        ventes = ventes.filter(produit_id__in=produit_ids)
+    return dict(ventes.values('produit').annotate(total=Sum('quantite')).values_list('produit', 'total'))
+
+
+class IndexSuggestions:
+    """Index de préfixes trié, sûr entre threads"""
+
+    def __init__(self):
+        self._verrou = threading.RLock()
+        self.vider()
+
+    def vider(self):
+        with self._verrou:
+            self._cles = []       # (clé normalisée, type, id), triées
+            self._entrees = {}    # (type, id) -> entrée
+            self._version = None
+            self._construit_le = None
+
+    @property
+    def construit(self):
+        return self._construit_le is not None
+
+    # ---------- construction ----------
+
+    def construire(self):
+        """Reconstruit l'index depuis la base (trois requêtes)"""
+        volumes = volumes_ventes()
+        produits = Produit.objects.actifs().values_list('id', 'nom', 'code_barre', 'categorie_id')
+        categories = Categorie.objects.filter(active=True).values_list('id', 'nom')
+        volumes_categories = {}
+
+        entrees = []
+        for produit_id, nom, code_barre, categorie_id in produits:
+            volume = volumes.get(produit_id, 0)
+            volumes_categories[categorie_id] = volumes_categories.get(categorie_id, 0) + volume
+            entrees.append(self._entree_produit(produit_id, nom, code_barre, volume))
+        for categorie_id, nom in categories:
+            entrees.append(self._entree_categorie(categorie_id, nom, volumes_categories.get(categorie_id, 0)))
+
+        cles = []
+        index = {}
+        for entree in entrees:
+            index[(entree['type'], entree['id'])] = entree
+            cles.extend((cle, entree['type'], entree['id']) for cle in entree['cles'])
+        cles.sort()
+
+        version = version_partagee()
+        with self._verrou:
+            self._cles = cles
+            self._entrees = index
+            self._version = version
+            self._construit_le = time.monotonic()
+
+    def _a_jour(self):
+        return (
+            self.construit
+            and self._version == version_partagee()
+            and time.monotonic() - self._construit_le < DUREE_VIE
+        )
+
+    def verifier(self):
+        """Construit ou reconstruit l'index s'il est absent, périmé ou modifié ailleurs"""
+        if not self._a_jour():
+            self.construire()
+
+    # ---------- entrées ----------
+
+    @staticmethod
+    def _calculer_cles(libelle, code_barre=None):
+        cles = set()
+        texte = normaliser(libelle)
+        liste_mots = mots(texte)
+        # Le libellé complet et chaque fin de libellé commençant à un mot
+        for i in range(len(liste_mots)):
+            cles.add(' '.join(liste_mots[i:]))
+        if code_barre:
+            cles.add(normaliser(code_barre))
+        return cles
+
+    def _entree_produit(self, produit_id, nom, code_barre, volume):
+        return {
+            'type': 'produit',
+            'id': produit_id,
+            'libelle': nom,
+            'url': reverse('detail_produit', args=[produit_id]),
+            'volume': volume,
+            'cles': self._calculer_cles(nom, code_barre),
+        }
+
+    def _entree_categorie(self, categorie_id, nom, volume):
+        return {
+            'type': 'categorie',
+            'id': categorie_id,
+            'libelle': nom,
+            'url': f"{reverse('catalogue')}?categorie={categorie_id}",
+            'volume': volume,
+            'cles': self._calculer_cles(nom),
+        }
+
+    def _retirer(self, type_entree, entree_id):
+        entree = self._entrees.pop((type_entree, entree_id), None)
+        if entree is None:
+            return None
+        for cle in entree['cles']:
+            position = bisect_left(self._cles, (cle, type_entree, entree_id))
+            if position < len(self._cles) and self._cles[position] == (cle, type_entree, entree_id):
+                del self._cles[position]
+        return entree
+
+    def _ajouter(self, entree):
+        self._entrees[(entree['type'], entree['id'])] = entree
+        for cle in entree['cles']:
+            insort(self._cles, (cle, entree['type'], entree['id']))
+
+    # ---------- mises à jour incrémentales ----------
+
+    def _apres_modification(self):
+        """Publie la modification ; l'index local reste à jour sans reconstruction"""
+        version = signaler_modification()
+        if self._version is not None:
+            self._version = version
+
+    def mettre_a_jour_produit(self, produit):
+        with self._verrou:
+            if self.construit:
+                ancienne = self._retirer('produit', produit.id)
+                if produit.active:
+                    if ancienne is not None:
+                        volume = ancienne['volume']
+                    else:
+                        volume = volumes_ventes([produit.id]).get(produit.id, 0)
+                    self._ajouter(self._entree_produit(produit.id, produit.nom, produit.code_barre, volume))
+            self._apres_modification()
+
+    def retirer_produit(self, produit_id):
+        with self._verrou:
+            if self.construit:
+                self._retirer('produit', produit_id)
+            self._apres_modification()
+
+    def mettre_a_jour_categorie(self, categorie):
+        with self._verrou:
+            if self.construit:
+                ancienne = self._retirer('categorie', categorie.id)
+                if categorie.active:
+                    volume = ancienne['volume'] if ancienne is not None else 0
+                    self._ajouter(self._entree_categorie(categorie.id, categorie.nom, volume))
+            self._apres_modification()
+
+    def retirer_categorie(self, categorie_id):
+        with self._verrou:
+            if self.construit:
+                self._retirer('categorie', categorie_id)
+            self._apres_modification()
+
+    # ---------- interrogation ----------
+
+    def suggerer(self, texte, limite=LIMITE_PAR_DEFAUT):
+        """Entrées dont une clé commence par le texte, classées par volume de ventes"""
+        prefixe = ' '.join(mots(normaliser(texte)))
+        if len(prefixe) < LONGUEUR_MIN:
+            return []
+        self.verifier()
+
+        with self._verrou:
+            trouvees = {}
+            position = bisect_left(self._cles, (prefixe,))
+            fin = min(len(self._cles), position + CLES_PARCOURUES_MAX)
+            while position < fin and self._cles[position][0].startswith(prefixe):
+                cle, type_entree, entree_id = self._cles[position]
+                trouvees[(type_entree, entree_id)] = self._entrees[(type_entree, entree_id)]
+                position += 1
+
+        classees = sorted(trouvees.values(), key=lambda e: (-e['volume'], e['libelle']))
+        return [
+            {'type': e['type'], 'libelle': e['libelle'], 'url': e['url']}
+            for e in classees[:limite]
+        ]
+
+
+# Index du processus courant
+index = IndexSuggestions()
@@ -0,0 +1,38 @@
+"""
+Balises d'images responsives : ``{% load images %}``
+"""
+from django import template
+from django.utils.html import format_html
+from boutique_app.images import derivees
+
+register = template.Library()
+
+# Usage -> (variantes proposées au navigateur, attribut sizes d'après la mise en page)
+USAGES = {
+    'vignette': (('vignette',), '100px'),
+    'grille': (('vignette', 'grille'), '(max-width: 600px) 100vw, 300px'),
+    'detail': (('grille', 'detail'), '(max-width: 900px) 100vw, 600px'),
+}
+
+
+@register.simple_tag
+def image_responsive(fichier, usage, alt='', paresseux=True):
+    """<picture> WebP + JPEG avec srcset ; l'original si les dérivés sont indisponibles
+
+    ``paresseux=False`` pour une image visible dès l'ouverture de la page.
+    """
+    chargement = 'lazy' if paresseux else 'eager'
+    images = derivees(fichier)
+    if images is None:
+        return format_html('<img src="{}" alt="{}" loading="{}" decoding="async">', fichier.url, alt, chargement)
+
+    variantes, sizes = USAGES[usage]
+    largeur, hauteur = images.dimensions[usage]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="{}" decoding="async">'
+        '</picture>',
+        images.srcset(variantes, 'webp'), sizes,
+        images.url(usage), images.srcset(variantes, 'jpg'), sizes, largeur, hauteur, alt, chargement,
+    )
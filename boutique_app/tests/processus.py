@@ -0,0 +1,37 @@
+"""
+Fonctions exécutées dans des processus fils par les tests multi-processus
+
+Ce module n'importe rien de Django au chargement : les processus démarrés
+en mode « spawn » le chargent avant que Django ne soit configuré.
+"""
+import os
+
+
+def initialiser(chemin):
+    """Configure Django dans le processus fils, sur la base SQLite indiquée"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'boutique.settings')
+    import django
+    django.setup()
+    from django.db import connection
+    connection.close()
+    connection.settings_dict['NAME'] = chemin
+    connection.settings_dict['OPTIONS'] = {'timeout': 60}
+
+
+def creer_table_sequences():
+    from django.db import connection
+    from boutique_app.models import SequenceCommande
+    with connection.schema_editor() as editeur:
+        editeur.create_model(SequenceCommande)
+
+
+def allouer_numeros(nombre, taille_bloc):
+    """Alloue des numéros comme le feraient des commandes (une transaction chacune)"""
+    from django.db import transaction
+    from boutique_app.numerotation import AllocateurSequence
+    allocateur = AllocateurSequence(taille_bloc=taille_bloc)
+    numeros = []
+    for _ in range(nombre):
+        with transaction.atomic():
+            numeros.append(allocateur.allouer())
+    return numeros
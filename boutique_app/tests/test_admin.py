@@ -0,0 +1,217 @@
+"""
+Tests du nombre de requêtes SQL des listes de l'administration
+
+Chaque liste (changelist) doit s'afficher en un nombre fixe de requêtes, que
+la page contienne 1 ou 100 lignes : colonnes calculées annotées en SQL et
+relations chargées par jointure.
+"""
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from boutique_app.models import (
+    Categorie, Modele, Fournisseur, Produit, Panier, Commande, Vente, AvisProduit,
+    VenteJournaliere, PlanReapprovisionnement
+)
+from boutique_app.tests.utils import NombreRequetesMixin, creer_panier, creer_produits
+
+# Nombre de lignes ajoutées avant chaque mesure : 1, puis 100 (une page complète)
+TAILLES = (1, 99)
+
+
+class RequetesAdministrationTest(NombreRequetesMixin, TestCase):
+    """Nombre maximal de requêtes par liste de l'administration"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.lots = 0
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def liste(self, modele):
+        return reverse(f'admin:boutique_app_{modele}_changelist')
+
+    def nouveau_lot(self):
+        self.lots += 1
+        return self.lots
+
+    def assertListeConstante(self, maximum, modele, creer):
+        """``creer(nombre)`` ajoute des lignes ; la liste doit rester sous ``maximum`` requêtes"""
+        def preparer(taille):
+            creer(taille)
+            # Comptage des grandes tables mis en cache (PaginateurEstime) : mesurer le premier affichage
+            cache.clear()
+            return (self.liste(modele),)
+
+        self.assertRequetesConstantes(maximum, preparer, self.get, tailles=TAILLES)
+
+    def test_categories(self):
+        """Le nombre de produits de chaque catégorie est annoté"""
+        def creer(nombre):
+            lot = self.nouveau_lot()
+            for i in range(nombre):
+                creer_produits(2, categorie=Categorie.objects.create(nom=f'Catégorie {lot}-{i}'), prefixe=f'C{lot}-{i}')
+
+        self.assertListeConstante(5, 'categorie', creer)
+
+    def test_modeles(self):
+        """Le nombre de produits de chaque modèle est annoté"""
+        def creer(nombre):
+            lot = self.nouveau_lot()
+            for i in range(nombre):
+                modele = Modele.objects.create(nom=f'Modèle {lot}-{i}')
+                for produit in creer_produits(2, prefixe=f'M{lot}-{i}'):
+                    Produit.objects.filter(pk=produit.pk).update(modele=modele)
+
+        self.assertListeConstante(5, 'modele', creer)
+
+    def test_paniers(self):
+        """Total et nombre d'articles annotés, utilisateur joint"""
+        def creer(nombre):
+            lot = self.nouveau_lot()
+            for i in range(nombre):
+                creer_panier(User.objects.create_user(username=f'client{lot}-{i}'), 2)
+
+        self.assertListeConstante(5, 'panier', creer)
+
+    def test_produits(self):
+        """Catégorie et modèle joints, marge et valeur du stock annotées"""
+        def creer(nombre):
+            lot = self.nouveau_lot()
+            modele = Modele.objects.create(nom=f'Modèle {lot}')
+            fournisseur = Fournisseur.objects.create(nom=f'Fournisseur {lot}')
+            Produit.objects.filter(pk__in=[p.pk for p in creer_produits(nombre, prefixe=f'P{lot}')]).update(
+                modele=modele, fournisseur=fournisseur
+            )
+
+        self.assertListeConstante(9, 'produit', creer)
+
+    def test_commandes(self):
+        """Le panier de chaque commande est joint"""
+        def creer(nombre):
+            utilisateur = User.objects.create_user(username=f'acheteur{self.nouveau_lot()}')
+            for i in range(nombre):
+                Commande.objects.create(
+                    panier=Panier.objects.create(utilisateur=utilisateur, statut='valide'),
+                    numero_commande=f'ADM-{self.lots}-{i}',
+                    montant_total=Decimal('0.00')
+                )
+
+        self.assertListeConstante(4, 'commande', creer)
+
+    def test_avis_ventes_cumuls_et_plans(self):
+        """Les listes affichant un produit chargent aussi sa catégorie (Produit.__str__)"""
+        def creer_avis(nombre):
+            lot = self.nouveau_lot()
+            produit = creer_produits(1, prefixe=f'Avis {lot}')[0]
+            AvisProduit.objects.bulk_create([
+                AvisProduit(produit=produit, utilisateur=User.objects.create_user(username=f'avis{lot}-{i}'), note=4)
+                for i in range(nombre)
+            ])
+
+        def creer_ventes(nombre):
+            produits = creer_produits(nombre, prefixe=f'Vente {self.nouveau_lot()}')
+            Vente.objects.bulk_create([
+                Vente(produit=p, quantite=1, prix_unitaire=p.prix_vente, montant_total=p.prix_vente) for p in produits
+            ])
+
+        def creer_cumuls(nombre):
+            produits = creer_produits(nombre, prefixe=f'Cumul {self.nouveau_lot()}')
+            VenteJournaliere.objects.bulk_create([
+                VenteJournaliere(date=timezone.localdate(), produit=p, categorie_id=p.categorie_id, quantite=1)
+                for p in produits
+            ])
+
+        def creer_plans(nombre):
+            produits = creer_produits(nombre, prefixe=f'Plan {self.nouveau_lot()}')
+            PlanReapprovisionnement.objects.bulk_create([
+                PlanReapprovisionnement(produit=p, delai_livraison_jours=7, date_calcul=timezone.now())
+                for p in produits
+            ])
+
+        for modele, maximum, creer in (
+            ('avisproduit', 5, creer_avis),
+            ('vente', 7, creer_ventes),
+            ('ventejournaliere', 8, creer_cumuls),
+            ('planreapprovisionnement', 6, creer_plans),
+        ):
+            with self.subTest(modele=modele):
+                self.assertListeConstante(maximum, modele, creer)
+
+    def test_colonnes_calculees_triables(self):
+        """Les colonnes annotées se trient en SQL"""
+        for nom, nombre in (('Vide', 0), ('Pleine', 3), ('Moitié', 1)):
+            creer_produits(nombre, categorie=Categorie.objects.create(nom=nom), prefixe=nom)
+        # Colonne 2 : nombre_produits, décroissant
+        response = self.get(self.liste('categorie') + '?o=-2')
+        self.assertEqual([c.nom for c in response.context['cl'].result_list], ['Pleine', 'Moitié', 'Vide'])
+
+        petit = creer_panier(self.admin, 1)
+        grand = creer_panier(User.objects.create_user(username='gros'), 3)
+        vide = Panier.objects.create(utilisateur=self.admin)
+        # Colonne 4 : total_panier, croissant (panier vide en premier)
+        response = self.get(self.liste('panier') + '?o=4')
+        self.assertEqual([p.pk for p in response.context['cl'].result_list], [vide.pk, petit.pk, grand.pk])
+        self.assertContains(response, '900.00 FCFA')
+
+    def test_fiche_panier(self):
+        """La fiche d'un panier affiche son total"""
+        panier = creer_panier(self.admin, 2)
+        response = self.get(reverse('admin:boutique_app_panier_change', args=[panier.pk]))
+        self.assertContains(response, '600.00 FCFA')
+        self.get(reverse('admin:boutique_app_panier_add'))
+
+
+class AdministrationGrandesTablesTest(TestCase):
+    """Listes déroulantes remplacées par l'autocomplétion, comptages des grandes tables évités"""
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        self.client = Client()
+        self.client.force_login(admin)
+        self.produit = creer_produits(1, prefixe='Eau')[0]
+        self.panier = creer_panier(admin, 1)
+
+    def test_autocompletion(self):
+        """Les clés étrangères sont saisies par autocomplétion, sans charger toute la table"""
+        for url in (
+            reverse('admin:boutique_app_produit_add'),
+            reverse('admin:boutique_app_panier_change', args=[self.panier.pk]),
+            reverse('admin:boutique_app_vente_add'),
+            reverse('admin:boutique_app_avisproduit_add'),
+            reverse('admin:boutique_app_commande_add'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'admin-autocomplete')
+                # Seule l'option sélectionnée est rendue, pas la liste des produits
+                self.assertNotContains(response, str(self.produit))
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'boutique_app', 'model_name': 'itempanier', 'field_name': 'produit', 'term': 'Eau',
+        })
+        self.assertEqual([r['id'] for r in response.json()['results']], [str(self.produit.pk)])
+
+    def test_sans_comptage_complet(self):
+        """Les listes des ventes, commandes et paniers ne recomptent pas la table à chaque affichage"""
+        produit = self.produit
+        Vente.objects.create(produit=produit, quantite=1, prix_unitaire=produit.prix_vente, montant_total=produit.prix_vente)
+        for modele in ('vente', 'commande', 'panier'):
+            url = reverse(f'admin:boutique_app_{modele}_changelist')
+            with self.subTest(modele=modele):
+                self.assertEqual(self.client.get(url).status_code, 200)
+                with CaptureQueriesContext(connection) as contexte:
+                    response = self.client.get(url)
+                self.assertFalse([q for q in contexte.captured_queries if 'COUNT(*)' in q['sql']])
+                self.assertFalse(response.context['cl'].show_full_result_count)
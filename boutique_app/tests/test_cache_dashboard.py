@@ -0,0 +1,102 @@
+"""
+Tests pour le cache versionné du dashboard
+"""
+import tempfile
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.utils import timezone
+from decimal import Decimal
+from datetime import timedelta
+from boutique_app.models import Categorie, Produit, Vente
+from boutique_app.cumuls import reconstruire_cumuls
+from boutique_app import cache_dashboard
+
+
+CACHE_SYNCHRONE = {
+    'TTL': 60,
+    'PERIODE_OBSOLESCENCE': 300,
+    'RAFRAICHISSEMENT_ASYNCHRONE': False,
+}
+
+
+@override_settings(DASHBOARD_CACHE=CACHE_SYNCHRONE)
+class CacheDashboardTest(TestCase):
+    """Tests pour les sections en cache, l'invalidation et le rafraîchissement"""
+
+    def setUp(self):
+        cache.clear()
+        self.categorie = Categorie.objects.create(nom="Boissons")
+        self.produit = Produit.objects.create(
+            nom="Eau minérale",
+            categorie=self.categorie,
+            prix_achat=Decimal('200.00'),
+            prix_vente=Decimal('300.00'),
+            quantite_stock=100
+        )
+
+    def creer_vente(self, jours=0):
+        vente = Vente.objects.create(
+            produit=self.produit,
+            quantite=1,
+            prix_unitaire=Decimal('300.00'),
+            montant_total=Decimal('300.00')
+        )
+        if jours:
+            Vente.objects.filter(id=vente.id).update(date_vente=timezone.now() - timedelta(days=jours))
+            vente.refresh_from_db()
+            reconstruire_cumuls()
+        return vente
+
+    def test_sections_servies_depuis_le_cache(self):
+        """Un second affichage ne fait aucune requête"""
+        self.creer_vente()
+        contexte = cache_dashboard.contexte_dashboard()
+        self.assertEqual(contexte['ventes_aujourdhui'], Decimal('300.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(cache_dashboard.contexte_dashboard(), contexte)
+
+    def test_vente_ancienne_invalide_seulement_l_annee(self):
+        """Une vente hors du mois n'invalide que l'année"""
+        vente = self.creer_vente(jours=200)
+        cache.clear()
+        cache_dashboard.contexte_dashboard()
+        versions = {nom: cache_dashboard.version(nom) for nom in ('aujourdhui', 'semaine', 'mois', 'annee')}
+
+        vente.delete()
+        self.assertEqual(cache_dashboard.version('aujourdhui'), versions['aujourdhui'])
+        self.assertEqual(cache_dashboard.version('mois'), versions['mois'])
+        self.assertNotEqual(cache_dashboard.version('annee'), versions['annee'])
+
+    def test_stale_while_revalidate(self):
+        """Une section invalidée est servie périmée puis rafraîchie"""
+        self.creer_vente()
+        self.assertEqual(cache_dashboard.contexte_dashboard()['nombre_ventes_annee'], 1)
+
+        self.creer_vente()
+        # Valeur périmée servie pendant le rafraîchissement
+        self.assertEqual(cache_dashboard.contexte_dashboard()['nombre_ventes_annee'], 1)
+        self.assertEqual(cache_dashboard.contexte_dashboard()['nombre_ventes_annee'], 2)
+
+    def test_entree_trop_ancienne_recalculee(self):
+        """Au-delà de la période d'obsolescence, la section est recalculée immédiatement"""
+        self.creer_vente()
+        cache_dashboard.contexte_dashboard()
+        self.creer_vente()
+        with override_settings(DASHBOARD_CACHE={**CACHE_SYNCHRONE, 'TTL': 0, 'PERIODE_OBSOLESCENCE': 0}):
+            self.assertEqual(cache_dashboard.contexte_dashboard()['nombre_ventes_annee'], 2)
+
+    def test_cache_fichiers(self):
+        """Le cache fonctionne avec le backend fichiers"""
+        with tempfile.TemporaryDirectory() as dossier:
+            caches = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': dossier,
+            }}
+            with override_settings(CACHES=caches):
+                self.creer_vente()
+                contexte = cache_dashboard.contexte_dashboard()
+                with self.assertNumQueries(0):
+                    self.assertEqual(cache_dashboard.contexte_dashboard(), contexte)
+                self.creer_vente()
+                cache_dashboard.contexte_dashboard()
+                self.assertEqual(cache_dashboard.contexte_dashboard()['nombre_ventes_aujourdhui'], 2)
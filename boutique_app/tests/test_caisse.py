@@ -0,0 +1,181 @@
+"""
+Tests pour la caisse (lecture des codes-barres et ventes au comptoir)
+"""
+import json
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from boutique_app.models import Categorie, Produit, Commande, Vente
+from boutique_app import caisse
+from boutique_app.commandes import StockInsuffisant
+
+
+class CaisseTest(TestCase):
+    """Tests pour l'index des codes-barres et l'enregistrement des ventes"""
+
+    def setUp(self):
+        cache.clear()
+        caisse.index.vider()
+        self.caissier = User.objects.create_user(username='caissier', password='test123', is_staff=True)
+        categorie = Categorie.objects.create(nom="Boissons")
+        self.eau = Produit.objects.create(
+            nom="Eau 1L",
+            code_barre="111",
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=20
+        )
+        self.jus = Produit.objects.create(
+            nom="Jus d'orange",
+            code_barre="222",
+            categorie=categorie,
+            prix_achat=Decimal('200.00'),
+            prix_vente=Decimal('400.00'),
+            prix_promo=Decimal('350.00'),
+            en_promotion=True,
+            quantite_stock=3
+        )
+
+    def test_resolution_sans_requete(self):
+        """Une fois l'index construit, les codes sont résolus sans requête SQL"""
+        caisse.index.verifier()
+        with self.assertNumQueries(0):
+            trouves, inconnus = caisse.index.resoudre(["111", "222", "999"])
+        self.assertEqual(trouves["111"], (self.eau.id, "Eau 1L", Decimal('150.00'), 20))
+        self.assertEqual(trouves["222"].prix, Decimal('350.00'))
+        self.assertEqual(inconnus, ["999"])
+
+    def test_mise_a_jour_par_les_signaux(self):
+        """Prix, code-barres et désactivation sont pris en compte sans reconstruction"""
+        caisse.index.verifier()
+        self.eau.prix_vente = Decimal('175.00')
+        self.eau.save()
+        self.jus.code_barre = "333"
+        self.jus.save()
+        with self.assertNumQueries(0):
+            trouves, inconnus = caisse.index.resoudre(["111", "222", "333"])
+        self.assertEqual(trouves["111"].prix, Decimal('175.00'))
+        self.assertEqual((trouves["333"].id, inconnus), (self.jus.id, ["222"]))
+
+        self.eau.active = False
+        self.eau.save()
+        self.jus.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(caisse.index.resoudre(["111", "333"]), ({}, ["111", "333"]))
+
+    def test_modification_dans_un_autre_processus(self):
+        """Un changement de version partagée force la reconstruction de l'index"""
+        caisse.index.verifier()
+        Produit.objects.filter(pk=self.eau.pk).update(prix_vente=Decimal('160.00'))
+        self.assertEqual(caisse.index.resoudre(["111"])[0]["111"].prix, Decimal('150.00'))
+        caisse.signaler_modification()
+        self.assertEqual(caisse.index.resoudre(["111"])[0]["111"].prix, Decimal('160.00'))
+
+    def test_lire_scans(self):
+        """Les scans répétés et les quantités explicites sont cumulés par code"""
+        quantites = caisse.lire_scans({
+            'codes': ["111", "222", "111"],
+            'articles': [{'code_barre': "222", 'quantite': 2}, {'code_barre': 333}],
+        })
+        self.assertEqual(quantites, {"111": 2, "222": 3, "333": 1})
+        for donnees in ([], {}, {'codes': "111"}, {'codes': [""]}, {'articles': [{'code_barre': "111", 'quantite': 0}]},
+                        {'articles': [{'code_barre': "111", 'quantite': "2"}]},
+                        {'codes': ["111"] * (caisse.SCANS_PAR_REQUETE_MAX + 1)}):
+            with self.assertRaises(caisse.ScansInvalides):
+                caisse.lire_scans(donnees)
+
+    def test_vente(self):
+        """La vente crée une commande livrée, ses ventes et décrémente le stock"""
+        commande, ticket = caisse.vendre(self.caissier, {"111": 2, "222": 1})
+        self.assertEqual(ticket["111"], caisse.ArticleCaisse(self.eau.id, "Eau 1L", Decimal('150.00'), 18))
+        self.assertEqual((commande.statut, commande.notes), ('livree', caisse.NOTE_VENTE_CAISSE))
+        self.assertIsNotNone(commande.date_livraison)
+        self.assertEqual(commande.montant_total, Decimal('650.00'))
+        self.assertEqual(Vente.objects.filter(commande=commande).count(), 2)
+        self.eau.refresh_from_db()
+        self.assertEqual(self.eau.quantite_stock, 18)
+        # Le stock affiché est décompté localement
+        with self.assertNumQueries(0):
+            self.assertEqual(caisse.index.resoudre(["111"])[0]["111"].stock, 18)
+
+    def test_ticket_prix_de_la_vente(self):
+        """Index en retard sur le prix : le ticket reprend les prix de la commande"""
+        caisse.index.resoudre(["111"])
+        Produit.objects.filter(pk=self.eau.pk).update(prix_vente=Decimal('160.00'))
+        commande, ticket = caisse.vendre(self.caissier, {"111": 2})
+        self.assertEqual(ticket["111"].prix, Decimal('160.00'))
+        self.assertEqual(commande.montant_total, Decimal('320.00'))
+
+    def test_vente_annulee(self):
+        """Stock insuffisant ou code inconnu : rien n'est enregistré"""
+        with self.assertRaises(StockInsuffisant):
+            caisse.vendre(self.caissier, {"111": 1, "222": 4})
+        with self.assertRaises(caisse.CodesInconnus) as contexte:
+            caisse.vendre(self.caissier, {"111": 1, "999": 1})
+        self.assertEqual(contexte.exception.codes, ["999"])
+        self.assertFalse(Commande.objects.exists())
+        self.eau.refresh_from_db()
+        self.assertEqual(self.eau.quantite_stock, 20)
+
+
+class CaisseApiTest(TestCase):
+    """Tests pour les points d'accès JSON de la caisse"""
+
+    def setUp(self):
+        cache.clear()
+        caisse.index.vider()
+        User.objects.create_user(username='caissier', password='test123', is_staff=True)
+        self.client = Client()
+        self.client.login(username='caissier', password='test123')
+        self.eau = Produit.objects.create(
+            nom="Eau 1L",
+            code_barre="111",
+            categorie=Categorie.objects.create(nom="Boissons"),
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=5
+        )
+
+    def poster(self, nom, donnees):
+        return self.client.post(reverse(nom), json.dumps(donnees), content_type='application/json')
+
+    def test_scanner(self):
+        """Les codes scannés sont résolus avec le total du ticket"""
+        response = self.client.get(reverse('caisse_scanner'), {'code': ["111", "111", "999"]})
+        self.assertEqual(response.status_code, 200)
+        donnees = response.json()
+        self.assertEqual(donnees['inconnus'], ["999"])
+        self.assertEqual(donnees['articles'][0]['quantite'], 2)
+        self.assertEqual(donnees['total'], '300.00')
+
+        response = self.poster('caisse_scanner', {'codes': ["111"]})
+        self.assertEqual(response.json()['articles'][0]['id'], self.eau.id)
+
+    def test_vente(self):
+        """Une vente valide renvoie 201 ; code inconnu 404, stock insuffisant 409, données invalides 400"""
+        response = self.poster('caisse_vente', {'codes': ["111", "111"]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['montant_total'], '300.00')
+        self.assertEqual(response.json()['articles'][0]['sous_total'], '300.00')
+        self.assertEqual(response.json()['articles'][0]['stock'], 3)
+        self.assertTrue(Commande.objects.filter(numero_commande=response.json()['commande']).exists())
+
+        response = self.poster('caisse_vente', {'codes': ["111", "999"]})
+        self.assertEqual((response.status_code, response.json()['inconnus']), (404, ["999"]))
+        response = self.poster('caisse_vente', {'articles': [{'code_barre': "111", 'quantite': 4}]})
+        self.assertEqual((response.status_code, response.json()['disponible']), (409, 3))
+        response = self.client.post(reverse('caisse_vente'), 'pas du json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('caisse_vente')).status_code, 405)
+        self.assertEqual(Commande.objects.count(), 1)
+
+    def test_reserve_au_staff(self):
+        """Un client ne peut ni scanner ni vendre"""
+        User.objects.create_user(username='client', password='test123')
+        client = Client()
+        client.login(username='client', password='test123')
+        self.assertEqual(client.get(reverse('caisse_scanner'), {'code': "111"}).status_code, 302)
+        self.assertEqual(client.post(reverse('caisse_vente'), '{}', content_type='application/json').status_code, 302)
@@ -0,0 +1,177 @@
+"""
+Tests pour la validation des paniers en commandes
+"""
+import random
+import threading
+import time
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.db import connections, OperationalError
+from decimal import Decimal
+from boutique_app.models import Categorie, Produit, Panier, ItemPanier, Commande, Vente, VenteJournaliere
+from boutique_app.commandes import passer_commande, PanierVide, StockInsuffisant
+from boutique_app.tests.utils import NombreRequetesMixin, creer_panier
+
+
+class PasserCommandeTest(NombreRequetesMixin, TestCase):
+    """Tests pour le service de commande"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='client', password='test123')
+        self.categorie = Categorie.objects.create(nom="Épicerie")
+        self.riz = self.creer_produit("Riz", 10)
+        self.huile = self.creer_produit("Huile", 3)
+        self.panier = Panier.objects.create(utilisateur=self.user)
+        ItemPanier.objects.create(panier=self.panier, produit=self.riz, quantite=4, prix_unitaire=Decimal('150.00'))
+        ItemPanier.objects.create(panier=self.panier, produit=self.huile, quantite=3, prix_unitaire=Decimal('150.00'))
+
+    def creer_produit(self, nom, stock):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=self.categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=stock
+        )
+
+    def test_commande_complete(self):
+        """La commande crée les ventes, décrémente le stock et valide le panier"""
+        modifie_le = self.riz.date_modification
+        commande = passer_commande(self.panier)
+
+        self.assertEqual(commande.montant_total, Decimal('1050.00'))
+        self.assertEqual(commande.ventes.count(), 2)
+        self.riz.refresh_from_db()
+        self.huile.refresh_from_db()
+        self.assertEqual(self.riz.quantite_stock, 6)
+        self.assertEqual(self.huile.quantite_stock, 0)
+        self.assertGreater(self.riz.date_modification, modifie_le)
+        self.panier.refresh_from_db()
+        self.assertEqual(self.panier.statut, 'valide')
+        self.assertEqual(VenteJournaliere.objects.get(produit=self.riz).quantite, 4)
+
+    def test_survente_refusee(self):
+        """Un stock insuffisant annule toute la commande"""
+        Produit.objects.filter(pk=self.huile.pk).update(quantite_stock=2)
+
+        with self.assertRaises(StockInsuffisant) as contexte:
+            passer_commande(self.panier)
+        self.assertEqual(contexte.exception.produit, "Huile")
+        self.assertEqual(contexte.exception.disponible, 2)
+
+        self.riz.refresh_from_db()
+        self.assertEqual(self.riz.quantite_stock, 10)
+        self.assertFalse(Commande.objects.exists())
+        self.assertFalse(Vente.objects.exists())
+        self.panier.refresh_from_db()
+        self.assertEqual(self.panier.statut, 'en_cours')
+
+    def test_administration_stock_insuffisant(self):
+        """Une commande saisie dans l'administration sans stock suffisant est refusée par le formulaire"""
+        admin = User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        self.client.force_login(admin)
+        Produit.objects.filter(pk=self.huile.pk).update(quantite_stock=2)
+        url = reverse('admin:boutique_app_commande_add')
+        donnees = {'panier': self.panier.pk, 'statut': 'en_attente', 'notes': '', 'date_livraison_0': '', 'date_livraison_1': ''}
+
+        response = self.client.post(url, donnees)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Stock insuffisant pour Huile. Stock disponible: 2')
+        self.assertFalse(Commande.objects.exists())
+        self.riz.refresh_from_db()
+        self.assertEqual(self.riz.quantite_stock, 10)
+
+        Produit.objects.filter(pk=self.huile.pk).update(quantite_stock=3)
+        self.assertEqual(self.client.post(url, donnees).status_code, 302)
+        self.assertEqual(Vente.objects.filter(commande__panier=self.panier).count(), 2)
+
+    def test_panier_vide_ou_deja_valide(self):
+        """Un panier vide ou déjà validé ne donne pas de commande"""
+        passer_commande(self.panier)
+        with self.assertRaises(PanierVide):
+            passer_commande(self.panier)
+
+        vide = Panier.objects.create(utilisateur=self.user)
+        with self.assertRaises(PanierVide):
+            passer_commande(vide)
+        self.assertEqual(Commande.objects.count(), 1)
+
+    # Numérotation sans accès à la base : seules les requêtes de la commande sont comptées
+    @override_settings(NUMEROTATION_COMMANDES={'ALLOCATEUR': 'boutique_app.numerotation.AllocateurHorodate'})
+    def test_requetes_constantes(self):
+        """Le nombre de requêtes ne dépend pas de la taille du panier"""
+        def preparer(taille):
+            utilisateur = User.objects.create_user(username=f'client{taille}')
+            return (creer_panier(utilisateur, taille),)
+
+        self.assertRequetesConstantes(17, preparer, passer_commande)
+
+
+class CommandesConcurrentesTest(TransactionTestCase):
+    """Commandes simultanées sur un même produit"""
+
+    NOMBRE_CLIENTS = 12
+    STOCK = 5
+    DELAI_MAX = 120  # secondes
+
+    def setUp(self):
+        cache.clear()
+        categorie = Categorie.objects.create(nom="Épicerie")
+        self.produit = Produit.objects.create(
+            nom="Riz",
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=self.STOCK
+        )
+        self.paniers = []
+        for i in range(self.NOMBRE_CLIENTS):
+            utilisateur = User.objects.create_user(username=f'client{i}')
+            panier = Panier.objects.create(utilisateur=utilisateur)
+            ItemPanier.objects.create(panier=panier, produit=self.produit, quantite=1, prix_unitaire=Decimal('150.00'))
+            self.paniers.append(panier)
+
+    def test_pas_de_survente(self):
+        """Exactement STOCK commandes aboutissent, les autres sont refusées"""
+        depart = threading.Barrier(self.NOMBRE_CLIENTS)
+        resultats = []
+
+        def commander(panier):
+            try:
+                depart.wait()
+                # Pas de nombre d'essais fixe (il dépendrait de la charge de la machine) :
+                # seul un verrou jamais libéré pendant DELAI_MAX fait échouer le test
+                limite = time.monotonic() + self.DELAI_MAX
+                attente = 0.001
+                while time.monotonic() < limite:
+                    try:
+                        passer_commande(panier)
+                        resultats.append('ok')
+                        return
+                    except StockInsuffisant:
+                        resultats.append('refusee')
+                        return
+                    except OperationalError:
+                        # Base verrouillée (SQLite en mémoire partagée) : nouvel essai, attente croissante
+                        time.sleep(random.uniform(0, attente))
+                        attente = min(attente * 2, 0.1)
+                resultats.append('abandon')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=commander, args=(panier,)) for panier in self.paniers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertNotIn('abandon', resultats)
+        self.assertEqual(resultats.count('ok'), self.STOCK)
+        self.assertEqual(resultats.count('refusee'), self.NOMBRE_CLIENTS - self.STOCK)
+        self.produit.refresh_from_db()
+        self.assertEqual(self.produit.quantite_stock, 0)
+        self.assertEqual(Vente.objects.filter(produit=self.produit).count(), self.STOCK)
+        self.assertEqual(VenteJournaliere.objects.get(produit=self.produit).quantite, self.STOCK)
@@ -0,0 +1,122 @@
+"""
+Tests pour les réponses conditionnelles (ETag) du catalogue et de la fiche produit
+"""
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.shortcuts import render
+from django.test import TestCase, Client
+from django.urls import reverse
+from boutique_app.models import Categorie, Produit, AvisProduit, ProduitSimilaire
+from boutique_app.similarites import calculer
+from boutique_app.tests.utils import creer_produits
+
+
+class ReponsesConditionnellesTest(TestCase):
+    """Tests pour les réponses 304 sans rendu et l'invalidation des ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.boissons = Categorie.objects.create(nom="Boissons")
+        self.eau, self.jus = creer_produits(2, categorie=self.boissons, prefixe='Boisson')
+        self.riz = creer_produits(1, prefixe='Riz')[0]
+        self.catalogue = reverse('catalogue')
+        self.fiche = reverse('detail_produit', args=[self.eau.id])
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def assertNonModifie(self, url, etag):
+        """Réponse 304 sans appel au rendu du gabarit"""
+        with mock.patch('boutique_app.views.render', wraps=render) as rendu:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        rendu.assert_not_called()
+
+    def assertModifie(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_requete_repetee(self):
+        """Seconde requête : 304 sans rendu, en deux requêtes SQL pour le catalogue"""
+        for url in (
+            self.catalogue, f'{self.catalogue}?categorie={self.boissons.id}&tri=note',
+            f'{self.catalogue}?recherche=Boisson', self.fiche,
+        ):
+            with self.subTest(url=url):
+                self.assertNonModifie(url, self.etag(url))
+        etag = self.etag(self.catalogue)
+        with self.assertNumQueries(2):  # produits filtrés, catégories/avis/similaires
+            self.client.get(self.catalogue, HTTP_IF_NONE_MATCH=etag)
+
+    def test_modification_produit(self):
+        """Un produit modifié (y compris par update()) change l'ETag des pages qui l'affichent"""
+        filtre = f'{self.catalogue}?categorie={self.boissons.id}'
+        etag_filtre, etag_fiche = self.etag(filtre), self.etag(self.fiche)
+
+        # Hors du filtre : page de la catégorie inchangée
+        self.riz.prix_vente += 1
+        self.riz.save()
+        self.assertNonModifie(filtre, etag_filtre)
+
+        # Même catégorie : affiché en complément sur la fiche
+        self.jus.prix_vente += 1
+        self.jus.save()
+        etag_filtre = self.assertModifie(filtre, etag_filtre)
+        etag_fiche = self.assertModifie(self.fiche, etag_fiche)
+
+        Produit.objects.filter(pk=self.jus.pk).update(active=False)
+        self.assertModifie(filtre, etag_filtre)
+        self.assertModifie(self.fiche, etag_fiche)
+
+    def test_categories_avis_et_similaires(self):
+        """Catégories, avis et produits similaires sont lus en base, sans signal ni cache"""
+        etag = self.etag(self.fiche)
+        self.boissons.nom = "Boissons fraîches"
+        self.boissons.save()
+        etag = self.assertModifie(self.fiche, etag)
+        avis = AvisProduit.objects.create(produit=self.jus, utilisateur=User.objects.create_user(username='avis'), note=4)
+        self.assertNonModifie(self.fiche, etag)  # avis pas encore approuvé : non affiché
+        avis.approuve = True
+        avis.save()
+        etag = self.assertModifie(self.fiche, etag)
+        avis.commentaire = "Très bon"
+        avis.save()
+        etag = self.assertModifie(self.fiche, etag)
+
+        # Table recalculée par un autre processus (commande de nuit) : ni signal ni cache partagé
+        cache.clear()
+        ProduitSimilaire.objects.bulk_create([ProduitSimilaire(produit=self.eau, similaire=self.riz, rang=1, score=0.5)])
+        etag = self.assertModifie(self.fiche, etag)
+        calculer()
+        self.assertModifie(self.fiche, etag)
+
+    def test_visiteur(self):
+        """L'ETag dépend de l'utilisateur affiché ; 404 pour un produit inactif"""
+        etag = self.etag(self.catalogue)
+        self.client.force_login(User.objects.create_user(username='client', first_name='Awa'))
+        self.assertModifie(self.catalogue, etag)
+
+        Produit.objects.filter(pk=self.eau.pk).update(active=False)
+        self.assertEqual(self.client.get(self.fiche, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+    def test_messages_en_attente(self):
+        """Un message flash en attente est affiché : pas de 304 ni d'ETag"""
+        self.client.force_login(User.objects.create_user(username='client'))
+        self.etag(self.fiche)  # premier formulaire : cookie CSRF créé
+        etag = self.etag(self.fiche)
+        self.client.post(reverse('ajouter_au_panier', args=[self.eau.id]), {'quantite': 0})
+
+        response = self.client.get(self.fiche, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'Quantité invalide')
+        # Message affiché : la copie du navigateur redevient valide
+        self.assertNonModifie(self.fiche, etag)
@@ -0,0 +1,147 @@
+"""
+Tests pour les cumuls journaliers des ventes
+"""
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.utils import timezone
+from decimal import Decimal
+from datetime import timedelta
+from importlib import import_module
+from django.apps import apps
+from django.urls import reverse
+from io import StringIO
+from boutique_app.models import Categorie, Produit, Panier, ItemPanier, Commande, Vente, VenteJournaliere
+from boutique_app.cumuls import reconstruire_cumuls
+
+
+class VenteJournaliereTest(TestCase):
+    """Tests pour la maintenance incrémentale et la reconstruction des cumuls"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser')
+        self.categorie = Categorie.objects.create(nom="Boissons")
+        self.produit = Produit.objects.create(
+            nom="Eau minérale",
+            categorie=self.categorie,
+            prix_achat=Decimal('200.00'),
+            prix_vente=Decimal('300.00'),
+            quantite_stock=100
+        )
+        self.autre_produit = Produit.objects.create(
+            nom="Jus",
+            categorie=self.categorie,
+            prix_achat=Decimal('400.00'),
+            prix_vente=Decimal('500.00'),
+            quantite_stock=100
+        )
+
+    def passer_commande(self, quantite):
+        panier = Panier.objects.create(utilisateur=self.user, statut='en_cours')
+        ItemPanier.objects.create(panier=panier, produit=self.produit, quantite=quantite, prix_unitaire=Decimal('300.00'))
+        ItemPanier.objects.create(panier=panier, produit=self.autre_produit, quantite=1, prix_unitaire=Decimal('500.00'))
+        return Commande.objects.create(panier=panier, montant_total=Decimal('0.00'))
+
+    def test_commande_met_a_jour_cumuls(self):
+        """Une commande ajoute ses ventes aux cumuls du jour"""
+        self.passer_commande(2)
+        self.passer_commande(3)
+
+        cumul = VenteJournaliere.objects.get(produit=self.produit, date=timezone.localdate())
+        self.assertEqual(cumul.quantite, 5)
+        self.assertEqual(cumul.montant_total, Decimal('1500.00'))
+        self.assertEqual(cumul.nombre_ventes, 2)
+        self.assertEqual(cumul.categorie, self.categorie)
+        self.assertEqual(VenteJournaliere.objects.count(), 2)
+
+    def test_vente_directe_et_suppression(self):
+        """Les ventes créées ou supprimées individuellement sont répercutées"""
+        vente = Vente.objects.create(
+            produit=self.produit,
+            quantite=4,
+            prix_unitaire=Decimal('300.00'),
+            montant_total=Decimal('1200.00')
+        )
+        cumul = VenteJournaliere.objects.get(produit=self.produit)
+        self.assertEqual(cumul.quantite, 4)
+
+        vente.delete()
+        self.assertFalse(VenteJournaliere.objects.filter(produit=self.produit).exists())
+
+    def cumuls(self):
+        return list(VenteJournaliere.objects.order_by('produit_id').values_list(
+            'date', 'produit_id', 'categorie_id', 'quantite', 'montant_total', 'nombre_ventes'
+        ))
+
+    def test_vente_modifiee(self):
+        """Une vente modifiée remplace l'ancienne dans les cumuls"""
+        commande = self.passer_commande(2)
+        vente = commande.ventes.get(produit=self.produit)
+        vente.quantite = 5
+        vente.montant_total = Decimal('1500.00')
+        vente.save()
+        self.assertEqual(VenteJournaliere.objects.get(produit=self.produit).quantite, 5)
+
+        vente.produit = self.autre_produit
+        vente.save()
+        attendus = self.cumuls()
+        self.assertFalse(VenteJournaliere.objects.filter(produit=self.produit).exists())
+        reconstruire_cumuls()
+        self.assertEqual(self.cumuls(), attendus)
+
+    def test_modification_dans_administration(self):
+        """Le montant d'une vente modifiée dans l'administration est recalculé, cumuls compris"""
+        admin = User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        self.client.force_login(admin)
+        vente = Vente.objects.create(
+            produit=self.produit, quantite=1, prix_unitaire=Decimal('300.00'), montant_total=Decimal('300.00')
+        )
+        response = self.client.post(reverse('admin:boutique_app_vente_change', args=[vente.pk]), {
+            'produit': self.produit.pk, 'quantite': 3, 'prix_unitaire': '250.00', 'commande': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        cumul = VenteJournaliere.objects.get(produit=self.produit)
+        self.assertEqual((cumul.quantite, cumul.montant_total, cumul.nombre_ventes), (3, Decimal('750.00'), 1))
+
+    def test_migration_remplit_l_historique(self):
+        """La migration 0010 calcule les cumuls des ventes enregistrées avant la table"""
+        self.passer_commande(2)
+        self.passer_commande(1)
+        attendus = self.cumuls()
+        VenteJournaliere.objects.all().delete()
+
+        migration = import_module('boutique_app.migrations.0010_remplir_ventes_journalieres')
+        migration.remplir_cumuls(apps, None)
+        self.assertEqual(self.cumuls(), attendus)
+
+    def test_reconstruction_identique_aux_cumuls_incrementaux(self):
+        """La reconstruction donne les mêmes cumuls que la maintenance incrémentale"""
+        self.passer_commande(2)
+        self.passer_commande(1)
+        avant = list(VenteJournaliere.objects.order_by('produit_id').values_list(
+            'date', 'produit_id', 'categorie_id', 'quantite', 'montant_total', 'nombre_ventes'
+        ))
+
+        reconstruire_cumuls(jours_par_lot=1)
+        apres = list(VenteJournaliere.objects.order_by('produit_id').values_list(
+            'date', 'produit_id', 'categorie_id', 'quantite', 'montant_total', 'nombre_ventes'
+        ))
+        self.assertEqual(avant, apres)
+
+    def test_commande_reconstruction(self):
+        """La commande de gestion reconstruit l'historique par lots"""
+        for jours in (0, 10, 40, 400):
+            vente = Vente.objects.create(
+                produit=self.produit,
+                quantite=1,
+                prix_unitaire=Decimal('300.00'),
+                montant_total=Decimal('300.00')
+            )
+            Vente.objects.filter(id=vente.id).update(date_vente=timezone.now() - timedelta(days=jours))
+
+        sortie = StringIO()
+        call_command('reconstruire_ventes_journalieres', '--jours-par-lot', '7', stdout=sortie)
+        self.assertIn('4 cumul(s)', sortie.getvalue())
+        dates = set(VenteJournaliere.objects.values_list('date', flat=True))
+        self.assertIn(timezone.localdate() - timedelta(days=400), dates)
+        self.assertEqual(len(dates), 4)
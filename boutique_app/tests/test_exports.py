@@ -0,0 +1,184 @@
+"""
+Tests pour l'export des ventes
+"""
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime
+from unittest import skipUnless
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from boutique_app.models import Categorie, Produit, Vente
+from boutique_app.exports import (
+    filtres_export, FiltresInvalides, csv_ventes, ventes_filtrees, exporter_parquet, COLONNES_PARQUET
+)
+
+
+class VentesTestCase(TestCase):
+    """Ventes de janvier et février 2025 dans deux catégories"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='admin123', is_staff=True)
+        self.boissons = Categorie.objects.create(nom="Boissons")
+        self.epicerie = Categorie.objects.create(nom="Épicerie")
+        self.jus = self.creer_produit("Jus, mangue", self.boissons)
+        self.riz = self.creer_produit("Riz", self.epicerie)
+        self.vendre(self.jus, date(2025, 1, 10))
+        self.vendre(self.riz, date(2025, 1, 15))
+        self.vendre(self.jus, date(2025, 1, 31))
+        self.vendre(self.riz, date(2025, 2, 1))
+
+    def creer_produit(self, nom, categorie):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+
+    def vendre(self, produit, jour):
+        vente = Vente.objects.create(
+            produit=produit, quantite=2, prix_unitaire=Decimal('150.00'), montant_total=Decimal('300.00')
+        )
+        # Dernière minute du jour local : la borne de fin doit l'inclure
+        instant = timezone.make_aware(datetime.combine(jour, datetime.max.time()))
+        Vente.objects.filter(pk=vente.pk).update(date_vente=instant)
+
+
+class ExportVentesTest(VentesTestCase):
+    """Tests pour l'export CSV en flux"""
+
+    def exporter(self, **parametres):
+        self.client.login(username='admin', password='admin123')
+        response = self.client.get(reverse('export_ventes'), parametres)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        contenu = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.reader(io.StringIO(contenu)))
+
+    def test_export_complet(self):
+        """Toutes les ventes sont exportées, les plus récentes d'abord"""
+        lignes = self.exporter()
+        self.assertEqual(lignes[0], ['Date', 'Produit', 'Catégorie', 'Quantité', 'Prix unitaire', 'Montant total'])
+        self.assertEqual([ligne[0][:10] for ligne in lignes[1:]], ['2025-02-01', '2025-01-31', '2025-01-15', '2025-01-10'])
+        self.assertEqual(lignes[2][1:], ['Jus, mangue', 'Boissons', '2', '150.0', '300.0'])
+
+    def test_filtre_periode(self):
+        """Les jours de début et de fin sont inclus"""
+        lignes = self.exporter(debut='2025-01-15', fin='2025-01-31')
+        self.assertEqual([ligne[0][:10] for ligne in lignes[1:]], ['2025-01-31', '2025-01-15'])
+
+    def test_filtre_categorie(self):
+        """Seules les ventes de la catégorie demandée sont exportées"""
+        lignes = self.exporter(categorie=self.epicerie.id, debut='2025-01-01')
+        self.assertEqual([ligne[1] for ligne in lignes[1:]], ['Riz', 'Riz'])
+
+    def test_nom_fichier(self):
+        """Le nom du fichier reprend la période exportée"""
+        self.client.login(username='admin', password='admin123')
+        response = self.client.get(reverse('export_ventes'), {'debut': '2025-01-01', 'fin': '2025-01-31'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="ventes_20250101_20250131.csv"')
+
+    def test_filtres_invalides(self):
+        """Un filtre illisible est refusé"""
+        self.client.login(username='admin', password='admin123')
+        for parametres in ({'debut': '31/01/2025'}, {'fin': '2025-02-30'}, {'categorie': 'abc'},
+                           {'debut': '2025-02-01', 'fin': '2025-01-01'}):
+            with self.subTest(parametres=parametres):
+                response = self.client.get(reverse('export_ventes'), parametres)
+                self.assertEqual(response.status_code, 400)
+        with self.assertRaises(FiltresInvalides):
+            filtres_export({'debut': 'hier'})
+
+    def test_lecture_par_lots(self):
+        """Le CSV est produit par morceaux à partir d'une seule requête"""
+        with self.assertNumQueries(1):
+            morceaux = list(csv_ventes(ventes_filtrees(), lignes_par_morceau=2))
+        self.assertEqual(len(morceaux), 3)  # en-tête + 2 morceaux de 2 lignes
+
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+@skipUnless(pq, "pyarrow n'est pas installé")
+class ExportParquetTest(VentesTestCase):
+    """Tests pour l'export Parquet partitionné par mois"""
+
+    def setUp(self):
+        super().setUp()
+        self.dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dossier)
+
+    def test_partition_par_mois(self):
+        """Un fichier par mois, ventes dans l'ordre chronologique"""
+        fichiers = exporter_parquet(self.dossier)
+        self.assertEqual([(mois, lignes) for mois, _, lignes in fichiers], [('2025-01', 3), ('2025-02', 1)])
+        self.assertEqual(fichiers[0][1], os.path.join(self.dossier, 'mois=2025-01', 'ventes.parquet'))
+        table = pq.read_table(fichiers[0][1])
+        self.assertEqual(table.column_names, COLONNES_PARQUET)
+        self.assertEqual(table.column('produit').to_pylist(), ['Jus, mangue', 'Riz', 'Jus, mangue'])
+        self.assertEqual(table.column('categorie').to_pylist(), ['Boissons', 'Épicerie', 'Boissons'])
+        self.assertEqual(table.column('montant_total').to_pylist(), [300.0] * 3)
+        self.assertEqual(table.column('commande_id').null_count, 3)
+
+    def test_lecture_du_jeu_complet(self):
+        """Le dossier se lit comme un jeu de données partitionné"""
+        exporter_parquet(self.dossier)
+        table = pq.read_table(self.dossier)
+        self.assertEqual(table.num_rows, 4)
+        self.assertIn('mois', table.column_names)
+
+    def test_groupes_de_lignes(self):
+        """Les lignes sont écrites par groupes de taille bornée"""
+        fichiers = exporter_parquet(self.dossier, taille_groupe=2)
+        self.assertEqual(pq.ParquetFile(fichiers[0][1]).metadata.num_row_groups, 2)
+
+    def test_filtres(self):
+        """Les filtres de période et de catégorie s'appliquent"""
+        fichiers = exporter_parquet(self.dossier, debut=date(2025, 1, 12), categorie=self.epicerie.id)
+        self.assertEqual([(mois, lignes) for mois, _, lignes in fichiers], [('2025-01', 1), ('2025-02', 1)])
+
+    def test_aucune_vente(self):
+        """Sans vente, aucun fichier n'est créé"""
+        self.assertEqual(exporter_parquet(self.dossier, debut=date(2030, 1, 1)), [])
+        self.assertEqual(os.listdir(self.dossier), [])
+
+    def test_endpoint_zip(self):
+        """L'endpoint renvoie les partitions dans une archive ZIP"""
+        self.client.login(username='admin', password='admin123')
+        response = self.client.get(reverse('export_ventes_parquet'), {'debut': '2025-01-01', 'fin': '2025-01-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename="ventes_20250101_20250131.parquet.zip"'
+        )
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), ['mois=2025-01/ventes.parquet'])
+        self.assertEqual(pq.read_table(io.BytesIO(archive.read('mois=2025-01/ventes.parquet'))).num_rows, 3)
+
+    def test_endpoint_reserve_au_staff(self):
+        """Un client ne peut pas exporter"""
+        User.objects.create_user(username='client', password='client123')
+        self.client.login(username='client', password='client123')
+        response = self.client.get(reverse('export_ventes_parquet'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_commande(self):
+        """La commande écrit les partitions et refuse les filtres invalides"""
+        sortie = io.StringIO()
+        call_command('exporter_ventes_parquet', self.dossier, '--fin', '2025-01-31', stdout=sortie)
+        self.assertIn('3 vente(s) exportée(s) dans 1 fichier(s)', sortie.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('exporter_ventes_parquet', self.dossier, '--debut', 'hier', stdout=io.StringIO())
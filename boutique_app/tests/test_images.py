@@ -0,0 +1,148 @@
+"""
+Tests pour les images dérivées (vignettes WebP/JPEG et srcset)
+"""
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from boutique_app.models import Categorie, Produit
+from boutique_app import images
+
+
+def fichier_image(largeur, hauteur, format_pillow='PNG', nom='photo.png'):
+    """Image unie (semi-transparente en PNG)"""
+    tampon = io.BytesIO()
+    if format_pillow == 'PNG':
+        image = Image.new('RGBA', (largeur, hauteur), (200, 30, 30, 128))
+    else:
+        image = Image.new('RGB', (largeur, hauteur), (200, 30, 30))
+    image.save(tampon, format_pillow)
+    return SimpleUploadedFile(nom, tampon.getvalue())
+
+
+class ImagesDeriveesTest(TestCase):
+    """Tests pour la génération, la mise en cache et l'affichage des dérivés"""
+
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        reglage = override_settings(MEDIA_ROOT=self.media)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.categorie = Categorie.objects.create(nom="Boissons")
+
+    def creer_produit(self, image, nom="Jus"):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=self.categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            image=image
+        )
+
+    def test_generation_a_l_enregistrement(self):
+        """Chaque variante est créée en WebP et JPEG, sans agrandissement ni transparence"""
+        with self.captureOnCommitCallbacks(execute=True):
+            produit = self.creer_produit(fichier_image(1600, 800))
+        informations = cache.get(images.CLE_CACHE + produit.image.name)
+        self.assertEqual(informations['dimensions'], {'vignette': (200, 100), 'grille': (600, 300), 'detail': (1200, 600)})
+
+        empreinte = informations['empreinte']
+        for variante in images.VARIANTES:
+            with default_storage.open(images.nom_derive(empreinte, variante, 'webp')) as fichier:
+                self.assertEqual(Image.open(fichier).format, 'WEBP')
+            with default_storage.open(images.nom_derive(empreinte, variante, 'jpg')) as fichier:
+                jpeg = Image.open(fichier)
+                self.assertEqual((jpeg.format, jpeg.mode), ('JPEG', 'RGB'))
+
+        # Même contenu téléversé sous un autre nom : mêmes dérivés, rien de recréé
+        autre = self.creer_produit(fichier_image(1600, 800, nom='copie.png'), nom="Copie")
+        self.assertNotEqual(autre.image.name, produit.image.name)
+        resultat = images.generer(autre.image.name)
+        self.assertEqual((resultat['empreinte'], resultat['crees']), (empreinte, 0))
+
+    def test_generation_au_premier_affichage(self):
+        """Sans dérivés, le premier affichage les génère ; les suivants ne relisent pas le fichier"""
+        produit = self.creer_produit(fichier_image(300, 300))  # on_commit non exécuté
+        self.assertIsNone(cache.get(images.CLE_CACHE + produit.image.name))
+
+        derivees = images.derivees(produit.image)
+        # Petite image : grille et détail identiques, une seule entrée dans le srcset
+        self.assertEqual(derivees.dimensions['detail'], (300, 300))
+        self.assertEqual(derivees.srcset(('grille', 'detail'), 'jpg').count('w'), 1)
+        with mock.patch.object(images, 'generer', side_effect=AssertionError):
+            self.assertEqual(images.derivees(produit.image).empreinte, derivees.empreinte)
+
+    def test_derives_existants_non_recalcules(self):
+        """Dérivés déjà écrits : dimensions lues sans décoder l'original ; seul un fichier manquant est recréé"""
+        produit = self.creer_produit(fichier_image(1600, 800))
+        attendu = images.generer(produit.image.name)
+        with mock.patch.object(images, '_fond_blanc', side_effect=AssertionError):
+            resultat = images.generer(produit.image.name)
+        self.assertEqual(resultat, {**attendu, 'crees': 0})
+
+        default_storage.delete(images.nom_derive(attendu['empreinte'], 'grille', 'webp'))
+        reductions = []
+        reduire = Image.Image.thumbnail
+        with mock.patch.object(Image.Image, 'thumbnail', lambda image, *args: reductions.append(args) or reduire(image, *args)):
+            resultat = images.generer(produit.image.name)
+        self.assertEqual(resultat, {**attendu, 'crees': 1})
+        self.assertEqual(len(reductions), 1)
+
+    def test_balise_srcset(self):
+        """La balise produit un <picture> WebP/JPEG paresseux, l'original si l'image est illisible"""
+        produit = self.creer_produit(fichier_image(1600, 1600))
+        gabarit = Template("{% load images %}{% image_responsive produit.image 'grille' produit.nom %}")
+        html = gabarit.render(Context({'produit': produit}))
+        self.assertIn('<source type="image/webp" srcset="/media/derives/', html)
+        self.assertRegex(html, r'srcset="[^"]+-vignette\.jpg 200w, [^"]+-grille\.jpg 600w"')
+        self.assertIn('width="600" height="600"', html)
+        self.assertIn('loading="lazy"', html)
+
+        casse = self.creer_produit(SimpleUploadedFile('casse.jpg', b'pas une image'), nom="Cassé")
+        html = gabarit.render(Context({'produit': casse}))
+        self.assertEqual(html, f'<img src="{casse.image.url}" alt="Cassé" loading="lazy" decoding="async">')
+
+    def test_pages(self):
+        """Catalogue et fiche produit n'affichent plus l'original"""
+        produit = self.creer_produit(fichier_image(1600, 800))
+        client = Client()
+        response = client.get(reverse('catalogue'))
+        self.assertContains(response, '-grille.jpg')
+        self.assertNotContains(response, f'src="{produit.image.url}"')
+        response = client.get(reverse('detail_produit', args=[produit.id]))
+        self.assertContains(response, '-detail.jpg')
+        self.assertContains(response, 'loading="eager"')
+
+    def test_commande(self):
+        """La commande traite les images existantes en parallèle et signale les fichiers illisibles"""
+        self.creer_produit(fichier_image(800, 400))
+        self.creer_produit(fichier_image(400, 800, format_pillow='JPEG', nom='photo.jpg'), nom="Eau")
+        self.creer_produit(SimpleUploadedFile('casse.jpg', b'pas une image'), nom="Cassé")
+        # Image partagée avec une catégorie : traitée une seule fois
+        Categorie.objects.filter(pk=self.categorie.pk).update(image=Produit.objects.get(nom="Eau").image.name)
+
+        sortie, erreurs = StringIO(), StringIO()
+        call_command('generer_images_derivees', '--processus', '2', stdout=sortie, stderr=erreurs)
+        self.assertIn("2 image(s) traitée(s), 12 fichier(s) dérivé(s) créé(s), 1 erreur(s)", sortie.getvalue())
+        self.assertIn("casse", erreurs.getvalue())
+        # Cache du serveur vide : informations retrouvées d'après les dérivés écrits, sans redimensionnement
+        self.assertIsNone(cache.get(images.CLE_CACHE + Produit.objects.get(nom="Eau").image.name))
+        with mock.patch.object(images, '_fond_blanc', side_effect=AssertionError):
+            derivees = images.derivees(Produit.objects.get(nom="Eau").image)
+        self.assertEqual(derivees.dimensions['grille'], (300, 600))
+
+        sortie = StringIO()
+        call_command('generer_images_derivees', '--processus', '1', '--forcer', stdout=sortie, stderr=StringIO())
+        self.assertIn("12 fichier(s) dérivé(s) créé(s)", sortie.getvalue())
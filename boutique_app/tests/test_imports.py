@@ -0,0 +1,222 @@
+"""
+Tests pour l'import en masse des produits
+"""
+import io
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.urls import reverse
+from boutique_app.models import Categorie, Fournisseur, Produit
+from boutique_app.imports import importer_produits, lire_csv, lire_fichier, FichierInvalide
+from boutique_app.recherche import rechercher
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+ENTETE = "code_barre;nom;catégorie;fournisseur;prix_achat;prix_vente;quantite_stock"
+
+
+def csv_binaire(*lignes, entete=ENTETE):
+    return io.BytesIO('\n'.join((entete,) + lignes).encode('utf-8'))
+
+
+class ImportProduitsTest(TestCase):
+    """Tests pour la création et la mise à jour des produits par code-barres"""
+
+    def setUp(self):
+        cache.clear()
+        self.boissons = Categorie.objects.create(nom="Boissons")
+        self.grossiste = Fournisseur.objects.create(nom="Grossiste")
+        self.eau = Produit.objects.create(
+            nom="Eau 1L",
+            code_barre="111",
+            categorie=self.boissons,
+            fournisseur=self.grossiste,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=20,
+            quantite_minimum=5
+        )
+
+    def importer(self, *lignes, entete=ENTETE, **options):
+        return importer_produits(lire_csv(csv_binaire(*lignes, entete=entete)), **options)
+
+    def test_creation_et_referentiels(self):
+        """Nouveaux produits créés ; catégories et fournisseurs retrouvés sans casse ni accents ou créés"""
+        rapport = self.importer(
+            "222;Jus d'orange;BOISSONS;grossiste;250,50;400;12",
+            "333;Riz 5kg;Épicerie;Import Sarl;2000;2 800,00;7",
+            "444;Riz 1kg;epicerie;;500;700;3",
+        )
+        self.assertEqual((rapport.crees, rapport.modifies, rapport.erreurs), (3, 0, []))
+        self.assertEqual((rapport.categories_creees, rapport.fournisseurs_crees), (1, 1))
+
+        jus = Produit.objects.get(code_barre="222")
+        self.assertEqual((jus.categorie, jus.fournisseur), (self.boissons, self.grossiste))
+        self.assertEqual(jus.prix_achat, Decimal('250.50'))
+        self.assertEqual(jus.quantite_minimum, 10)  # valeur par défaut du modèle
+        riz = Produit.objects.get(code_barre="333")
+        self.assertEqual(riz.prix_vente, Decimal('2800.00'))
+        self.assertEqual(Produit.objects.get(code_barre="444").categorie, riz.categorie)
+        self.assertEqual(Categorie.objects.filter(nom__iexact="Épicerie").count(), 1)
+
+    def test_mise_a_jour_partielle(self):
+        """Seules les colonnes renseignées sont écrites ; une ligne identique ne modifie rien"""
+        Produit.objects.filter(pk=self.eau.pk).update(date_modification="2024-01-01T00:00:00Z")
+        rapport = self.importer("111;;;;;175;40", entete=ENTETE)
+        self.assertEqual((rapport.modifies, rapport.crees), (1, 0))
+        self.eau.refresh_from_db()
+        self.assertEqual((self.eau.nom, self.eau.prix_vente, self.eau.quantite_stock), ("Eau 1L", Decimal('175.00'), 40))
+        self.assertEqual(self.eau.quantite_minimum, 5)
+        self.assertGreater(self.eau.date_modification.year, 2024)
+
+        rapport = self.importer("111;Eau 1L;Boissons;Grossiste;100;175;40")
+        self.assertEqual((rapport.modifies, rapport.inchanges), (0, 1))
+
+    def test_erreurs_par_ligne(self):
+        """Les lignes invalides sont signalées avec leur numéro, les autres sont importées"""
+        rapport = self.importer(
+            "222;Jus;Boissons;;abc;400;1",
+            "333;Riz;Épicerie;;2000;2800;-4",
+            "444;Thé;Boissons;;100;150;2",
+            "444;Thé vert;Boissons;;100;150;2",
+            "555;;;;;;9",
+            ";Sans code;Boissons;;100;150;2",
+        )
+        self.assertEqual(rapport.lignes, 6)
+        self.assertEqual(rapport.crees, 1)
+        erreurs = dict(rapport.erreurs)
+        self.assertEqual(sorted(erreurs), [2, 3, 5, 6, 7])
+        self.assertIn("prix_achat", erreurs[2])
+        self.assertIn("quantite_stock", erreurs[3])
+        self.assertIn("déjà présent ligne 4", erreurs[5])
+        self.assertIn("nom, categorie, prix_achat, prix_vente", erreurs[6])
+        self.assertIn("code_barre", erreurs[7])
+        self.assertFalse(Categorie.objects.filter(nom="Épicerie").exists())
+
+    def test_promotion_sans_prix(self):
+        """Un produit en promotion doit avoir un prix promotionnel"""
+        rapport = self.importer("111;oui", entete="code_barre;en_promotion")
+        self.assertIn("prix_promo", rapport.erreurs[0][1])
+        rapport = self.importer("111;oui;90", entete="code_barre;promotion;prix_promo")
+        self.assertEqual(rapport.modifies, 1)
+        self.assertTrue(Produit.objects.get(pk=self.eau.pk).en_promotion)
+
+    def test_simulation(self):
+        """La simulation produit le même rapport sans rien enregistrer"""
+        lignes = ("111;Eau 1L;Boissons;Grossiste;100;999;20", "222;Jus;Jus de fruits;Nouveau;100;150;1")
+        simulation = self.importer(*lignes, simulation=True)
+        self.assertEqual((simulation.crees, simulation.modifies, simulation.categories_creees), (1, 1, 1))
+        self.assertEqual(Produit.objects.count(), 1)
+        self.assertEqual(Produit.objects.get(pk=self.eau.pk).prix_vente, Decimal('150.00'))
+        self.assertFalse(Categorie.objects.filter(nom="Jus de fruits").exists())
+
+        reel = self.importer(*lignes)
+        self.assertEqual((reel.crees, reel.modifies, reel.categories_creees), (1, 1, 1))
+
+    def test_nombre_requetes_constant(self):
+        """Le nombre de requêtes d'un lot ne dépend pas du nombre de lignes"""
+        # Référentiels, produits existants, insertion, ids créés, index de recherche (2), savepoint (2)
+        for debut, nombre in ((1000, 10), (2000, 500)):
+            lignes = [f"{debut + i};Produit {i};Boissons;;100;150;{i}" for i in range(nombre)]
+            with self.assertNumQueries(9):
+                self.importer(*lignes)
+
+    def test_index_de_recherche(self):
+        """Les produits créés ou renommés sont trouvés par la recherche"""
+        self.importer("222;Bissap glacé;Boissons;;100;150;1", "111;Eau minérale;;;;;")
+        self.assertEqual([p.code_barre for p in rechercher(Produit.objects.all(), "bissap")], ["222"])
+        self.assertEqual([p.code_barre for p in rechercher(Produit.objects.all(), "minerale")], ["111"])
+
+    def test_fichier_invalide(self):
+        """Colonne code_barre absente ou format inconnu"""
+        with self.assertRaises(FichierInvalide):
+            self.importer("Eau;100", entete="nom;prix_achat")
+        with self.assertRaises(FichierInvalide):
+            lire_fichier(io.BytesIO(b''), 'produits.pdf')
+
+    @unittest.skipUnless(openpyxl, "openpyxl n'est pas installé")
+    def test_excel(self):
+        """Un classeur Excel est lu comme un CSV (nombres et booléens natifs acceptés)"""
+        classeur = openpyxl.Workbook()
+        feuille = classeur.active
+        feuille.append(["Code barres", "Nom", "Catégorie", "Prix achat", "Prix vente", "Stock", "Actif"])
+        feuille.append([6001234567890, "Savon", "Hygiène", 250.5, 400, 12, False])
+        feuille.append([111, None, None, None, 160, None, None])
+        contenu = io.BytesIO()
+        classeur.save(contenu)
+        contenu.seek(0)
+
+        rapport = importer_produits(lire_fichier(contenu, 'tarifs.xlsx'))
+        self.assertEqual((rapport.crees, rapport.modifies, rapport.erreurs), (1, 1, []))
+        savon = Produit.objects.get(code_barre="6001234567890")
+        self.assertEqual((savon.prix_achat, savon.quantite_stock, savon.active), (Decimal('250.50'), 12, False))
+        self.assertEqual(Produit.objects.get(pk=self.eau.pk).prix_vente, Decimal('160.00'))
+
+
+class ImportProduitsInterfacesTest(TestCase):
+    """Tests pour la commande et la page d'import de l'administration"""
+
+    def setUp(self):
+        cache.clear()
+        self.contenu = '\n'.join([ENTETE, "222;Jus;Boissons;;100;150;1", "333;Riz;Épicerie;;abc;700;3"]).encode('utf-8')
+
+    def test_commande(self):
+        """La commande affiche les erreurs par ligne et le résumé"""
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'produits.csv')
+            with open(chemin, 'wb') as fichier:
+                fichier.write(self.contenu)
+
+            sortie, erreurs = StringIO(), StringIO()
+            call_command('importer_produits', chemin, '--simulation', stdout=sortie, stderr=erreurs)
+            self.assertIn("Simulation : 2 ligne(s) lue(s), 1 produit(s) créé(s)", sortie.getvalue())
+            self.assertIn("Ligne 3 : prix_achat", erreurs.getvalue())
+            self.assertFalse(Produit.objects.exists())
+
+            call_command('importer_produits', chemin, stdout=StringIO(), stderr=StringIO())
+            self.assertTrue(Produit.objects.filter(code_barre="222").exists())
+
+            with self.assertRaises(CommandError):
+                call_command('importer_produits', os.path.join(dossier, 'absent.csv'), stdout=StringIO())
+            with self.assertRaises(CommandError):
+                call_command('importer_produits', chemin, '--taille-lot', '0', stdout=StringIO())
+
+    def test_page_administration(self):
+        """Le staff importe un fichier depuis la liste des produits ; le rapport liste les erreurs"""
+        User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        client = Client()
+        client.login(username='admin', password='admin123')
+        url = reverse('admin:boutique_app_produit_importer')
+        self.assertContains(client.get(reverse('admin:boutique_app_produit_changelist')), url)
+
+        response = client.post(url, {'fichier': SimpleUploadedFile('produits.csv', self.contenu), 'simulation': 'on'})
+        self.assertContains(response, "Rapport de simulation")
+        self.assertContains(response, "n&#x27;est pas un prix")
+        self.assertFalse(Produit.objects.exists())
+
+        response = client.post(url, {'fichier': SimpleUploadedFile('produits.csv', self.contenu)})
+        self.assertContains(response, "Rapport d'import")
+        self.assertTrue(Produit.objects.filter(code_barre="222").exists())
+
+        response = client.post(url, {'fichier': SimpleUploadedFile('produits.pdf', b'%PDF')})
+        self.assertContains(response, "Format non pris en charge")
+
+    def test_page_reservee_au_staff(self):
+        """Un client ne peut pas accéder à l'import"""
+        User.objects.create_user(username='client', password='test123')
+        client = Client()
+        client.login(username='client', password='test123')
+        response = client.get(reverse('admin:boutique_app_produit_importer'))
+        self.assertEqual(response.status_code, 302)
@@ -1,7 +1,9 @@
 """
 Tests unitaires pour les modèles
 """
+from datetime import date, datetime, timezone as dt_timezone
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from decimal import Decimal
@@ -150,6 +152,114 @@ class ProduitModelTest(TestCase):
             produit.full_clean()
 
 
+class ProduitQuerySetTest(TestCase):
+    """Tests pour les annotations financières calculées en SQL"""
+    
+    def setUp(self):
+        self.categorie = Categorie.objects.create(nom="Boissons")
+        self.produit = Produit.objects.create(
+            nom="Eau minérale",
+            categorie=self.categorie,
+            prix_achat=Decimal('200.00'),
+            prix_vente=Decimal('300.00'),
+            quantite_stock=100,
+            quantite_minimum=10
+        )
+        self.produit_promo = Produit.objects.create(
+            nom="Jus",
+            categorie=self.categorie,
+            prix_achat=Decimal('400.00'),
+            prix_vente=Decimal('600.00'),
+            prix_promo=Decimal('500.00'),
+            en_promotion=True,
+            quantite_stock=5,
+            quantite_minimum=10
+        )
+    
+    def test_with_financials_identique_aux_proprietes(self):
+        """Les annotations SQL donnent les mêmes valeurs que les propriétés"""
+        for produit in Produit.objects.with_financials():
+            self.assertEqual(produit.prix_effectif, produit.prix_affichage)
+            self.assertEqual(produit.valeur_stock_calculee, produit.valeur_stock)
+            self.assertEqual(produit.marge_unitaire, produit.prix_affichage - produit.prix_achat)
+            self.assertAlmostEqual(float(produit.marge_pourcentage), float(produit.marge_benefice), places=2)
+    
+    def test_statistiques_financieres(self):
+        """Test l'agrégation de la valeur du stock et des marges"""
+        stats = Produit.objects.statistiques_financieres()
+        self.assertEqual(stats['valeur_stock_total'], Decimal('22000.00'))
+        self.assertEqual(stats['marge_min'], Decimal('100.00'))
+        self.assertEqual(stats['marge_max'], Decimal('100.00'))
+    
+    def test_marge_non_entiere(self):
+        """Une marge non ronde n'est pas tronquée (division entière de SQLite)"""
+        Produit.objects.all().delete()
+        Produit.objects.create(
+            nom="Lait", categorie=self.categorie,
+            prix_achat=Decimal('120'), prix_vente=Decimal('155'), quantite_stock=1
+        )
+        Produit.objects.create(
+            nom="Sucre", categorie=self.categorie,
+            prix_achat=Decimal('300'), prix_vente=Decimal('400'), quantite_stock=1
+        )
+        lait = Produit.objects.with_financials().get(nom="Lait")
+        self.assertAlmostEqual(float(lait.marge_pourcentage), 29.17, places=2)
+        # (29,1667 + 33,3333) / 2
+        moyenne = Produit.objects.statistiques_financieres()['marge_moyenne']
+        self.assertAlmostEqual(float(moyenne), 31.25, places=2)
+    
+    def test_stock_faible(self):
+        """Test le filtre des produits en stock faible"""
+        self.assertEqual(list(Produit.objects.stock_faible()), [self.produit_promo])
+
+
+class VenteQuerySetTest(TestCase):
+    """Tests pour les filtres par jour calendaire local"""
+    
+    def setUp(self):
+        categorie = Categorie.objects.create(nom="Boissons")
+        self.produit = Produit.objects.create(
+            nom="Eau minérale",
+            categorie=categorie,
+            prix_achat=Decimal('200.00'),
+            prix_vente=Decimal('300.00'),
+            quantite_stock=100
+        )
+    
+    def vendre(self, instant):
+        vente = Vente.objects.create(
+            produit=self.produit, quantite=1, prix_unitaire=Decimal('300.00'), montant_total=Decimal('300.00')
+        )
+        Vente.objects.filter(pk=vente.pk).update(date_vente=instant)
+        return vente
+    
+    def test_bornes_des_jours_locaux(self):
+        """Minuit local appartient au jour qui commence, jamais au précédent"""
+        with timezone.override('Africa/Lagos'):  # UTC+1
+            veille = self.vendre(datetime(2025, 1, 14, 22, 59, 59, 999999, tzinfo=dt_timezone.utc))
+            minuit = self.vendre(datetime(2025, 1, 14, 23, 0, tzinfo=dt_timezone.utc))
+            soir = self.vendre(datetime(2025, 1, 15, 22, 59, 59, 999999, tzinfo=dt_timezone.utc))
+            lendemain = self.vendre(datetime(2025, 1, 15, 23, 0, tzinfo=dt_timezone.utc))
+            
+            self.assertEqual(set(Vente.objects.du_jour(date(2025, 1, 15))), {minuit, soir})
+            self.assertEqual(set(Vente.objects.entre(date(2025, 1, 14), date(2025, 1, 15))), {veille, minuit, soir})
+            self.assertEqual(set(Vente.objects.entre(debut=date(2025, 1, 16))), {lendemain})
+            self.assertEqual(set(Vente.objects.entre(fin=date(2025, 1, 14))), {veille})
+            self.assertEqual(Vente.objects.entre().count(), 4)
+            # Même résultat que le filtre __date, qui convertit chaque ligne
+            self.assertEqual(
+                set(Vente.objects.du_jour(date(2025, 1, 15))),
+                set(Vente.objects.filter(date_vente__date=date(2025, 1, 15)))
+            )
+    
+    def test_colonne_comparee_directement(self):
+        """Le filtre compare la colonne à des constantes (utilisable par un index)"""
+        sql = str(Vente.objects.du_jour(date(2025, 1, 15)).query)
+        self.assertNotIn('django_datetime_cast_date', sql)
+        self.assertIn('"date_vente" >=', sql)
+        self.assertIn('"date_vente" <', sql)
+
+
 class PanierModelTest(TestCase):
     """Tests pour le modèle Panier"""
     
@@ -190,6 +300,18 @@ class PanierModelTest(TestCase):
         )
         # Total = 2 * 150 = 300
         self.assertEqual(self.panier.total, Decimal('300.00'))
+    
+    def test_panier_total_articles_precharges(self):
+        """Test que le total utilise les articles préchargés sans requête"""
+        ItemPanier.objects.create(
+            panier=self.panier,
+            produit=self.produit,
+            quantite=2,
+            prix_unitaire=Decimal('150.00')
+        )
+        panier = Panier.objects.prefetch_related('items').get(pk=self.panier.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(panier.total, Decimal('300.00'))
 
 
 class ItemPanierModelTest(TestCase):
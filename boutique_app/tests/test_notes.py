@@ -0,0 +1,173 @@
+"""
+Tests pour les notes des produits dénormalisées
+"""
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.urls import reverse
+from boutique_app.models import Categorie, Produit, AvisProduit
+from boutique_app.notes import recalculer_notes
+from boutique_app.tests.utils import creer_produits
+
+
+class NotesProduitTest(TestCase):
+    """Tests pour le recalcul des notes à chaque changement d'avis"""
+
+    def setUp(self):
+        cache.clear()
+        self.produit, self.autre = creer_produits(2)
+        self.utilisateurs = [User.objects.create_user(username=f'client{i}') for i in range(4)]
+
+    def avis(self, note, utilisateur=0, approuve=True, produit=None):
+        return AvisProduit.objects.create(
+            produit=produit or self.produit,
+            utilisateur=self.utilisateurs[utilisateur],
+            note=note,
+            approuve=approuve
+        )
+
+    def notes(self, produit=None):
+        return Produit.objects.get(pk=(produit or self.produit).pk)
+
+    def test_creation_et_arrondi(self):
+        """Moyenne arrondie au centième et répartition mises à jour à la création"""
+        self.avis(5, 0)
+        self.avis(4, 1)
+        self.avis(4, 2)
+        produit = self.notes()
+        self.assertEqual(produit.note_moyenne, Decimal('4.33'))
+        self.assertEqual(produit.nombre_avis, 3)
+        self.assertEqual((produit.nombre_avis_4, produit.nombre_avis_5, produit.nombre_avis_1), (2, 1, 0))
+
+    def test_avis_non_approuve_ignore(self):
+        """Seuls les avis approuvés comptent ; l'approbation déclenche le recalcul"""
+        avis = self.avis(2, approuve=False)
+        self.assertEqual(self.notes().nombre_avis, 0)
+
+        avis.approuve = True
+        avis.save()
+        self.assertEqual((self.notes().note_moyenne, self.notes().nombre_avis), (Decimal('2.00'), 1))
+
+        avis.approuve = False
+        avis.save()
+        self.assertEqual((self.notes().note_moyenne, self.notes().nombre_avis), (Decimal('0.00'), 0))
+
+    def test_suppression(self):
+        """La suppression d'un avis met à jour les notes"""
+        self.avis(5, 0)
+        self.avis(1, 1).delete()
+        produit = self.notes()
+        self.assertEqual((produit.note_moyenne, produit.nombre_avis, produit.nombre_avis_1), (Decimal('5.00'), 1, 0))
+
+    def test_changement_de_produit(self):
+        """Un avis déplacé vers un autre produit met à jour les deux produits"""
+        avis = self.avis(3)
+        avis.produit = self.autre
+        avis.save()
+        self.assertEqual(self.notes().nombre_avis, 0)
+        self.assertEqual(self.notes(self.autre).note_moyenne, Decimal('3.00'))
+
+    def test_repartition(self):
+        """Répartition de la meilleure à la moins bonne note, avec pourcentages"""
+        self.avis(5, 0)
+        self.avis(5, 1)
+        self.avis(5, 2)
+        self.avis(1, 3)
+        repartition = self.notes().repartition_notes
+        self.assertEqual([ligne['note'] for ligne in repartition], [5, 4, 3, 2, 1])
+        self.assertEqual(repartition[0], {'note': 5, 'nombre': 3, 'pourcentage': 75})
+        self.assertEqual(repartition[4]['pourcentage'], 25)
+
+    def test_recalcul_nombre_requetes_constant(self):
+        """Recalcul en lot : lecture des avis, des produits puis une mise à jour"""
+        produits = creer_produits(20, prefixe='Lot')
+        AvisProduit.objects.bulk_create([
+            AvisProduit(produit=produit, utilisateur=self.utilisateurs[0], note=4, approuve=True)
+            for produit in produits
+        ])
+        with self.assertNumQueries(3):
+            self.assertEqual(recalculer_notes([produit.id for produit in produits]), 20)
+        # Rien n'a changé : aucune écriture
+        with self.assertNumQueries(2):
+            self.assertEqual(recalculer_notes([produit.id for produit in produits]), 0)
+
+    def test_commande_reconstruction(self):
+        """La commande recalcule les notes modifiées hors signaux"""
+        self.avis(4)
+        Produit.objects.filter(pk=self.produit.pk).update(note_moyenne=0, nombre_avis=0, nombre_avis_4=0)
+        sortie = StringIO()
+        call_command('reconstruire_notes_produits', '--taille-lot', '1', stdout=sortie)
+        self.assertIn('1 produit(s) mis à jour', sortie.getvalue())
+        self.assertEqual(self.notes().note_moyenne, Decimal('4.00'))
+        with self.assertRaises(CommandError):
+            call_command('reconstruire_notes_produits', '--taille-lot', '0', stdout=StringIO())
+
+    def test_actions_admin(self):
+        """Les actions d'approbation en masse de l'administration recalculent les notes"""
+        avis = [self.avis(note, i, approuve=False) for i, note in enumerate((5, 3))]
+        User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        client = Client()
+        client.login(username='admin', password='admin123')
+        url = reverse('admin:boutique_app_avisproduit_changelist')
+
+        client.post(url, {'action': 'approuver', '_selected_action': [a.pk for a in avis]})
+        self.assertEqual((self.notes().note_moyenne, self.notes().nombre_avis), (Decimal('4.00'), 2))
+
+        client.post(url, {'action': 'desapprouver', '_selected_action': [avis[0].pk]})
+        self.assertEqual((self.notes().note_moyenne, self.notes().nombre_avis), (Decimal('3.00'), 1))
+
+
+class CatalogueNotesTest(TestCase):
+    """Tests pour le tri et le filtre du catalogue par note"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        categorie = Categorie.objects.create(nom="Épicerie")
+        self.produits = creer_produits(15, categorie=categorie)
+        # Notes décroissantes par groupes de 3 ; le nombre d'avis départage puis l'id
+        for i, produit in enumerate(self.produits):
+            Produit.objects.filter(pk=produit.pk).update(
+                note_moyenne=Decimal(5 - i // 3) - Decimal('0.25'),
+                nombre_avis=i % 3 + 1
+            )
+        self.attendus = list(
+            Produit.objects.order_by('-note_moyenne', '-nombre_avis', '-id').values_list('id', flat=True)
+        )
+
+    def ids(self, response):
+        return [produit.id for produit in response.context['produits']]
+
+    def test_tri_par_note_et_page_suivante(self):
+        """Le curseur de la page suivante encode la note décimale sans perte"""
+        response = self.client.get(reverse('catalogue'), {'tri': 'note'})
+        self.assertEqual(response.context['tri'], 'note')
+        self.assertEqual(self.ids(response), self.attendus[:12])
+
+        page = response.context['produits']
+        response = self.client.get(reverse('catalogue'), {'tri': 'note', 'curseur': page.curseur_suivant})
+        self.assertEqual(self.ids(response), self.attendus[12:])
+
+    def test_tri_inconnu(self):
+        """Un tri inconnu retombe sur les nouveautés"""
+        response = self.client.get(reverse('catalogue'), {'tri': 'prix'})
+        self.assertEqual(response.context['tri'], 'nouveautes')
+
+    def test_note_minimale(self):
+        """Le filtre ne garde que les produits notés au moins note_min"""
+        response = self.client.get(reverse('catalogue'), {'note_min': '4'})
+        self.assertEqual(set(self.ids(response)), {produit.id for produit in self.produits[:3]})
+        response = self.client.get(reverse('catalogue'), {'note_min': 'abc'})
+        self.assertEqual(response.context['note_min'], 0)
+
+    def test_affichage_sans_requete_supplementaire(self):
+        """La note est affichée sur les cartes du catalogue et la fiche produit"""
+        with self.assertNumQueries(4):  # ETag (2), produits, catégories
+            response = self.client.get(reverse('catalogue'), {'tri': 'note'})
+        self.assertContains(response, 'class="produit-note"', count=12)
+        response = self.client.get(reverse('detail_produit', args=[self.produits[0].id]))
+        self.assertContains(response, 'repartition-notes')
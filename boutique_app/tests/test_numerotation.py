@@ -0,0 +1,100 @@
+"""
+Tests pour l'attribution des numéros de commande
+"""
+import multiprocessing
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from django.db import transaction
+from django.utils import timezone
+from boutique_app.models import SequenceCommande
+from boutique_app import numerotation
+from boutique_app.numerotation import AllocateurSequence, AllocateurHorodate
+from boutique_app.tests import processus
+
+
+class AllocateurSequenceTest(TestCase):
+    """Tests pour la séquence quotidienne réservée par blocs"""
+
+    def setUp(self):
+        self.allocateur = AllocateurSequence(taille_bloc=10)
+
+    def allouer_valide(self):
+        """Alloue un numéro dans une transaction validée"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.allocateur.allouer()
+
+    def test_format(self):
+        """Le numéro contient la date du jour et le rang dans la séquence"""
+        numero = self.allouer_valide()
+        self.assertEqual(numero, f"CMD-{timezone.localdate():%Y%m%d}-000001")
+
+    def test_bloc_distribue_depuis_la_memoire(self):
+        """Un bloc réservé sert les numéros suivants sans requête"""
+        self.allouer_valide()
+        with self.assertNumQueries(0):
+            numeros = [self.allocateur.allouer() for _ in range(9)]
+        self.assertEqual([n[-2:] for n in numeros], [f'{i:02d}' for i in range(2, 11)])
+        # Bloc épuisé : nouvelle réservation
+        self.assertTrue(self.allouer_valide().endswith('000011'))
+        self.assertEqual(SequenceCommande.objects.get().dernier, 20)
+
+    def test_blocs_disjoints_entre_processus(self):
+        """Deux allocateurs (deux processus) reçoivent des blocs différents"""
+        autre = AllocateurSequence(taille_bloc=10)
+        premier = self.allouer_valide()
+        with self.captureOnCommitCallbacks(execute=True):
+            second = autre.allouer()
+        self.assertEqual(premier[-6:], '000001')
+        self.assertEqual(second[-6:], '000011')
+
+    def test_bloc_annule_oublie(self):
+        """Un bloc réservé dans une transaction annulée n'est jamais distribué"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.allocateur.allouer()
+                raise RuntimeError
+        self.assertFalse(SequenceCommande.objects.exists())
+        self.assertEqual(len(self.allocateur._blocs), 0)
+
+    def test_allocateur_configurable(self):
+        """L'allocateur est choisi par le réglage NUMEROTATION_COMMANDES"""
+        with override_settings(NUMEROTATION_COMMANDES={'ALLOCATEUR': 'boutique_app.numerotation.AllocateurHorodate'}):
+            self.assertIsInstance(numerotation.allocateur(), AllocateurHorodate)
+        self.assertIsInstance(numerotation.allocateur(), AllocateurSequence)
+
+
+class AllocateurHorodateTest(TestCase):
+    """Tests pour les identifiants ordonnés dans le temps"""
+
+    def test_uniques_et_ordonnes(self):
+        """Des milliers d'identifiants consécutifs sont uniques et croissants"""
+        allocateur = AllocateurHorodate()
+        with self.assertNumQueries(0):
+            numeros = [allocateur.allouer() for _ in range(10000)]
+        self.assertEqual(len(set(numeros)), len(numeros))
+        self.assertEqual(numeros, sorted(numeros))
+        self.assertLessEqual(len(numeros[0]), 50)
+
+
+class NumerotationMultiProcessusTest(TestCase):
+    """Plusieurs processus allouent en parallèle sur une même base"""
+
+    NOMBRE_PROCESSUS = 4
+    NUMEROS_PAR_PROCESSUS = 2000
+
+    def test_aucune_collision(self):
+        """Aucun numéro n'est attribué deux fois"""
+        contexte = multiprocessing.get_context('spawn')
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'numerotation.sqlite3')
+            with contexte.Pool(self.NOMBRE_PROCESSUS, initializer=processus.initialiser, initargs=(chemin,)) as pool:
+                pool.apply(processus.creer_table_sequences)
+                resultats = pool.starmap(
+                    processus.allouer_numeros,
+                    [(self.NUMEROS_PAR_PROCESSUS, 50)] * self.NOMBRE_PROCESSUS
+                )
+
+        numeros = [numero for liste in resultats for numero in liste]
+        self.assertEqual(len(numeros), self.NOMBRE_PROCESSUS * self.NUMEROS_PAR_PROCESSUS)
+        self.assertEqual(len(set(numeros)), len(numeros))
@@ -0,0 +1,217 @@
+"""
+Tests pour la pagination par curseur
+"""
+from unittest import mock
+from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from boutique_app.models import Categorie, Produit, Panier, Commande
+from boutique_app.pagination import (
+    PaginateurCurseur, PaginateurEstime, encoder_curseur, decoder_curseur, CurseurInvalide, PRECEDENT,
+    SEUIL_ESTIMATION
+)
+from boutique_app.tests.utils import NombreRequetesMixin, creer_produits
+
+
+class PaginateurCurseurTest(NombreRequetesMixin, TestCase):
+    """Tests pour le paginateur par curseur"""
+
+    def setUp(self):
+        cache.clear()
+        self.categorie = Categorie.objects.create(nom="Épicerie")
+        self.produits = creer_produits(25, categorie=self.categorie)
+        # Dates identiques par groupes de 5 : l'id départage les ex aequo
+        maintenant = timezone.now()
+        for i, produit in enumerate(self.produits):
+            Produit.objects.filter(pk=produit.pk).update(
+                date_creation=maintenant - timezone.timedelta(hours=i // 5)
+            )
+        self.attendus = list(Produit.objects.order_by('-date_creation', '-id').values_list('id', flat=True))
+
+    def paginateur(self, **kwargs):
+        return PaginateurCurseur(Produit.objects.all(), 10, ordre=('-date_creation', '-id'), **kwargs)
+
+    def ids(self, page):
+        return [produit.id for produit in page]
+
+    def test_curseur_aller_retour(self):
+        """Un curseur encodé se décode à l'identique"""
+        maintenant = timezone.now()
+        valeurs, sens = decoder_curseur(encoder_curseur([maintenant, 42], PRECEDENT))
+        self.assertEqual(valeurs, [maintenant.isoformat(), 42])
+        self.assertEqual(sens, PRECEDENT)
+
+    def test_curseur_invalide(self):
+        """Un curseur illisible lève CurseurInvalide et donne la première page dans le paginateur"""
+        with self.assertRaises(CurseurInvalide):
+            decoder_curseur('pas-un-curseur')
+        page = self.paginateur().page('pas-un-curseur')
+        self.assertEqual(self.ids(page), self.attendus[:10])
+        self.assertFalse(page.has_previous())
+
+    def test_curseur_valeurs_hors_bornes(self):
+        """Valeurs nulles ou identifiant hors des entiers 64 bits : première page"""
+        maintenant = timezone.now()
+        for valeurs in ([None, None], [maintenant, None], [maintenant, 10 ** 30], [maintenant, -10 ** 30]):
+            with self.subTest(valeurs=valeurs):
+                for sens in ('s', PRECEDENT):
+                    page = self.paginateur().page(encoder_curseur(valeurs, sens))
+                    self.assertEqual(self.ids(page), self.attendus[:10])
+                    self.assertFalse(page.has_previous())
+
+    def test_parcours_complet(self):
+        """Les pages successives couvrent tous les produits sans doublon, ex aequo compris"""
+        paginateur = self.paginateur()
+        page = paginateur.page()
+        vus = self.ids(page)
+        while page.has_next():
+            page = paginateur.page(page.curseur_suivant)
+            vus.extend(self.ids(page))
+        self.assertEqual(vus, self.attendus)
+        self.assertEqual(len(page), 5)
+
+    def test_page_precedente(self):
+        """Le curseur précédent revient exactement à la page d'avant"""
+        paginateur = self.paginateur()
+        page1 = paginateur.page()
+        page2 = paginateur.page(page1.curseur_suivant)
+        page3 = paginateur.page(page2.curseur_suivant)
+
+        retour2 = paginateur.page(page3.curseur_precedent)
+        self.assertEqual(self.ids(retour2), self.ids(page2))
+        self.assertTrue(retour2.has_next())
+
+        retour1 = paginateur.page(retour2.curseur_precedent)
+        self.assertEqual(self.ids(retour1), self.attendus[:10])
+        self.assertFalse(retour1.has_previous())
+
+    def test_cout_constant(self):
+        """Une page profonde coûte une seule requête, sans COUNT"""
+        paginateur = self.paginateur()
+        page = paginateur.page(paginateur.page(paginateur.page().curseur_suivant).curseur_suivant)
+        curseur = encoder_curseur([page.object_list[0].date_creation, page.object_list[0].id])
+        with self.assertNumQueries(1):
+            page = paginateur.page(curseur)
+        self.assertIsNone(page.nombre_total)
+
+    def test_comptage(self):
+        """Le total est exact ou approximatif (mis en cache) sur demande"""
+        self.assertEqual(self.paginateur(comptage='exact').page().nombre_total, 25)
+
+        paginateur = self.paginateur(comptage='approximatif')
+        self.assertEqual(paginateur.page().nombre_total, 25)
+        Produit.objects.filter(pk=self.produits[0].pk).delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(paginateur.page().nombre_total, 25)
+
+
+class PaginateurEstimeTest(TestCase):
+    """Tests pour le paginateur à nombre de lignes estimé de l'administration"""
+
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = User.objects.create_user(username='client')
+        Panier.objects.bulk_create([Panier(utilisateur=self.utilisateur) for _ in range(5)])
+
+    def paginateur(self, queryset=None):
+        return PaginateurEstime(queryset if queryset is not None else Panier.objects.order_by('id'), 10)
+
+    def test_comptage_en_cache(self):
+        """Le COUNT n'est exécuté qu'une fois pour une même requête"""
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginateur().count, 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginateur(Panier.objects.order_by('-id')).count, 5)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginateur(Panier.objects.filter(statut='valide')).count, 0)
+
+    def test_page_complete_malgre_un_total_en_retard(self):
+        """Les lignes ajoutées depuis le comptage apparaissent dans la page"""
+        self.assertEqual(self.paginateur().count, 5)
+        Panier.objects.bulk_create([Panier(utilisateur=self.utilisateur) for _ in range(3)])
+        paginateur = self.paginateur()
+        self.assertEqual(paginateur.count, 5)
+        self.assertEqual(len(paginateur.page(1)), 8)
+
+    def test_statistiques_postgresql(self):
+        """Sous PostgreSQL, une grande table non filtrée n'est pas comptée"""
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch('boutique_app.pagination.estimation_postgresql', return_value=SEUIL_ESTIMATION * 5):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.paginateur().count, SEUIL_ESTIMATION * 5)
+            # Filtrée : comptage (mis en cache)
+            self.assertEqual(self.paginateur(Panier.objects.filter(statut='en_cours')).count, 5)
+
+        # Petite table ou jamais analysée : comptage
+        for estimation in (SEUIL_ESTIMATION - 1, None):
+            cache.clear()
+            with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                    mock.patch('boutique_app.pagination.estimation_postgresql', return_value=estimation):
+                self.assertEqual(self.paginateur().count, 5)
+
+
+class PaginationVuesTest(TestCase):
+    """Tests de la pagination du catalogue et des commandes"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.categorie = Categorie.objects.create(nom="Boissons")
+        self.autre = Categorie.objects.create(nom="Épicerie")
+        creer_produits(15, categorie=self.categorie, prefixe="Jus")
+        creer_produits(3, categorie=self.autre, prefixe="Riz")
+
+    def test_catalogue_curseur_conserve_les_filtres(self):
+        """Le lien vers la page suivante garde le filtre de catégorie"""
+        response = self.client.get(reverse('catalogue'), {'categorie': self.categorie.id})
+        self.assertEqual(len(response.context['produits']), 12)
+        lien = response.context['lien_suivant']
+        self.assertIn(f'categorie={self.categorie.id}', lien)
+        self.assertIn('curseur=', lien)
+
+        response = self.client.get(reverse('catalogue') + lien)
+        self.assertEqual(len(response.context['produits']), 3)
+        self.assertIsNone(response.context['lien_suivant'])
+        self.assertIsNotNone(response.context['lien_precedent'])
+
+    def test_catalogue_recherche_pagination_classique(self):
+        """Une recherche, classée par pertinence, garde la pagination par numéro"""
+        response = self.client.get(reverse('catalogue'), {'recherche': 'jus'})
+        self.assertEqual(response.context['produits'].paginator.count, 15)
+        self.assertIn('page=2', response.context['lien_suivant'])
+        self.assertIn('recherche=jus', response.context['lien_suivant'])
+
+    def test_curseur_forge(self):
+        """Un curseur forgé (valeurs nulles, identifiant trop grand) donne la première page, pas une erreur"""
+        utilisateur = User.objects.create_user(username='client', password='test123')
+        self.client.force_login(utilisateur)
+        for valeurs in ([None, None], [timezone.now().isoformat(), 10 ** 30]):
+            curseur = encoder_curseur(valeurs)
+            with self.subTest(valeurs=valeurs):
+                response = self.client.get(reverse('catalogue'), {'curseur': curseur})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['produits']), 12)
+                self.assertEqual(self.client.get(reverse('mes_commandes'), {'curseur': curseur}).status_code, 200)
+
+    def test_mes_commandes_pagine(self):
+        """L'historique des commandes est paginé"""
+        utilisateur = User.objects.create_user(username='client', password='test123')
+        for i in range(12):
+            panier = Panier.objects.create(utilisateur=utilisateur, statut='valide')
+            Commande.objects.create(panier=panier, numero_commande=f'CMD-PAGE-{i}', montant_total=Decimal('0'))
+        self.client.force_login(utilisateur)
+
+        response = self.client.get(reverse('mes_commandes'))
+        self.assertEqual(len(response.context['commandes']), 10)
+        self.assertEqual(response.context['commandes'].nombre_total, 12)
+        self.assertContains(response, '12 commande(s)')
+
+        response = self.client.get(reverse('mes_commandes') + response.context['lien_suivant'])
+        self.assertEqual(
+            [c.numero_commande for c in response.context['commandes']],
+            ['CMD-PAGE-1', 'CMD-PAGE-0']
+        )
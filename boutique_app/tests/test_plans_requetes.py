@@ -0,0 +1,49 @@
+"""
+Tests pour les index et les plans d'exécution des requêtes fréquentes
+"""
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from boutique_app.models import Produit
+from boutique_app.plans_requetes import verifier_plans, parcours_complets, page_catalogue
+
+
+class PlansRequetesTest(TestCase):
+    """Les requêtes fréquentes des vues ne parcourent pas de table entière"""
+
+    def test_aucun_parcours_complet(self):
+        """Chaque requête fréquente utilise un index"""
+        for nom, plan, tables in verifier_plans():
+            with self.subTest(requete=nom):
+                self.assertEqual(tables, [], plan)
+
+    def test_requetes_des_vues(self):
+        """La requête vérifiée est celle que la vue exécute"""
+        with CaptureQueriesContext(connection) as requetes:
+            self.client.get(reverse('catalogue'), {'tri': 'note'})
+        self.assertIn(str(page_catalogue({'tri': 'note'}).query), [requete['sql'] for requete in requetes])
+
+    def test_detection_parcours_complet(self):
+        """Un filtre sans index est bien détecté"""
+        [(nom, plan, tables)] = verifier_plans([('nom', Produit.objects.filter(nom='Riz'))])
+        self.assertEqual(tables, ['boutique_app_produit'])
+
+    def test_lecture_des_plans(self):
+        """Les plans SQLite et PostgreSQL sont interprétés"""
+        self.assertEqual(parcours_complets('SCAN boutique_app_vente', 'sqlite'), ['boutique_app_vente'])
+        self.assertEqual(parcours_complets('SCAN boutique_app_produit USING INDEX produit_actif_date_idx', 'sqlite'), [])
+        self.assertEqual(parcours_complets('SCAN auth_user', 'sqlite'), [])
+        self.assertEqual(
+            parcours_complets('Limit  ->  Seq Scan on boutique_app_commande  (cost=0.00..1.01 rows=1)', 'postgresql'),
+            ['boutique_app_commande']
+        )
+        self.assertEqual(parcours_complets('Index Scan using vente_date_idx on boutique_app_vente', 'postgresql'), [])
+
+    def test_commande(self):
+        """La commande de gestion réussit quand tous les index sont présents"""
+        sortie = StringIO()
+        call_command('verifier_plans_requetes', stdout=sortie)
+        self.assertIn('Toutes les requêtes fréquentes utilisent un index', sortie.getvalue())
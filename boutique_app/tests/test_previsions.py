@@ -0,0 +1,148 @@
+"""
+Tests pour les prévisions des ventes
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase
+from boutique_app.models import Categorie, Produit, VenteJournaliere
+from boutique_app import previsions
+from boutique_app.statistiques import prevision_mois
+
+# Profil hebdomadaire : forte affluence le samedi, boutique fermée le dimanche
+PROFIL = np.array([10, 10, 12, 10, 14, 40, 0], dtype=float)
+
+
+class PrevisionsTest(TestCase):
+    """Tests pour le modèle de Holt-Winters vectorisé"""
+
+    def setUp(self):
+        cache.clear()
+        self.aujourdhui = date(2025, 3, 3)  # un lundi
+        self.boissons = Categorie.objects.create(nom="Boissons")
+        self.epicerie = Categorie.objects.create(nom="Épicerie")
+        self.jus = self.creer_produit("Jus", self.boissons)
+        self.eau = self.creer_produit("Eau", self.boissons)
+        self.riz = self.creer_produit("Riz", self.epicerie)
+
+    def creer_produit(self, nom, categorie):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+
+    def historique(self, produit, valeurs):
+        """Cumuls journaliers se terminant hier (valeurs du plus ancien au plus récent)"""
+        debut = self.aujourdhui - timedelta(days=len(valeurs))
+        VenteJournaliere.objects.bulk_create([
+            VenteJournaliere(
+                date=debut + timedelta(days=i),
+                produit=produit,
+                categorie_id=produit.categorie_id,
+                quantite=int(valeur),
+                montant_total=Decimal(str(valeur)),
+                nombre_ventes=1
+            )
+            for i, valeur in enumerate(valeurs) if valeur
+        ])
+
+    def saisonnier(self, semaines, pente=0.0):
+        jours = np.arange(semaines * 7)
+        # Le dernier jour (hier) est un dimanche : la série commence un lundi
+        return np.tile(PROFIL, semaines) + pente * jours
+
+    def test_series_journalieres(self):
+        """Une ligne par série et une colonne par jour, en une requête"""
+        self.historique(self.jus, [5, 0, 3])
+        self.historique(self.riz, [0, 7, 0])
+        debut = self.aujourdhui - timedelta(days=3)
+        fin = self.aujourdhui - timedelta(days=1)
+        with self.assertNumQueries(1):
+            identifiants, y = previsions.series_journalieres(debut, fin, 'produit')
+        self.assertEqual(identifiants, [self.jus.id, self.riz.id])
+        np.testing.assert_array_equal(y, [[5, 0, 3], [0, 7, 0]])
+
+        identifiants, y = previsions.series_journalieres(debut, fin, 'categorie')
+        self.assertEqual(identifiants, [self.boissons.id, self.epicerie.id])
+        identifiants, y = previsions.series_journalieres(debut, fin, 'total')
+        np.testing.assert_array_equal(y, [[5, 7, 3]])
+
+        with self.assertRaises(previsions.NiveauInconnu):
+            previsions.series_journalieres(debut, fin, 'fournisseur')
+
+    def test_saisonnalite_hebdomadaire(self):
+        """Une série purement hebdomadaire est prolongée avec son profil"""
+        y = self.saisonnier(12)[None, :]
+        prevues, parametres = previsions.prevoir_series(y, horizon=14)
+        np.testing.assert_allclose(prevues[0], np.tile(PROFIL, 2), atol=1.0)
+        self.assertEqual(parametres.shape, (1, 3))
+
+    def test_ajustement_vectorise(self):
+        """Ajuster toutes les séries ensemble donne les mêmes paramètres qu'une par une"""
+        generateur = np.random.default_rng(7)
+        y = self.saisonnier(10) + generateur.normal(0, 3, size=(6, 70))
+        ensemble = previsions.ajuster(y)
+        une_par_une = np.vstack([previsions.ajuster(y[i:i + 1]) for i in range(len(y))])
+        np.testing.assert_array_equal(ensemble, une_par_une)
+
+    def test_historique_court(self):
+        """Moins de deux semaines d'historique : prolongement par la moyenne"""
+        prevues, _ = previsions.prevoir_series(np.array([[4.0, 6.0, 5.0]]), horizon=3)
+        np.testing.assert_array_equal(prevues, [[5.0, 5.0, 5.0]])
+
+    def test_previsions_par_produit_et_categorie(self):
+        """Les prévisions sont disponibles par produit, par catégorie et au total"""
+        self.historique(self.jus, self.saisonnier(8))
+        self.historique(self.eau, self.saisonnier(8) / 2)
+        self.historique(self.riz, self.saisonnier(8) * 2)
+
+        produits = previsions.prevision_produits(horizon=7, aujourdhui=self.aujourdhui)
+        self.assertEqual(set(produits), {self.jus.id, self.eau.id, self.riz.id})
+        self.assertAlmostEqual(produits[self.jus.id], PROFIL.sum(), delta=5)
+        self.assertAlmostEqual(produits[self.riz.id], 2 * PROFIL.sum(), delta=10)
+
+        categories = previsions.prevision_categories(horizon=7, aujourdhui=self.aujourdhui)
+        self.assertAlmostEqual(categories[self.boissons.id], 1.5 * PROFIL.sum(), delta=8)
+        self.assertAlmostEqual(
+            previsions.prevision_totale(horizon=7, aujourdhui=self.aujourdhui), 3.5 * PROFIL.sum(), delta=15
+        )
+
+    def test_parametres_en_cache(self):
+        """Les paramètres ajustés sont réutilisés ; seules les nouvelles séries sont ajustées"""
+        self.historique(self.jus, self.saisonnier(8))
+        with mock.patch.object(previsions, 'ajuster', wraps=previsions.ajuster) as ajuster:
+            premiere = previsions.prevision_produits(aujourdhui=self.aujourdhui)
+            self.assertEqual(ajuster.call_count, 1)
+            self.assertEqual(previsions.prevision_produits(aujourdhui=self.aujourdhui), premiere)
+            self.assertEqual(ajuster.call_count, 1)
+
+            self.historique(self.riz, self.saisonnier(4))
+            previsions.prevision_produits(aujourdhui=self.aujourdhui)
+            self.assertEqual(ajuster.call_count, 2)
+            self.assertEqual(len(ajuster.call_args.args[0]), 1)
+
+    def test_aucune_vente(self):
+        """Sans historique la prévision est nulle"""
+        self.assertEqual(previsions.prevision_totale(aujourdhui=self.aujourdhui), 0)
+        self.assertEqual(previsions.prevision_produits(aujourdhui=self.aujourdhui), {})
+        self.assertIsNone(previsions.backtest(aujourdhui=self.aujourdhui))
+
+    def test_backtest_tendance(self):
+        """Sur une série en croissance, le modèle bat l'ancienne moyenne des 3 mois"""
+        self.historique(self.jus, self.saisonnier(30, pente=0.2))
+        resultat = previsions.backtest('produit', horizon=28, aujourdhui=self.aujourdhui)
+        self.assertEqual(resultat['nombre_series'], 1)
+        self.assertLess(resultat['wape_modele'], resultat['wape_moyenne'])
+        self.assertLess(resultat['wape_journalier_modele'], resultat['wape_journalier_moyenne'])
+
+    def test_prevision_dashboard(self):
+        """La prévision du dashboard porte sur les 30 prochains jours"""
+        self.historique(self.jus, self.saisonnier(8))
+        attendu = previsions.prevision_totale(horizon=30, aujourdhui=self.aujourdhui)
+        self.assertEqual(prevision_mois(self.aujourdhui), attendu)
+        self.assertGreater(attendu, 0)
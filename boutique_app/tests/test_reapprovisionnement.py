@@ -0,0 +1,167 @@
+"""
+Tests pour la planification du réapprovisionnement
+"""
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from boutique_app.models import Categorie, Fournisseur, Produit, VenteJournaliere, PlanReapprovisionnement
+from boutique_app.reapprovisionnement import planifier, vitesses_de_vente
+from boutique_app.statistiques import reapprovisionnement
+
+
+class ReapprovisionnementTest(TestCase):
+    """Tests pour les points de commande et les quantités suggérées"""
+
+    def setUp(self):
+        cache.clear()
+        self.aujourdhui = date(2025, 3, 1)
+        self.categorie = Categorie.objects.create(nom="Boissons")
+        self.grossiste = Fournisseur.objects.create(nom="Grossiste", delai_livraison_jours=4)
+        self.brasserie = Fournisseur.objects.create(nom="Brasserie", delai_livraison_jours=10)
+        self.eau = self.creer_produit("Eau", self.grossiste, stock=20)
+        self.jus = self.creer_produit("Jus", self.grossiste, stock=500)
+        self.biere = self.creer_produit("Bière", self.brasserie, stock=5)
+        self.sirop = self.creer_produit("Sirop", None, stock=3, minimum=5)
+
+    def creer_produit(self, nom, fournisseur, stock, minimum=0):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=self.categorie,
+            fournisseur=fournisseur,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=stock,
+            quantite_minimum=minimum
+        )
+
+    def historique(self, produit, quantites):
+        """Cumuls journaliers se terminant hier"""
+        debut = self.aujourdhui - timedelta(days=len(quantites))
+        VenteJournaliere.objects.bulk_create([
+            VenteJournaliere(
+                date=debut + timedelta(days=i),
+                produit=produit,
+                categorie=self.categorie,
+                quantite=quantite,
+                montant_total=Decimal(quantite * 150),
+                nombre_ventes=1
+            )
+            for i, quantite in enumerate(quantites) if quantite
+        ])
+
+    def test_vitesses_de_vente(self):
+        """Moyenne et écart-type quotidiens en une requête, jours sans vente compris"""
+        self.historique(self.eau, [4, 0, 2, 2])
+        with self.assertNumQueries(1):
+            vitesses = vitesses_de_vente(self.aujourdhui, 4)
+        moyenne, ecart_type = vitesses[self.eau.id]
+        self.assertEqual(moyenne, 2)
+        self.assertAlmostEqual(ecart_type, math.sqrt(8 / 3))
+        self.assertNotIn(self.jus.id, vitesses)
+
+    def test_point_de_commande(self):
+        """Point de commande = ventes pendant le délai du fournisseur + stock de sécurité"""
+        self.historique(self.eau, [5] * 56)
+        self.historique(self.biere, [3, 7] * 28)
+        planifier(self.aujourdhui)
+
+        eau = PlanReapprovisionnement.objects.get(produit=self.eau)
+        self.assertEqual(eau.ventes_par_jour, 5)
+        self.assertEqual(eau.stock_securite, 0)  # ventes régulières
+        self.assertEqual(eau.delai_livraison_jours, 4)
+        self.assertEqual(eau.point_commande, 20)
+        self.assertEqual(eau.stock_cible, 20 + 5 * 14)
+
+        biere = PlanReapprovisionnement.objects.get(produit=self.biere)
+        self.assertEqual(biere.delai_livraison_jours, 10)
+        self.assertGreater(biere.stock_securite, 0)
+        self.assertEqual(biere.point_commande, 50 + biere.stock_securite)
+
+    def test_minimum_statique_et_sans_fournisseur(self):
+        """Sans vente, le point de commande retombe sur quantite_minimum ; délai par défaut sans fournisseur"""
+        planifier(self.aujourdhui)
+        sirop = PlanReapprovisionnement.objects.get(produit=self.sirop)
+        self.assertIsNone(sirop.fournisseur)
+        self.assertEqual(sirop.delai_livraison_jours, 7)
+        self.assertEqual((sirop.point_commande, sirop.stock_cible), (5, 5))
+
+    def test_stock_courant(self):
+        """Les quantités à commander suivent le stock courant sans recalcul des plans"""
+        self.historique(self.eau, [5] * 56)
+        planifier(self.aujourdhui)
+        self.assertTrue(PlanReapprovisionnement.objects.a_commander().filter(produit=self.eau).exists())
+        plan = PlanReapprovisionnement.objects.avec_stock().get(produit=self.eau)
+        self.assertEqual(plan.quantite_a_commander, 90 - 20)
+
+        Produit.objects.filter(pk=self.eau.pk).update(quantite_stock=21)
+        self.assertFalse(PlanReapprovisionnement.objects.a_commander().filter(produit=self.eau).exists())
+
+    def test_recalcul_nombre_requetes_constant(self):
+        """Le recalcul de tout le catalogue se fait en un nombre constant de requêtes"""
+        def requetes():
+            with CaptureQueriesContext(connection) as contexte:
+                planifier(self.aujourdhui)
+            return len(contexte)
+
+        avant = requetes()
+        for i in range(30):
+            produit = self.creer_produit(f"Produit {i}", self.grossiste, stock=i)
+            self.historique(produit, [i % 4] * 10)
+        self.assertEqual(requetes(), avant)
+        self.assertEqual(PlanReapprovisionnement.objects.count(), 34)
+
+    def test_produits_inactifs_ignores(self):
+        """Les produits inactifs n'ont pas de plan"""
+        Produit.objects.filter(pk=self.jus.pk).update(active=False)
+        self.assertEqual(planifier(self.aujourdhui), 3)
+        self.assertFalse(PlanReapprovisionnement.objects.filter(produit=self.jus).exists())
+
+    def test_commandes_par_fournisseur(self):
+        """Le dashboard regroupe les quantités à commander par fournisseur"""
+        self.historique(self.eau, [5] * 56)
+        self.historique(self.biere, [5] * 56)
+        planifier(self.aujourdhui)
+        with self.assertNumQueries(1):
+            resultat = reapprovisionnement()
+        lignes = {ligne['fournisseur']: ligne for ligne in resultat['reapprovisionnement']}
+        self.assertEqual(set(lignes), {'Brasserie', 'Grossiste', 'Sans fournisseur'})
+        self.assertEqual(lignes['Grossiste']['nombre_produits'], 1)  # le jus a assez de stock
+        self.assertEqual(lignes['Grossiste']['quantite'], 70)
+        self.assertEqual(lignes['Grossiste']['cout'], Decimal('7000.00'))
+        self.assertEqual(lignes['Sans fournisseur']['quantite'], 2)
+        self.assertEqual(resultat['produits_a_commander'], 3)
+
+    def test_dashboard_et_admin(self):
+        """Le dashboard et l'administration lisent les plans enregistrés"""
+        self.historique(self.eau, [5] * 56)
+        planifier(self.aujourdhui)
+        User.objects.create_superuser(username='admin', password='admin123', email='admin@example.com')
+        client = Client()
+        client.login(username='admin', password='admin123')
+
+        response = client.get(reverse('dashboard'))
+        self.assertContains(response, 'À commander par fournisseur')
+        self.assertContains(response, 'Grossiste')
+
+        response = client.get(reverse('admin:boutique_app_planreapprovisionnement_changelist'), {'a_commander': 'oui'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Eau')
+        self.assertNotContains(response, '>Jus<')
+
+    def test_commande(self):
+        """La commande de gestion recalcule les plans"""
+        self.historique(self.eau, [5] * 56)
+        sortie = StringIO()
+        call_command('planifier_reapprovisionnement', stdout=sortie)
+        self.assertIn('4 plan(s) de réapprovisionnement calculé(s)', sortie.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('planifier_reapprovisionnement', '--niveau-service', '1.5', stdout=StringIO())
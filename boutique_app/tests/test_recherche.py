@@ -0,0 +1,87 @@
+"""
+Tests pour la recherche plein texte des produits
+"""
+from django.test import TestCase, Client
+from django.core.management import call_command
+from django.urls import reverse
+from decimal import Decimal
+from io import StringIO
+from boutique_app.models import Categorie, Produit
+from boutique_app.recherche import rechercher, moteur
+
+
+class RechercheProduitsTest(TestCase):
+    """Tests pour l'index de recherche et le classement"""
+
+    def setUp(self):
+        self.categorie = Categorie.objects.create(nom="Produits laitiers")
+        self.creme = self.creer_produit("Crème fraîche", "Crème épaisse pour la cuisine")
+        self.yaourt = self.creer_produit("Yaourt nature", "Au lait entier, sans crème ajoutée")
+        self.eau = self.creer_produit("Eau minérale", "Bouteille de 1,5 L")
+
+    def creer_produit(self, nom, description):
+        return Produit.objects.create(
+            nom=nom,
+            description=description,
+            categorie=self.categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=10
+        )
+
+    def resultats(self, texte):
+        return list(rechercher(Produit.objects.all(), texte))
+
+    def test_recherche_sans_accents(self):
+        """Les accents sont ignorés dans la requête et dans les produits"""
+        self.assertEqual(self.resultats("minerale"), [self.eau])
+        self.assertEqual(self.resultats("MINÉRALE"), [self.eau])
+
+    def test_recherche_par_prefixe(self):
+        """Les mots incomplets trouvent les produits"""
+        self.assertEqual(self.resultats("yao"), [self.yaourt])
+
+    def test_classement_par_pertinence(self):
+        """Un produit dont le nom correspond passe avant une correspondance dans la description"""
+        self.assertEqual(self.resultats("creme"), [self.creme, self.yaourt])
+
+    def test_tous_les_mots_requis(self):
+        """Tous les mots de la requête doivent correspondre"""
+        self.assertEqual(self.resultats("creme cuisine"), [self.creme])
+
+    def test_index_synchronise(self):
+        """L'index suit les modifications et suppressions de produits"""
+        self.eau.nom = "Eau gazeuse"
+        self.eau.save()
+        self.assertEqual(self.resultats("minerale"), [])
+        self.assertEqual(self.resultats("gazeuse"), [self.eau])
+
+        self.eau.delete()
+        self.assertEqual(self.resultats("gazeuse"), [])
+
+    def test_renommage_categorie(self):
+        """Le nom de catégorie indexé suit les renommages"""
+        self.categorie.nom = "Crèmerie"
+        self.categorie.save()
+        self.assertEqual(len(self.resultats("cremerie")), 3)
+
+    def test_caracteres_speciaux(self):
+        """Les caractères spéciaux de la syntaxe de recherche sont neutralisés"""
+        self.assertEqual(self.resultats('"crème" * ('), [self.creme, self.yaourt])
+        self.assertEqual(self.resultats("'; --"), self.resultats(""))
+
+    def test_commande_reconstruction(self):
+        """La commande reconstruit l'index"""
+        moteur().vider()
+        self.assertEqual(self.resultats("minerale"), [])
+
+        sortie = StringIO()
+        call_command('reconstruire_index_recherche', stdout=sortie)
+        self.assertIn('3 produit(s)', sortie.getvalue())
+        self.assertEqual(self.resultats("minerale"), [self.eau])
+
+    def test_catalogue_recherche(self):
+        """Le catalogue utilise l'index de recherche"""
+        response = Client().get(reverse('catalogue'), {'recherche': 'minerale'})
+        self.assertContains(response, "Eau minérale")
+        self.assertNotContains(response, "Yaourt nature")
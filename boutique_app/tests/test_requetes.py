@@ -0,0 +1,90 @@
+"""
+Tests du nombre de requêtes SQL des vues client
+
+Chaque vue doit charger ses données en un nombre fixe de requêtes, que le
+panier ou la commande contienne 1, 10 ou 100 articles.
+"""
+from django.test import TestCase, Client
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.urls import reverse
+from boutique_app.models import Categorie, Commande, AvisProduit
+from boutique_app.tests.utils import NombreRequetesMixin, creer_panier, creer_produits
+
+
+class RequetesVuesClientTest(NombreRequetesMixin, TestCase):
+    """Nombre maximal de requêtes par vue client"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.utilisateurs = 0
+
+    def connecter_nouvel_utilisateur(self):
+        self.utilisateurs += 1
+        utilisateur = User.objects.create_user(username=f'client{self.utilisateurs}', password='test123')
+        self.client.force_login(utilisateur)
+        return utilisateur
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_catalogue(self):
+        """Le catalogue ne charge pas la catégorie de chaque produit séparément
+
+        Deux requêtes pour l'ETag (produits filtrés ; catégories, avis et
+        produits similaires).
+        """
+        def preparer(taille):
+            categorie = Categorie.objects.create(nom=f'Catalogue {taille}')
+            creer_produits(taille, categorie=categorie, prefixe=f'Catalogue {taille}')
+            return (f"{reverse('catalogue')}?categorie={categorie.id}",)
+
+        self.assertRequetesConstantes(4, preparer, self.get)
+
+    def test_detail_produit(self):
+        """Produits similaires et avis sont chargés avec leurs relations
+
+        Sans historique d'achats, les produits similaires viennent de la
+        catégorie : une requête de plus que lorsque la table est remplie. Deux
+        requêtes pour l'ETag.
+        """
+        def preparer(taille):
+            categorie = Categorie.objects.create(nom=f'Détail {taille}')
+            produits = creer_produits(taille + 1, categorie=categorie, prefixe=f'Détail {taille}')
+            for i in range(taille):
+                utilisateur = User.objects.create_user(username=f'avis{taille}-{i}')
+                AvisProduit.objects.create(produit=produits[0], utilisateur=utilisateur, note=4, approuve=True)
+            return (reverse('detail_produit', args=[produits[0].id]),)
+
+        self.assertRequetesConstantes(6, preparer, self.get)
+
+    def test_panier(self):
+        """Le panier charge articles, produits et catégories en une requête"""
+        def preparer(taille):
+            creer_panier(self.connecter_nouvel_utilisateur(), taille)
+            return (reverse('panier'),)
+
+        self.assertRequetesConstantes(4, preparer, self.get)
+
+    def test_mes_commandes(self):
+        """Le nombre d'articles de chaque commande est calculé dans la requête principale"""
+        def preparer(taille):
+            utilisateur = self.connecter_nouvel_utilisateur()
+            for i in range(taille):
+                panier = creer_panier(utilisateur, 2, statut='valide')
+                Commande.objects.create(panier=panier, numero_commande=f'CMD-TEST-{taille}-{i}')
+            return (reverse('mes_commandes'),)
+
+        self.assertRequetesConstantes(4, preparer, self.get)
+
+    def test_detail_commande(self):
+        """Les articles d'une commande sont chargés avec leur produit et sa catégorie"""
+        def preparer(taille):
+            panier = creer_panier(self.connecter_nouvel_utilisateur(), taille, statut='valide')
+            commande = Commande.objects.create(panier=panier, numero_commande=f'CMD-DETAIL-{taille}')
+            return (reverse('detail_commande', args=[commande.id]),)
+
+        self.assertRequetesConstantes(4, preparer, self.get)
@@ -2,6 +2,7 @@
 Tests de sécurité
 """
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.urls import reverse
 from decimal import Decimal
@@ -12,6 +13,8 @@ class SecurityTests(TestCase):
     """Tests de sécurité généraux"""
     
     def setUp(self):
+        # Le dashboard est mis en cache entre les tests
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -0,0 +1,130 @@
+"""
+Tests pour les produits similaires (achats communs)
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from boutique_app.models import Categorie, Produit, Panier, ItemPanier, Commande, Vente, ProduitSimilaire
+from boutique_app.similarites import calculer, produits_similaires
+
+
+class ProduitsSimilairesTest(TestCase):
+    """Tests pour le calcul des voisins et leur lecture sur la page produit"""
+
+    def setUp(self):
+        cache.clear()
+        self.acheteur = User.objects.create_user(username='acheteur', password='test123')
+        self.boissons = Categorie.objects.create(nom="Boissons")
+        epicerie = Categorie.objects.create(nom="Épicerie")
+        self.eau = self.creer_produit("Eau", self.boissons)
+        self.jus = self.creer_produit("Jus", self.boissons)
+        self.biere = self.creer_produit("Bière", self.boissons)
+        self.sirop = self.creer_produit("Sirop", self.boissons)
+        self.riz = self.creer_produit("Riz", epicerie)
+
+        # Eau : 3 commandes avec du riz, 2 avec de la bière, 1 avec du jus
+        for _ in range(3):
+            self.commander(self.eau, self.riz)
+        for _ in range(2):
+            self.commander(self.eau, self.biere)
+        self.commander(self.eau, self.jus)
+
+    def creer_produit(self, nom, categorie):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100
+        )
+
+    def commander(self, *produits, statut='livree'):
+        panier = Panier.objects.create(utilisateur=self.acheteur, statut='valide')
+        for produit in produits:
+            ItemPanier.objects.create(panier=panier, produit=produit, quantite=1, prix_unitaire=produit.prix_vente)
+        return Commande.objects.create(
+            panier=panier,
+            numero_commande=f"TEST-{Commande.objects.count() + 1}",
+            montant_total=Decimal('150.00') * len(produits),
+            statut=statut
+        )
+
+    def voisins(self, produit):
+        return [(s.similaire, round(s.score, 3)) for s in ProduitSimilaire.objects.filter(produit=produit)]
+
+    def test_calcul(self):
+        """Voisins triés par similarité ; paires trop rares ignorées"""
+        self.assertEqual(calculer(), (4, 3))
+        # 3 / √(6 × 3) et 2 / √(6 × 2) ; le jus (1 commande commune) est ignoré
+        self.assertEqual(self.voisins(self.eau), [(self.riz, 0.707), (self.biere, 0.577)])
+        self.assertEqual(self.voisins(self.riz), [(self.eau, 0.707)])
+        self.assertEqual(self.voisins(self.jus), [])
+
+        calculer(VOISINS=1, ACHATS_COMMUNS_MIN=1)
+        self.assertEqual([s.similaire for s in ProduitSimilaire.objects.filter(produit=self.eau)], [self.riz])
+        self.assertEqual(self.voisins(self.jus), [(self.eau, 0.408)])
+
+    def test_sans_historique(self):
+        """Sans commande dans la fenêtre, la table est vidée"""
+        calculer()
+        Vente.objects.update(date_vente=timezone.now() - timedelta(days=400))
+        self.assertEqual(calculer(), (0, 0))
+        self.assertFalse(ProduitSimilaire.objects.exists())
+
+    def test_commandes_ignorees(self):
+        """Commandes annulées, hors fenêtre ou produits inactifs ne comptent pas"""
+        for _ in range(3):
+            self.commander(self.jus, self.sirop, statut='annulee')
+        ancienne = self.commander(self.jus, self.biere)
+        self.commander(self.jus, self.biere)
+        Vente.objects.filter(commande=ancienne).update(date_vente=timezone.now() - timedelta(days=400))
+        Produit.objects.filter(pk=self.riz.pk).update(active=False)
+
+        calculer()
+        self.assertEqual([s.similaire for s in ProduitSimilaire.objects.filter(produit=self.eau)], [self.biere])
+        self.assertEqual(self.voisins(self.jus), [])
+
+    def test_nombre_requetes_constant(self):
+        """Le calcul ne fait pas de requête par produit ni par commande"""
+        with self.assertNumQueries(5):
+            calculer()
+        for _ in range(10):
+            self.commander(self.jus, self.sirop, self.biere)
+        with self.assertNumQueries(5):
+            calculer()
+
+    def test_lecture_et_categorie(self):
+        """Une requête quand les voisins suffisent ; sinon complément par la même catégorie"""
+        calculer()
+        with self.assertNumQueries(1):
+            self.assertEqual(produits_similaires(self.eau, 2), [self.riz, self.biere])
+        with self.assertNumQueries(2):
+            similaires = produits_similaires(self.eau)
+        self.assertEqual(similaires[:2], [self.riz, self.biere])
+        self.assertEqual(set(similaires[2:]), {self.jus, self.sirop})
+
+        # Un voisin désactivé depuis le calcul n'est plus proposé
+        Produit.objects.filter(pk=self.riz.pk).update(active=False)
+        self.assertNotIn(self.riz, produits_similaires(self.eau))
+
+    def test_page_produit(self):
+        """La page produit affiche d'abord les produits achetés ensemble"""
+        calculer()
+        response = Client().get(reverse('detail_produit', args=[self.eau.id]))
+        self.assertEqual(response.context['produits_similaires'][:2], [self.riz, self.biere])
+        self.assertContains(response, "Riz")
+
+    def test_commande(self):
+        """La commande de gestion affiche le nombre de voisins enregistrés"""
+        sortie = StringIO()
+        call_command('calculer_produits_similaires', '--voisins', '1', stdout=sortie)
+        self.assertIn("3 produit(s) similaire(s) enregistré(s) pour 3 produit(s)", sortie.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('calculer_produits_similaires', '--achats-communs-min', '0', stdout=StringIO())
@@ -0,0 +1,87 @@
+"""
+Tests pour les fichiers statiques (collectstatic, précompression, en-têtes de cache)
+"""
+import gzip
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import skipIf
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import TestCase, RequestFactory, override_settings
+from boutique_app import statiques
+from boutique_app.middleware import EnTetesCacheMiddleware, CACHE_IMMUABLE
+
+
+class CollecteStatiquesTest(TestCase):
+    """Tests pour le manifeste, la minification et les versions compressées"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.racine = Path(tempfile.mkdtemp())
+        cls.reglage = override_settings(STATIC_ROOT=cls.racine)
+        cls.reglage.enable()
+        call_command('collectstatic', '--noinput', verbosity=0, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.reglage.disable()
+        shutil.rmtree(cls.racine, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_manifeste(self):
+        """Chaque fichier a un nom à empreinte, utilisé par {% static %}"""
+        manifeste = json.loads((self.racine / 'staticfiles.json').read_text())['paths']
+        nom = manifeste['css/client.css']
+        self.assertRegex(nom, r'^css/client\.[0-9a-f]{12}\.css$')
+        self.assertTrue((self.racine / nom).exists())
+        self.assertEqual(static('css/client.css'), settings.STATIC_URL + nom)
+
+    def test_css_minifie(self):
+        """Les feuilles de style collectées n'ont plus de commentaires"""
+        nom = staticfiles_storage.stored_name('css/theme.css')
+        source = (Path(settings.BASE_DIR) / 'static/css/theme.css').read_text()
+        minifie = (self.racine / nom).read_text()
+        self.assertIn('/*', source)
+        self.assertNotIn('/*', minifie)
+        self.assertLess(len(minifie), len(source))
+        self.assertIn('--primary-gradient-start:#667eea;', minifie)
+
+    def test_versions_compressees(self):
+        """Une version .gz identique une fois décompressée ; rien pour les petits fichiers ou les images"""
+        nom = staticfiles_storage.stored_name('css/client.css')
+        contenu = (self.racine / nom).read_bytes()
+        self.assertEqual(gzip.decompress((self.racine / f'{nom}.gz').read_bytes()), contenu)
+        self.assertEqual((self.racine / f'{nom}.br').exists(), statiques.brotli is not None)
+
+        self.assertEqual(statiques.compressions(b'a{b:c}'), [])
+        self.assertFalse(list(self.racine.rglob('*.png.gz')))
+
+    @skipIf(statiques.brotli is None, "brotli n'est pas installé")
+    def test_version_brotli(self):
+        nom = staticfiles_storage.stored_name('css/client.css')
+        contenu = (self.racine / nom).read_bytes()
+        self.assertEqual(statiques.brotli.decompress((self.racine / f'{nom}.br').read_bytes()), contenu)
+
+
+class EnTetesCacheTest(TestCase):
+    """Tests pour l'en-tête Cache-Control des fichiers à empreinte"""
+
+    def en_tete(self, chemin, statut=200):
+        middleware = EnTetesCacheMiddleware(lambda request: HttpResponse(status=statut))
+        return middleware(RequestFactory().get(chemin)).get('Cache-Control')
+
+    def test_cache_immuable(self):
+        """Fichiers à empreinte et images dérivées gardés un an ; le reste revalidé"""
+        self.assertEqual(self.en_tete('/static/css/client.3f1a9c2b7d4e.css'), CACHE_IMMUABLE)
+        self.assertEqual(self.en_tete('/media/derives/ab/ab12-grille.webp'), CACHE_IMMUABLE)
+        self.assertIsNone(self.en_tete('/static/css/client.css'))
+        self.assertIsNone(self.en_tete('/media/produits/photo.jpg'))
+        self.assertIsNone(self.en_tete('/catalogue/'))
+        self.assertIsNone(self.en_tete('/static/css/client.3f1a9c2b7d4e.css', statut=404))
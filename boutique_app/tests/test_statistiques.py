@@ -0,0 +1,129 @@
+"""
+Tests pour les statistiques du dashboard
+"""
+from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from datetime import timedelta
+from boutique_app.models import Categorie, Produit, Vente
+from boutique_app.cumuls import reconstruire_cumuls
+from boutique_app.statistiques import statistiques_dashboard, ventes_par_jour
+
+
+class StatistiquesDashboardTest(TestCase):
+    """Tests pour le calcul des statistiques du dashboard"""
+
+    def setUp(self):
+        self.aujourdhui = timezone.localdate()
+        self.ajouter_catalogue(1)
+
+    def ajouter_catalogue(self, nombre_categories, produits_par_categorie=2):
+        """Crée des catégories, des produits et des ventes réparties sur l'année"""
+        debut = Categorie.objects.count()
+        for i in range(debut, debut + nombre_categories):
+            categorie = Categorie.objects.create(nom=f"Catégorie {i}")
+            for j in range(produits_par_categorie):
+                produit = Produit.objects.create(
+                    nom=f"Produit {i}-{j}",
+                    categorie=categorie,
+                    prix_achat=Decimal('100.00'),
+                    prix_vente=Decimal('150.00'),
+                    quantite_stock=20,
+                    quantite_minimum=5
+                )
+                for jours in (0, 3, 20, 100):
+                    vente = Vente.objects.create(
+                        produit=produit,
+                        quantite=1,
+                        prix_unitaire=Decimal('150.00'),
+                        montant_total=Decimal('150.00')
+                    )
+                    Vente.objects.filter(id=vente.id).update(
+                        date_vente=timezone.now() - timedelta(days=jours)
+                    )
+        # Les dates modifiées par update() ne passent pas par les signaux
+        reconstruire_cumuls()
+
+    def compter_requetes(self):
+        with CaptureQueriesContext(connection) as contexte:
+            statistiques_dashboard(self.aujourdhui)
+        return len(contexte)
+
+    def test_nombre_requetes_constant(self):
+        """Le nombre de requêtes ne dépend pas de la taille du catalogue"""
+        requetes_petit_catalogue = self.compter_requetes()
+        self.ajouter_catalogue(15, produits_par_categorie=5)
+        self.assertEqual(self.compter_requetes(), requetes_petit_catalogue)
+
+    def test_totaux_par_periode(self):
+        """Test les totaux des ventes par période"""
+        stats = statistiques_dashboard(self.aujourdhui)
+        self.assertEqual(stats['ventes_aujourdhui'], Decimal('300.00'))
+        self.assertEqual(stats['nombre_ventes_aujourdhui'], 2)
+        self.assertEqual(stats['nombre_ventes_semaine'], 4)
+        self.assertEqual(stats['nombre_ventes_mois'], 6)
+        self.assertEqual(stats['nombre_ventes_annee'], 8)
+
+    def test_statistiques_categories(self):
+        """Test les statistiques par catégorie"""
+        stats = statistiques_dashboard(self.aujourdhui)
+        self.assertEqual(len(stats['stats_categories']), 1)
+        categorie = stats['stats_categories'][0]
+        self.assertEqual(categorie['nombre_produits'], 2)
+        self.assertEqual(categorie['valeur_stock'], Decimal('4000.00'))
+        self.assertEqual(categorie['ventes_mois'], Decimal('900.00'))
+
+    def test_ventes_par_jour(self):
+        """Test la tendance des 7 derniers jours"""
+        jours = ventes_par_jour(self.aujourdhui)
+        self.assertEqual(len(jours), 7)
+        self.assertEqual(jours[-1]['date'], self.aujourdhui.strftime('%d/%m'))
+        self.assertEqual(jours[-1]['total'], 300.0)
+        self.assertEqual(jours[-4]['total'], 300.0)
+        self.assertEqual(sum(jour['total'] for jour in jours), 600.0)
+
+
+class DashboardRequetesTest(TestCase):
+    """Tests de non-régression sur le nombre de requêtes du dashboard"""
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_user(username='admin', password='admin123', is_staff=True)
+        self.client.login(username='admin', password='admin123')
+
+    def creer_categorie(self, index):
+        categorie = Categorie.objects.create(nom=f"Catégorie {index}")
+        produit = Produit.objects.create(
+            nom=f"Produit {index}",
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=10
+        )
+        Vente.objects.create(
+            produit=produit,
+            quantite=1,
+            prix_unitaire=Decimal('150.00'),
+            montant_total=Decimal('150.00')
+        )
+
+    def compter_requetes(self):
+        # Mesurer un calcul complet, sans les sections en cache
+        cache.clear()
+        with CaptureQueriesContext(connection) as contexte:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(contexte)
+
+    def test_dashboard_nombre_requetes_constant(self):
+        """Le dashboard garde le même nombre de requêtes quand le catalogue grandit"""
+        self.creer_categorie(0)
+        requetes_initiales = self.compter_requetes()
+        for index in range(1, 20):
+            self.creer_categorie(index)
+        self.assertEqual(self.compter_requetes(), requetes_initiales)
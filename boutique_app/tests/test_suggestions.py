@@ -0,0 +1,157 @@
+"""
+Tests pour les suggestions de recherche (autocomplétion)
+"""
+from django.test import TestCase, Client
+from django.core.cache import cache
+from django.urls import reverse
+from decimal import Decimal
+from boutique_app.models import Categorie, Produit, Vente
+from boutique_app import suggestions
+
+
+class IndexSuggestionsTest(TestCase):
+    """Tests pour l'index de préfixes en mémoire"""
+
+    def setUp(self):
+        cache.clear()
+        suggestions.index.vider()
+        self.categorie = Categorie.objects.create(nom="Épicerie")
+        self.cafe = self.creer_produit("Café moulu", "3760000000011")
+        self.caramel = self.creer_produit("Caramel au beurre salé", "3760000000028")
+        self.eau = self.creer_produit("Eau minérale", "3760000000035")
+
+    def tearDown(self):
+        suggestions.index.vider()
+
+    def creer_produit(self, nom, code_barre):
+        return Produit.objects.create(
+            nom=nom,
+            categorie=self.categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=100,
+            code_barre=code_barre
+        )
+
+    def libelles(self, texte, limite=suggestions.LIMITE_PAR_DEFAUT):
+        return [s['libelle'] for s in suggestions.index.suggerer(texte, limite)]
+
+    def test_prefixe_sans_accents(self):
+        """Les accents et la casse sont ignorés"""
+        self.assertEqual(self.libelles("CAFE"), ["Café moulu"])
+        self.assertEqual(self.libelles("épi"), ["Épicerie"])
+
+    def test_prefixe_sur_chaque_mot(self):
+        """Un préfixe peut commencer à n'importe quel mot du nom"""
+        self.assertEqual(self.libelles("miner"), ["Eau minérale"])
+        self.assertEqual(self.libelles("beurre sa"), ["Caramel au beurre salé"])
+
+    def test_code_barre(self):
+        """Un début de code-barres trouve le produit"""
+        self.assertEqual(self.libelles("37600000000"), ["Café moulu", "Caramel au beurre salé", "Eau minérale"])
+        self.assertEqual(self.libelles("3760000000035"), ["Eau minérale"])
+
+    def test_prefixe_trop_court(self):
+        """Aucune suggestion sous la longueur minimale"""
+        self.assertEqual(self.libelles("c"), [])
+        self.assertEqual(self.libelles("   "), [])
+
+    def test_classement_par_ventes(self):
+        """Les produits les plus vendus sont proposés en premier"""
+        self.assertEqual(self.libelles("ca"), ["Café moulu", "Caramel au beurre salé"])
+        Vente.objects.create(
+            produit=self.caramel, quantite=5, prix_unitaire=Decimal('150.00'), montant_total=Decimal('750.00')
+        )
+        suggestions.index.vider()
+        self.assertEqual(self.libelles("ca"), ["Caramel au beurre salé", "Café moulu"])
+
+    def test_limite(self):
+        """Le nombre de suggestions est limité"""
+        self.assertEqual(len(self.libelles("37", limite=2)), 2)
+
+    def test_mises_a_jour_incrementales(self):
+        """Les modifications de produits sont reportées sans reconstruction"""
+        self.libelles("ca")
+        construit_le = suggestions.index._construit_le
+
+        self.cafe.nom = "Chocolat noir"
+        self.cafe.save()
+        self.assertEqual(self.libelles("caf"), [])
+        self.assertEqual(self.libelles("choco"), ["Chocolat noir"])
+
+        self.eau.active = False
+        self.eau.save()
+        self.assertEqual(self.libelles("eau"), [])
+
+        self.caramel.delete()
+        self.assertEqual(self.libelles("cara"), [])
+
+        self.assertEqual(suggestions.index._construit_le, construit_le)
+
+    def test_reconstruction_si_version_partagee_modifiee(self):
+        """Une modification publiée par un autre processus force la reconstruction"""
+        self.libelles("ca")
+        Produit.objects.filter(pk=self.cafe.pk).update(nom="Cacao en poudre")
+        self.assertEqual(self.libelles("cacao"), [])
+
+        suggestions.signaler_modification()
+        self.assertEqual(self.libelles("cacao"), ["Cacao en poudre"])
+
+    def test_stock_sans_signalement(self):
+        """Stock ou prix modifiés : la version partagée ne change pas, le nom la fait changer"""
+        self.libelles("ca")
+        version = suggestions.version_partagee()
+        self.cafe.quantite_stock = 42
+        self.cafe.prix_vente = Decimal('160.00')
+        self.cafe.save()
+        self.assertEqual(suggestions.version_partagee(), version)
+
+        self.cafe.nom = "Café en grains"
+        self.cafe.save()
+        self.assertNotEqual(suggestions.version_partagee(), version)
+        self.assertEqual(self.libelles("caf"), ["Café en grains"])
+
+    def test_requetes_constantes(self):
+        """Une fois l'index construit, une suggestion n'interroge pas la base"""
+        self.libelles("ca")
+        with self.assertNumQueries(0):
+            self.libelles("car")
+
+
+class SuggestionsViewTest(TestCase):
+    """Tests pour l'API de suggestions"""
+
+    def setUp(self):
+        cache.clear()
+        suggestions.index.vider()
+        self.client = Client()
+        categorie = Categorie.objects.create(nom="Boissons")
+        for i in range(30):
+            Produit.objects.create(
+                nom=f"Jus de fruits {i}",
+                categorie=categorie,
+                prix_achat=Decimal('100.00'),
+                prix_vente=Decimal('150.00'),
+                quantite_stock=10
+            )
+
+    def tearDown(self):
+        suggestions.index.vider()
+
+    def test_reponse_json(self):
+        """L'API retourne libellé, type et lien de chaque suggestion"""
+        response = self.client.get(reverse('suggestions'), {'q': 'bois'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['suggestions'], [{
+            'type': 'categorie',
+            'libelle': 'Boissons',
+            'url': f"{reverse('catalogue')}?categorie={Categorie.objects.get().id}",
+        }])
+
+    def test_limite_bornee(self):
+        """Le paramètre limite est borné et les valeurs invalides ignorées"""
+        url = reverse('suggestions')
+        self.assertEqual(len(self.client.get(url, {'q': 'jus'}).json()['suggestions']), suggestions.LIMITE_PAR_DEFAUT)
+        self.assertEqual(len(self.client.get(url, {'q': 'jus', 'limite': 1000}).json()['suggestions']), suggestions.LIMITE_MAX)
+        self.assertEqual(len(self.client.get(url, {'q': 'jus', 'limite': 0}).json()['suggestions']), 1)
+        self.assertEqual(len(self.client.get(url, {'q': 'jus', 'limite': 'abc'}).json()['suggestions']), suggestions.LIMITE_PAR_DEFAUT)
@@ -2,6 +2,7 @@
 Tests unitaires pour les vues
 """
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.urls import reverse
 from decimal import Decimal
@@ -221,6 +222,8 @@ class AdminViewsTest(TestCase):
     """Tests pour les vues admin"""
     
     def setUp(self):
+        # Le dashboard est mis en cache entre les tests
+        cache.clear()
         self.client = Client()
         self.admin_user = User.objects.create_user(
             username='admin',
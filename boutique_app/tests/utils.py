@@ -0,0 +1,77 @@
+"""
+Outils communs aux tests : comptage des requêtes SQL et jeux de données
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from boutique_app.models import Categorie, Produit, Panier, ItemPanier
+
+
+# Tailles de paniers utilisées pour vérifier que le nombre de requêtes est constant
+TAILLES_PANIER = (1, 10, 100)
+
+
+class NombreRequetesMixin:
+    """Assertions sur le nombre de requêtes SQL exécutées (à combiner avec TestCase)"""
+
+    @contextmanager
+    def assertRequetesMax(self, maximum):
+        """Échoue si le bloc exécute plus de ``maximum`` requêtes (la liste est affichée)"""
+        with CaptureQueriesContext(connection) as contexte:
+            yield contexte
+        nombre = len(contexte.captured_queries)
+        if nombre > maximum:
+            requetes = '\n'.join(
+                f'{i}. {requete["sql"]}' for i, requete in enumerate(contexte.captured_queries, start=1)
+            )
+            self.fail(f'{nombre} requêtes exécutées, maximum attendu {maximum} :\n{requetes}')
+
+    def compter_requetes(self, fonction, *args, **kwargs):
+        """Nombre de requêtes exécutées par un appel"""
+        with CaptureQueriesContext(connection) as contexte:
+            fonction(*args, **kwargs)
+        return len(contexte.captured_queries)
+
+    def assertRequetesConstantes(self, maximum, preparer, executer, tailles=TAILLES_PANIER):
+        """Vérifie que ``executer`` reste sous ``maximum`` requêtes pour chaque taille
+
+        ``preparer(taille)`` crée les données et retourne les arguments passés à
+        ``executer`` ; le nombre de requêtes doit être identique pour toutes les
+        tailles.
+        """
+        nombres = {}
+        for taille in tailles:
+            arguments = preparer(taille)
+            with self.subTest(taille=taille):
+                with self.assertRequetesMax(maximum) as contexte:
+                    executer(*arguments)
+                nombres[taille] = len(contexte.captured_queries)
+        self.assertEqual(len(set(nombres.values())), 1, f'Nombre de requêtes variable selon la taille : {nombres}')
+
+
+def creer_produits(nombre, categorie=None, prefixe='Produit'):
+    """Crée ``nombre`` produits actifs en stock"""
+    if categorie is None:
+        categorie, _ = Categorie.objects.get_or_create(nom='Catégorie de test')
+    return [
+        Produit.objects.create(
+            nom=f'{prefixe} {i}',
+            categorie=categorie,
+            prix_achat=Decimal('100.00'),
+            prix_vente=Decimal('150.00'),
+            quantite_stock=1000
+        )
+        for i in range(nombre)
+    ]
+
+
+def creer_panier(utilisateur, nombre_articles, statut='en_cours'):
+    """Crée un panier contenant ``nombre_articles`` produits différents"""
+    panier = Panier.objects.create(utilisateur=utilisateur, statut=statut)
+    produits = creer_produits(nombre_articles, prefixe=f'Article panier {panier.id}')
+    ItemPanier.objects.bulk_create([
+        ItemPanier(panier=panier, produit=produit, quantite=2, prix_unitaire=produit.prix_vente)
+        for produit in produits
+    ])
+    return panier
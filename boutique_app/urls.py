@@ -14,6 +14,7 @@ urlpatterns = [
     # Catalogue et produits
     path('catalogue/', views.catalogue, name='catalogue'),
     path('produit/<int:produit_id>/', views.detail_produit, name='detail_produit'),
+    path('api/suggestions/', views.suggestions, name='suggestions'),
     
     # Panier
     path('panier/', views.panier, name='panier'),
@@ -29,7 +30,12 @@ urlpatterns = [
     # Avis produits
     path('produit/<int:produit_id>/avis/', views.ajouter_avis, name='ajouter_avis'),
     
+    # Caisse (staff)
+    path('api/caisse/scanner/', views.caisse_scanner, name='caisse_scanner'),
+    path('api/caisse/vente/', views.caisse_vente, name='caisse_vente'),
+    
     # Export (admin)
     path('export/ventes/', views.export_ventes, name='export_ventes'),
+    path('export/ventes/parquet/', views.export_ventes_parquet, name='export_ventes_parquet'),
 ]
 
@@ -3,14 +3,32 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout
 from django.contrib import messages
-from django.db.models import Sum, Count, Avg, Max, Min, Q, F
-from django.utils import timezone
-from datetime import timedelta
+from django.db.models import Count, Max, Q, Prefetch, prefetch_related_objects
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from decimal import Decimal
-from .models import Produit, Categorie, Commande, Vente, Panier, ItemPanier, Fournisseur, AvisProduit
+from .models import Produit, Categorie, Commande, Panier, ItemPanier, AvisProduit, ProduitSimilaire
 from .forms import InscriptionForm, AjoutPanierForm
+from .cache_dashboard import contexte_dashboard
+from .recherche import rechercher
+from . import suggestions as index_suggestions
+from . import commandes as service_commandes
+from . import caisse
+from . import similarites
+from . import conditionnel
+from .pagination import PaginateurCurseur, PARAMETRE_CURSEUR, url_page
 import json
-from collections import defaultdict
+
+
+PRODUITS_PAR_PAGE = 12
+COMMANDES_PAR_PAGE = 10
+
+# Tri du catalogue -> ordre de pagination (le dernier champ doit être unique)
+TRIS_CATALOGUE = {
+    'nouveautes': ('-date_creation', '-id'),
+    'note': ('-note_moyenne', '-nombre_avis', '-id'),
+}
+ORDRE_COMMANDES = ('-date_commande', '-id')
 
 
 def accueil(request):
@@ -24,147 +42,8 @@ def accueil(request):
 @staff_member_required
 def dashboard(request):
     """Dashboard principal avec toutes les statistiques"""
-    
-    # Périodes de temps
-    aujourdhui = timezone.now().date()
-    cette_semaine = aujourdhui - timedelta(days=7)
-    ce_mois = aujourdhui - timedelta(days=30)
-    cette_annee = aujourdhui - timedelta(days=365)
-    
-    # Statistiques générales
-    total_produits = Produit.objects.filter(active=True).count()
-    total_categories = Categorie.objects.filter(active=True).count()
-    total_commandes = Commande.objects.count()
-    total_paniers = Panier.objects.filter(statut='valide').count()
-    
-    # Statistiques financières
-    ventes_aujourdhui = Vente.objects.filter(date_vente__date=aujourdhui).aggregate(
-        total=Sum('montant_total'),
-        nombre=Count('id')
-    )
-    
-    ventes_semaine = Vente.objects.filter(date_vente__date__gte=cette_semaine).aggregate(
-        total=Sum('montant_total'),
-        nombre=Count('id')
-    )
-    
-    ventes_mois = Vente.objects.filter(date_vente__date__gte=ce_mois).aggregate(
-        total=Sum('montant_total'),
-        nombre=Count('id')
-    )
-    
-    ventes_annee = Vente.objects.filter(date_vente__date__gte=cette_annee).aggregate(
-        total=Sum('montant_total'),
-        nombre=Count('id')
-    )
-    
-    # Valeur du stock
-    valeur_stock_total = sum(p.valeur_stock for p in Produit.objects.filter(active=True))
-    
-    # Produits en stock faible
-    produits_stock_faible = Produit.objects.filter(
-        active=True
-    ).extra(
-        where=['quantite_stock <= quantite_minimum']
-    ).count()
-    
-    # Statistiques par catégorie
-    stats_categories = []
-    for categorie in Categorie.objects.filter(active=True):
-        produits_cat = Produit.objects.filter(categorie=categorie, active=True)
-        stats_categories.append({
-            'nom': categorie.nom,
-            'nombre_produits': produits_cat.count(),
-            'valeur_stock': sum(p.valeur_stock for p in produits_cat),
-            'ventes_mois': Vente.objects.filter(
-                produit__categorie=categorie,
-                date_vente__date__gte=ce_mois
-            ).aggregate(total=Sum('montant_total'))['total'] or 0
-        })
-    
-    # Top produits vendus (ce mois)
-    top_produits = Vente.objects.filter(
-        date_vente__date__gte=ce_mois
-    ).values('produit__nom').annotate(
-        total_ventes=Sum('montant_total'),
-        quantite_vendue=Sum('quantite')
-    ).order_by('-total_ventes')[:10]
-    
-    # Statistiques min/max
-    produits_actifs = Produit.objects.filter(active=True)
-    produits_stats = produits_actifs.aggregate(
-        prix_min=Min('prix_vente'),
-        prix_max=Max('prix_vente'),
-        prix_moyen=Avg('prix_vente'),
-        stock_min=Min('quantite_stock'),
-        stock_max=Max('quantite_stock'),
-        stock_moyen=Avg('quantite_stock')
-    )
-    
-    # Calculer marge min/max manuellement
-    if produits_actifs.exists():
-        marges = [(p.prix_vente - p.prix_achat) for p in produits_actifs]
-        produits_stats['marge_min'] = min(marges) if marges else 0
-        produits_stats['marge_max'] = max(marges) if marges else 0
-    else:
-        produits_stats['marge_min'] = 0
-        produits_stats['marge_max'] = 0
-    
-    # Prévisions (basées sur les tendances)
-    ventes_derniers_mois = []
-    for i in range(6):
-        date_debut = ce_mois - timedelta(days=30 * (i + 1))
-        date_fin = ce_mois - timedelta(days=30 * i)
-        total = Vente.objects.filter(
-            date_vente__date__gte=date_debut,
-            date_vente__date__lt=date_fin
-        ).aggregate(total=Sum('montant_total'))['total'] or 0
-        ventes_derniers_mois.append(float(total))
-    
-    # Prévision simple (moyenne des 3 derniers mois)
-    if len(ventes_derniers_mois) >= 3:
-        moyenne_3_mois = sum(ventes_derniers_mois[:3]) / 3
-    else:
-        moyenne_3_mois = sum(ventes_derniers_mois) / len(ventes_derniers_mois) if ventes_derniers_mois else 0
-    
-    # Tendances des ventes par jour (7 derniers jours)
-    ventes_par_jour = []
-    for i in range(7):
-        date = aujourdhui - timedelta(days=i)
-        total = Vente.objects.filter(date_vente__date=date).aggregate(
-            total=Sum('montant_total')
-        )['total'] or 0
-        ventes_par_jour.append({
-            'date': date.strftime('%d/%m'),
-            'total': float(total)
-        })
-    ventes_par_jour.reverse()
-    
-    # Commandes en attente
-    commandes_en_attente = Commande.objects.filter(statut='en_attente').count()
-    
-    context = {
-        'total_produits': total_produits,
-        'total_categories': total_categories,
-        'total_commandes': total_commandes,
-        'total_paniers': total_paniers,
-        'ventes_aujourdhui': ventes_aujourdhui['total'] or 0,
-        'nombre_ventes_aujourdhui': ventes_aujourdhui['nombre'] or 0,
-        'ventes_semaine': ventes_semaine['total'] or 0,
-        'nombre_ventes_semaine': ventes_semaine['nombre'] or 0,
-        'ventes_mois': ventes_mois['total'] or 0,
-        'nombre_ventes_mois': ventes_mois['nombre'] or 0,
-        'ventes_annee': ventes_annee['total'] or 0,
-        'nombre_ventes_annee': ventes_annee['nombre'] or 0,
-        'valeur_stock_total': valeur_stock_total,
-        'produits_stock_faible': produits_stock_faible,
-        'stats_categories': stats_categories,
-        'top_produits': top_produits,
-        'produits_stats': produits_stats,
-        'prevision_mois': moyenne_3_mois,
-        'ventes_par_jour': json.dumps(ventes_par_jour),
-        'commandes_en_attente': commandes_en_attente,
-    }
+    context = contexte_dashboard()
+    context['ventes_par_jour'] = json.dumps(context['ventes_par_jour'])
     
     return render(request, 'admin/dashboard.html', context)
 
@@ -217,58 +96,149 @@ def deconnexion_client(request):
     return redirect('accueil')
 
 
-def catalogue(request):
-    """Catalogue des produits pour les clients"""
-    produits = Produit.objects.filter(active=True)
-    categories = Categorie.objects.filter(active=True)
+def produits_catalogue(parametres):
+    """Produits du catalogue filtrés selon les paramètres de l'URL, et valeurs des filtres"""
+    produits = Produit.objects.filter(active=True).select_related('categorie')
     
     # Filtres
-    categorie_id = request.GET.get('categorie')
-    recherche = request.GET.get('recherche')
-    promotion = request.GET.get('promotion') == '1'
+    categorie_id = parametres.get('categorie')
+    recherche = parametres.get('recherche')
+    promotion = parametres.get('promotion') == '1'
+    tri = parametres.get('tri')
+    if tri not in TRIS_CATALOGUE:
+        tri = 'nouveautes'
+    try:
+        note_min = int(parametres.get('note_min', 0))
+    except (ValueError, TypeError):
+        note_min = 0
+    note_min = max(0, min(note_min, 5))
     
     if categorie_id:
         produits = produits.filter(categorie_id=categorie_id)
     
+    if note_min:
+        # Notes dénormalisées sur le produit : pas de jointure sur les avis
+        produits = produits.filter(note_moyenne__gte=note_min)
+    
     if recherche:
-        produits = produits.filter(
-            Q(nom__icontains=recherche) | Q(description__icontains=recherche)
-        )
+        # Recherche plein texte classée par pertinence
+        produits = rechercher(produits, recherche)
     
     if promotion:
         produits = produits.filter(en_promotion=True)
     
-    # Pagination simple
-    from django.core.paginator import Paginator
-    paginator = Paginator(produits, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    filtres = {
+        'categorie_id': categorie_id,
+        'recherche': recherche,
+        'promotion': promotion,
+        'tri': tri,
+        'note_min': note_min,
+    }
+    return produits, filtres
+
+
+def _etag_catalogue(request):
+    """Dernière modification et nombre des produits filtrés (une requête)"""
+    def etat():
+        produits, _ = produits_catalogue(request.GET)
+        return tuple(produits.order_by().aggregate(dernier=Max('date_modification'), nombre=Count('id')).values())
+    return conditionnel.etag(request, etat)
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_catalogue)
+def catalogue(request):
+    """Catalogue des produits pour les clients"""
+    produits, filtres = produits_catalogue(request.GET)
+    categories = Categorie.objects.filter(active=True)
+    categorie_id = filtres['categorie_id']
+    recherche = filtres['recherche']
+    tri = filtres['tri']
+    
+    if recherche:
+        # Résultats classés par pertinence : pagination classique
+        from django.core.paginator import Paginator
+        paginator = Paginator(produits, PRODUITS_PAR_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        lien_precedent = url_page(request, page=page_obj.previous_page_number()) if page_obj.has_previous() else None
+        lien_suivant = url_page(request, page=page_obj.next_page_number()) if page_obj.has_next() else None
+    else:
+        # Nouveautés ou meilleures notes d'abord : pagination par curseur, sans OFFSET ni COUNT
+        paginator = PaginateurCurseur(produits, PRODUITS_PAR_PAGE, ordre=TRIS_CATALOGUE[tri])
+        page_obj = paginator.page(request.GET.get(PARAMETRE_CURSEUR))
+        lien_precedent = url_page(request, curseur=page_obj.curseur_precedent) if page_obj.has_previous() else None
+        lien_suivant = url_page(request, curseur=page_obj.curseur_suivant) if page_obj.has_next() else None
     
     context = {
         'produits': page_obj,
         'categories': categories,
         'categorie_actuelle': int(categorie_id) if categorie_id else None,
         'recherche': recherche,
-        'promotion_filter': promotion,
+        'promotion_filter': filtres['promotion'],
+        'tri': tri,
+        'note_min': filtres['note_min'],
+        'lien_precedent': lien_precedent,
+        'lien_suivant': lien_suivant,
     }
     
     return render(request, 'client/catalogue.html', context)
 
 
+def suggestions(request):
+    """Suggestions de recherche (autocomplétion) au format JSON"""
+    from django.http import JsonResponse
+    
+    try:
+        limite = int(request.GET.get('limite', index_suggestions.LIMITE_PAR_DEFAUT))
+    except (ValueError, TypeError):
+        limite = index_suggestions.LIMITE_PAR_DEFAUT
+    limite = max(1, min(limite, index_suggestions.LIMITE_MAX))
+    
+    resultats = index_suggestions.index.suggerer(request.GET.get('q', ''), limite=limite)
+    return JsonResponse({'suggestions': resultats})
+
+
+def _etag_detail_produit(request, produit_id):
+    """Le produit, ses produits similaires et ceux de sa catégorie (complément affiché)"""
+    def etat():
+        resultat = Produit.objects.filter(
+            Q(id=produit_id)
+            | Q(id__in=ProduitSimilaire.objects.filter(produit_id=produit_id).values('similaire_id'))
+            | Q(categorie_id__in=Produit.objects.filter(id=produit_id).values('categorie_id'))
+        ).aggregate(
+            visible=Count('id', filter=Q(id=produit_id, active=True)),
+            dernier=Max('date_modification'),
+            actifs=Count('id', filter=Q(active=True)),
+        )
+        return tuple(resultat.values()) if resultat['visible'] else None
+    return conditionnel.etag(request, etat)
+
+
+def avis_approuves(produit_id):
+    """Avis approuvés affichés sur la fiche d'un produit, les plus récents d'abord"""
+    return AvisProduit.objects.filter(
+        produit_id=produit_id, approuve=True
+    ).select_related('utilisateur').order_by('-date_creation')[:10]
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_detail_produit)
 def detail_produit(request, produit_id):
     """Page de détail d'un produit"""
-    produit = get_object_or_404(Produit, id=produit_id, active=True)
+    produit = get_object_or_404(
+        Produit.objects.select_related('categorie', 'modele'),
+        id=produit_id,
+        active=True
+    )
     form = AjoutPanierForm()
     
-    # Produits similaires (même catégorie)
-    produits_similaires = Produit.objects.filter(
-        categorie=produit.categorie,
-        active=True
-    ).exclude(id=produit.id)[:4]
+    # Produits souvent achetés avec celui-ci, complétés par la même catégorie
+    produits_similaires = similarites.produits_similaires(produit)
     
     # Avis approuvés
-    avis = AvisProduit.objects.filter(produit=produit, approuve=True).order_by('-date_creation')[:10]
-    note_moyenne = avis.aggregate(Avg('note'))['note__avg'] if avis.exists() else None
+    avis = list(avis_approuves(produit.id))
+    # Note calculée sur tous les avis approuvés, enregistrée sur le produit
+    note_moyenne = produit.note_moyenne if produit.nombre_avis else None
     
     context = {
         'produit': produit,
@@ -334,6 +304,16 @@ def ajouter_au_panier(request, produit_id):
     return redirect('detail_produit', produit_id=produit_id)
 
 
+def articles_panier():
+    """Articles de panier avec leur produit et sa catégorie"""
+    return ItemPanier.objects.select_related('produit__categorie')
+
+
+def precharger_articles(panier_obj):
+    """Précharge les articles d'un panier avec leur produit et sa catégorie"""
+    prefetch_related_objects([panier_obj], Prefetch('items', queryset=articles_panier()))
+
+
 @login_required
 def panier(request):
     """Page du panier du client"""
@@ -343,6 +323,7 @@ def panier(request):
         defaults={}
     )
     
+    precharger_articles(panier_obj)
     items = panier_obj.items.all()
     total = panier_obj.total
     
@@ -394,52 +375,47 @@ def retirer_du_panier(request, item_id):
     return redirect('panier')
 
 
+def paniers_en_cours(utilisateur):
+    """Panier en cours d'un client (au plus un)"""
+    return Panier.objects.filter(utilisateur=utilisateur, statut='en_cours')
+
+
 @login_required
 def passer_commande(request):
     """Passer une commande depuis le panier"""
-    panier_obj = get_object_or_404(
-        Panier,
-        utilisateur=request.user,
-        statut='en_cours'
-    )
+    panier_obj = get_object_or_404(paniers_en_cours(request.user))
     
-    if not panier_obj.items.exists():
-        messages.error(request, 'Votre panier est vide.')
+    try:
+        commande = service_commandes.passer_commande(panier_obj)
+    except service_commandes.ErreurCommande as erreur:
+        messages.error(request, str(erreur))
         return redirect('panier')
     
-    # Vérifier le stock de tous les articles
-    for item in panier_obj.items.all():
-        if item.quantite > item.produit.quantite_stock:
-            messages.error(
-                request,
-                f'Stock insuffisant pour {item.produit.nom}. Stock disponible: {item.produit.quantite_stock}'
-            )
-            return redirect('panier')
-    
-    # Créer la commande
-    commande = Commande.objects.create(
-        panier=panier_obj,
-        montant_total=panier_obj.total,
-        statut='en_attente'
-    )
-    
-    # Marquer le panier comme validé
-    panier_obj.statut = 'valide'
-    panier_obj.save()
-    
     messages.success(request, f'Commande #{commande.numero_commande} passée avec succès !')
     return redirect('mes_commandes')
 
 
+def commandes_client(utilisateur):
+    """Commandes d'un client avec leur nombre d'articles"""
+    return Commande.objects.filter(
+        panier__utilisateur=utilisateur
+    ).annotate(
+        nombre_articles=Count('panier__items')
+    )
+
+
 @login_required
 def mes_commandes(request):
     """Liste des commandes du client"""
-    commandes = Commande.objects.filter(
-        panier__utilisateur=request.user
-    ).order_by('-date_commande')
+    commandes = commandes_client(request.user)
+    
+    paginator = PaginateurCurseur(commandes, COMMANDES_PAR_PAGE, ordre=ORDRE_COMMANDES, comptage='approximatif')
+    page_obj = paginator.page(request.GET.get(PARAMETRE_CURSEUR))
     
     context = {
-        'commandes': commandes,
+        'commandes': page_obj,
+        'lien_precedent': url_page(request, curseur=page_obj.curseur_precedent) if page_obj.has_previous() else None,
+        'lien_suivant': url_page(request, curseur=page_obj.curseur_suivant) if page_obj.has_next() else None,
     }
     
     return render(request, 'client/mes_commandes.html', context)
@@ -449,14 +425,14 @@ def mes_commandes(request):
 def detail_commande(request, commande_id):
     """Détail d'une commande"""
     commande = get_object_or_404(
-        Commande,
+        Commande.objects.select_related('panier'),
         id=commande_id,
         panier__utilisateur=request.user
     )
     
     context = {
         'commande': commande,
-        'items': commande.panier.items.all(),
+        'items': articles_panier().filter(panier=commande.panier),
     }
     
     return render(request, 'client/detail_commande.html', context)
@@ -464,38 +440,138 @@ def detail_commande(request, commande_id):
 
 @staff_member_required
 def export_ventes(request):
-    """Export des ventes en CSV (staff only)"""
-    import csv
-    from django.http import HttpResponse, HttpResponseForbidden
-    from datetime import datetime
+    """Export des ventes en CSV (staff only), en flux et filtrable par période et catégorie"""
+    from django.http import StreamingHttpResponse, HttpResponseForbidden, HttpResponseBadRequest
+    from .exports import filtres_export, ventes_filtrees, csv_ventes, nom_fichier, FiltresInvalides
     
     # Sécurité: vérifier que l'utilisateur est bien staff
     if not request.user.is_staff:
         return HttpResponseForbidden("Accès refusé")
     
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    # Sécurité: éviter les caractères spéciaux dans le nom de fichier
-    safe_date = datetime.now().strftime("%Y%m%d")
-    response['Content-Disposition'] = f'attachment; filename="ventes_{safe_date}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Produit', 'Catégorie', 'Quantité', 'Prix unitaire', 'Montant total'])
-    
-    ventes = Vente.objects.select_related('produit', 'produit__categorie').all().order_by('-date_vente')
-    for vente in ventes:
-        # Échapper les données pour éviter les injections CSV
-        writer.writerow([
-            vente.date_vente.strftime('%Y-%m-%d %H:%M'),
-            str(vente.produit.nom),  # Convertir en string pour sécurité
-            str(vente.produit.categorie.nom),
-            vente.quantite,
-            float(vente.prix_unitaire),
-            float(vente.montant_total)
-        ])
+    try:
+        filtres = filtres_export(request.GET)
+    except FiltresInvalides as erreur:
+        return HttpResponseBadRequest(str(erreur))
     
+    response = StreamingHttpResponse(
+        csv_ventes(ventes_filtrees(**filtres)),
+        content_type='text/csv; charset=utf-8'
+    )
+    # Sécurité: nom de fichier construit uniquement à partir de dates
+    fichier = nom_fichier('ventes', 'csv', filtres.get('debut'), filtres.get('fin'))
+    response['Content-Disposition'] = f'attachment; filename="{fichier}"'
     return response
 
 
+@staff_member_required
+def export_ventes_parquet(request):
+    """Export des ventes en Parquet partitionné par mois, dans une archive ZIP (staff only)"""
+    import os
+    import tempfile
+    import zipfile
+    from django.http import FileResponse, HttpResponse, HttpResponseBadRequest
+    from .exports import exporter_parquet, filtres_export, nom_fichier, FiltresInvalides, PyarrowIndisponible
+    
+    try:
+        filtres = filtres_export(request.GET)
+    except FiltresInvalides as erreur:
+        return HttpResponseBadRequest(str(erreur))
+    
+    # Fichiers écrits sur disque puis archivés : la mémoire reste constante
+    archive = tempfile.TemporaryFile()
+    with tempfile.TemporaryDirectory() as dossier:
+        try:
+            fichiers = exporter_parquet(dossier, **filtres)
+        except PyarrowIndisponible as erreur:
+            archive.close()
+            return HttpResponse(str(erreur), status=501, content_type='text/plain; charset=utf-8')
+        # Parquet est déjà compressé : archive sans recompression
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as zip_fichier:
+            for mois, chemin, nombre in fichiers:
+                zip_fichier.write(chemin, os.path.relpath(chemin, dossier))
+    archive.seek(0)
+    
+    fichier = nom_fichier('ventes', 'parquet.zip', filtres.get('debut'), filtres.get('fin'))
+    return FileResponse(archive, as_attachment=True, filename=fichier, content_type='application/zip')
+
+
+def _articles_caisse(quantites, articles):
+    """Lignes JSON d'un ticket de caisse et son total"""
+    lignes = []
+    total = Decimal('0')
+    for code, quantite in quantites.items():
+        article = articles[code]
+        sous_total = article.prix * quantite
+        total += sous_total
+        lignes.append({
+            'code_barre': code,
+            'id': article.id,
+            'nom': article.nom,
+            'prix': str(article.prix),
+            'quantite': quantite,
+            'sous_total': str(sous_total),
+            'stock': article.stock,
+        })
+    return lignes, total
+
+
+@staff_member_required
+def caisse_scanner(request):
+    """Résout des codes-barres scannés (staff only) : produits, prix et stock indicatif, sans requête SQL"""
+    from django.http import JsonResponse
+    
+    if request.method == 'POST':
+        try:
+            donnees = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'erreur': 'JSON invalide'}, status=400)
+    else:
+        donnees = {'codes': request.GET.getlist('code')}
+    try:
+        quantites = caisse.lire_scans(donnees)
+    except caisse.ScansInvalides as erreur:
+        return JsonResponse({'erreur': str(erreur)}, status=400)
+    
+    articles, inconnus = caisse.index.resoudre(quantites)
+    lignes, total = _articles_caisse({code: q for code, q in quantites.items() if code in articles}, articles)
+    return JsonResponse({'articles': lignes, 'total': str(total), 'inconnus': inconnus})
+
+
+@staff_member_required
+def caisse_vente(request):
+    """Enregistre une vente au comptoir (staff only) : commande livrée, ventes et stock en une transaction"""
+    from django.http import JsonResponse
+    
+    if request.method != 'POST':
+        return JsonResponse({'erreur': 'Méthode POST attendue'}, status=405)
+    try:
+        donnees = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'erreur': 'JSON invalide'}, status=400)
+    try:
+        quantites = caisse.lire_scans(donnees)
+    except caisse.ScansInvalides as erreur:
+        return JsonResponse({'erreur': str(erreur)}, status=400)
+    
+    try:
+        commande, articles = caisse.vendre(request.user, quantites)
+    except caisse.CodesInconnus as erreur:
+        return JsonResponse({'erreur': str(erreur), 'inconnus': erreur.codes}, status=404)
+    except service_commandes.StockInsuffisant as erreur:
+        return JsonResponse({
+            'erreur': str(erreur),
+            'produit': str(erreur.produit),
+            'disponible': erreur.disponible,
+        }, status=409)
+    
+    lignes, _ = _articles_caisse(quantites, articles)
+    return JsonResponse({
+        'commande': commande.numero_commande,
+        'montant_total': str(commande.montant_total),
+        'articles': lignes,
+    }, status=201)
+
+
 @login_required
 def ajouter_avis(request, produit_id):
     """Ajouter un avis sur un produit"""